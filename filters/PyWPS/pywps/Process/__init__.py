@@ -234,6 +234,18 @@ class WPSProcess:
 
         copy of the :class:`pywps.Pywps` instance
 
+    .. attribute:: fingerprint
+
+        Fingerprint of the process description, set by the code providing
+        the process. The DescribeProcess output of processes with a
+        fingerprint is rendered once and cached.
+
+    .. attribute:: scope
+
+        Context of the process description, e.g. the project and the server
+        address it was built for. Descriptions are cached per scope, so the
+        processes of several projects do not replace each other.
+
     """
     identifier = None
     version = None
@@ -253,6 +265,8 @@ class WPSProcess:
     grassMapset = None
     logFile = None
     pywps = None
+    fingerprint = None
+    scope = None
 
     def __init__(self, identifier, title=None, abstract=None,
                  metadata=[], profile=[], version="None",
@@ -34,15 +34,141 @@ import re
 import cPickle
 import types
 import copy
+import tempfile
+import logging
 
 TMPLEXT = "tmpl"
 TMPLCEXT = "tmplc"
 INCDIR = "inc"
 PREF = "TMPL"
+# parsed templates by template file: (stamps, tokens), the stamps are
+# modification times of the template file and of the included files
+_parsedTemplates = {}
+# compiled templates by (template file, stamps)
+_compiledTemplates = {}
 VARTYPES = [types.StringType, types.FileType,
             types.FloatType, types.IntType,
             types.NoneType,
             types.BooleanType, types.LongType, types.UnicodeType]
+# size of the chunks of streamed templates
+CHUNKSIZE = 65536
+
+
+class FileValue:
+    """VAR value with the content of a file, which is read in chunks when
+    the template is streamed, instead of being kept in memory. The file is
+    opened for each iteration and closed when it finishes. A temporary file
+    is opened immediately and kept open until :meth:`close`, so the value
+    can still be read once the file has been removed.
+
+    :param fileName: file name
+    :param offset: start of the value in the file
+    :param temporary: the file is removed before the value is read
+    """
+    fileName = None
+    offset = 0
+    temporary = False
+    _file = None
+
+    def __init__(self, fileName, offset=0, temporary=False):
+        self.fileName = fileName
+        self.offset = offset
+        self.temporary = temporary
+        if temporary:
+            self._file = open(fileName, "rb")
+
+    def _open(self):
+        if self._file is None or self._file.closed:
+            self._file = open(self.fileName, "rb")
+        self._file.seek(self.offset)
+        return self._file
+
+    def __iter__(self):
+        f = self._open()
+        try:
+            while True:
+                chunk = f.read(CHUNKSIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            if not self.temporary:
+                f.close()
+
+    def __str__(self):
+        return "".join(self)
+
+    def close(self):
+        """Close the file"""
+        if self._file is not None:
+            self._file.close()
+
+
+class TemplateStream:
+    """Formated template as iterable of text chunks of about
+    :data:`CHUNKSIZE` bytes. The stream can be iterated more times, every
+    iteration formats the template again with the values it had when the
+    stream was created.
+
+    :param generate: function returning iterable of text parts of the
+        formated template for given context
+    :param context: dictionary of values
+    """
+    _generate = None
+    _context = None
+    _reader = None
+    _buffer = ""
+
+    def __init__(self, generate, context=None):
+        self._generate = generate
+        self._context = dict(context or {})
+
+    def __iter__(self):
+        parts = []
+        size = 0
+        for part in self._generate(self._context):
+            parts.append(part)
+            size += len(part)
+            if size >= CHUNKSIZE:
+                yield "".join(parts)
+                parts = []
+                size = 0
+        if parts:
+            yield "".join(parts)
+
+    def read(self, size=-1):
+        """Read the formated template like a file
+
+        :param size: maximum number of bytes, all if negative
+        :rtype: string
+        """
+        if self._reader is None:
+            self._reader = iter(self)
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += self._reader.next()
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        (data, self._buffer) = (self._buffer[:size], self._buffer[size:])
+        return data
+
+    def __str__(self):
+        return "".join(self._generate(self._context))
+
+    def close(self):
+        """Close the files of the :class:`FileValue` values, the stream can
+        not be iterated anymore"""
+        values = self._context.values()
+        while values:
+            value = values.pop()
+            if value.__class__ is FileValue:
+                value.close()
+            elif value.__class__ is list:
+                values.extend(value)
+            elif value.__class__ is dict:
+                values.extend(value.values())
 
 
 class Token:
@@ -244,6 +370,192 @@ class VarToken(Token):
             return str(self.value)
 
 
+def _var(scope, name):
+    """Format VAR value, lists are loop values and are not printed, file
+    values are returned as they are, to be read in chunks"""
+    value = scope.get(name)
+    if value.__class__ is list:
+        return "None"
+    if value.__class__ is FileValue:
+        return value
+    return str(value)
+
+
+def _items(value):
+    """Get items of LOOP value, other values are not looped"""
+    if value.__class__ is list:
+        return value
+    return ()
+
+
+class TemplateCompiler:
+    """Compiler of the list of tokens to the source code of Python
+    functions.
+
+    The generated module defines `render(scope)` generator, yielding the
+    text parts of the formated template, and `LOOPS` dictionary with
+    generators formating one item of the loops, which
+    :meth:`TemplateProcessor.set` can reach. :class:`FileValue` values are
+    yielded in chunks.
+
+    The scope is a dictionary with the values, which would be given to
+    :meth:`TemplateProcessor.set`. IF childs share the scope of the IF
+    token, each LOOP item is the scope of the LOOP childs. Loop items can
+    also be already formated strings.
+    """
+
+    # body of generator yielding nothing
+    _EMPTY = ["    return", "    yield ''"]
+
+    def compile(self, tokens):
+        """Compile list of tokens
+
+        :param tokens: list of tokens
+        :rtype: string
+        :returns: source code of the module
+        """
+        self._functions = []
+        self._loops = []
+        self._counter = 0
+
+        body = self._compileTokens(tokens, 1, True)
+
+        lines = []
+        for function in self._functions:
+            lines += function
+        lines += ["def render(scope):"]
+        lines += body or self._EMPTY
+        lines += ["",
+                  "LOOPS = {%s}" % ", ".join(["%r: %s" % loop
+                                              for loop in self._loops])]
+        return "\n".join(lines) + "\n"
+
+    def _compileTokens(self, tokens, indent, reachable):
+        """Compile list of tokens to lines of code
+
+        :param tokens: list of tokens
+        :param indent: indentation level of the code
+        :param reachable: tokens can be reached by
+            :meth:`TemplateProcessor.set` from the top level
+        :returns: list of lines
+        """
+        prefix = "    " * indent
+        lines = []
+        text = ""
+        for token in tokens:
+            if token.type not in ("var", "if", "loop"):
+                # normal text (or unknown statement): constant value
+                text += str(token.value)
+                continue
+
+            if text:
+                lines.append("%syield %r" % (prefix, text))
+                text = ""
+
+            if token.type == "var":
+                lines += ["%s_value = _var(scope, %r)" % (prefix, token.name),
+                          "%sif _value.__class__ is _FileValue:" % prefix,
+                          "%s    for _chunk in _value:" % prefix,
+                          "%s        yield _chunk" % prefix,
+                          "%selse:" % prefix,
+                          "%s    yield _value" % prefix]
+
+            elif token.type == "if":
+                ifChilds = [child for child in token._childs
+                            if child.ifOrElseChild == "if"]
+                elseChilds = [child for child in token._childs
+                              if child.ifOrElseChild == "else"]
+                lines.append("%sif scope.get(%r):" % (prefix, token.name))
+                lines += self._compileTokens(ifChilds, indent + 1,
+                                             reachable) or \
+                    [prefix + "    pass"]
+                if elseChilds:
+                    lines.append("%selse:" % prefix)
+                    lines += self._compileTokens(elseChilds, indent + 1,
+                                                 reachable)
+
+            elif token.type == "loop":
+                function = self._compileLoop(token)
+                if reachable and token.name not in \
+                        [loop[0] for loop in self._loops]:
+                    self._loops.append((token.name, function))
+                lines += ["%sfor _item in _items(scope.get(%r)):" %
+                          (prefix, token.name),
+                          "%s    if _item.__class__ in _TEXTTYPES:" % prefix,
+                          "%s        yield _item" % prefix,
+                          "%s    else:" % prefix,
+                          "%s        for _chunk in %s(_item):" %
+                          (prefix, function),
+                          "%s            yield _chunk" % prefix]
+
+        if text:
+            lines.append("%syield %r" % (prefix, text))
+        return lines
+
+    def _compileLoop(self, token):
+        """Compile childs of the LOOP token to new function
+
+        :param token: LOOP token
+        :returns: name of the function
+        """
+        self._counter += 1
+        name = "_loop%d" % self._counter
+        function = ["def %s(scope):" % name]
+        function += self._compileTokens(token._childs, 1, False) or \
+            self._EMPTY
+        function.append("")
+        self._functions.append(function)
+        return name
+
+
+class CompiledTemplate:
+    """Template compiled to Python functions by :class:`TemplateCompiler`
+
+    :param tokens: list of tokens
+    :param name: template name, used in tracebacks
+    """
+    source = None
+    _render = None
+    _loops = None
+
+    def __init__(self, tokens, name=None):
+        self.source = TemplateCompiler().compile(tokens)
+        namespace = {"_var": _var, "_items": _items,
+                     "_FileValue": FileValue,
+                     "_TEXTTYPES": (types.StringType, types.UnicodeType)}
+        code = compile(self.source, "<template %s>" % name, "exec")
+        exec code in namespace
+        self._render = namespace["render"]
+        self._loops = namespace["LOOPS"]
+
+    def render(self, context):
+        """Format the template
+
+        :param context: dictionary of values
+        :rtype: string
+        """
+        return "".join(self._render(context))
+
+    def generate(self, context):
+        """Format the template part by part
+
+        :param context: dictionary of values
+        :returns: iterator of strings
+        """
+        return self._render(context)
+
+    def renderLoopItem(self, key, value):
+        """Format one item of the loop
+
+        :param key: loop name
+        :param value: dictionary of values of the item
+        :rtype: string
+        """
+        if key not in self._loops:
+            raise TemplateError("Loop <%s> not found" % key)
+        return "".join(self._loops[key](value))
+
+
 class TemplateProcessor:
     """Processor of the template class. This class is used for
 
@@ -251,34 +563,116 @@ class TemplateProcessor:
         - parsing (tokenizing) it to tokens object
         - setting values for each token
         - printing the result
+
+    The tokens are compiled to Python functions by
+    :class:`TemplateCompiler`, values are kept in a dictionary and the
+    tokens are never modified. With :attr:`interpreted`, the values are
+    set to the tokens and the tokens are printed.
+
+    Parsed tokens are shared by processors of the same template version
+    in the process, the interpreter copies them before setting the first
+    value.
+
+    .. attribute:: interpreted
+
+        Use the token interpreter instead of the compiled functions, mainly
+        for comparison
     """
     _compile = True
     _file = None
     _cfile = None
     template = None
+    tokens = None
     _vars = {}
-
-    def __init__(self, fileName=None, compile=True):
+    interpreted = False
+    compiled = None
+    _context = None
+    _stamps = None
+    _includes = None
+    _shared = False
+
+    def __init__(self, fileName=None, compile=True, interpreted=None):
         """Class constructor
 
         :param fileName: file name of the template
         :type fileName: string
         :param compile: Should this template be stored in compiled form?
         :type compile: boolean
+        :param interpreted: Use the token interpreter, default is
+            :attr:`interpreted` class attribute
+        :type interpreted: boolean
         """
 
         self._file = fileName
         self._compile = compile
+        self._context = {}
+        self._includes = []
+        if interpreted is not None:
+            self.interpreted = interpreted
 
         if self._file:
+            # the template was already parsed by this process
+            if self.isCached():
+                return
+
             # parse the file, if it is compiled and it should not be
-            # compiled by configuration and if it is up-to-date
+            # compiled by configuration and if it is up-to-date. The
+            # compiled file does not know the included files, parse the
+            # file again, if the process has seen them changing
             if self.isCompiled() and\
-                    self.isUpToDate():
-                self.readFromCompiled()
-            elif compile == True:
+                    self.isUpToDate() and\
+                    self._file not in _parsedTemplates:
+                try:
+                    self.readFromCompiled()
+                except Exception, e:
+                    logging.warning("Could not read compiled template %s: %s"
+                                    % (self._cfile, e))
+                    self.recompile()
+            elif compile == True or self._file in _parsedTemplates:
                 self.recompile()
 
+            if self.tokens is not None:
+                self._stamps = self._getStamps(
+                    [self._file] + self._includes)
+                _parsedTemplates[self._file] = (self._stamps, self.tokens)
+                self._shared = True
+
+    def isCached(self):
+        """Set self.tokens from the process-wide cache, if the template and
+        its included files did not change since they were parsed
+
+        :rtype: boolean
+        """
+        cached = _parsedTemplates.get(self._file)
+        if not cached:
+            return False
+        (stamps, tokens) = cached
+        if self._getStamps([path for (path, mtime) in stamps]) != stamps:
+            return False
+        self._stamps = stamps
+        self.tokens = tokens
+        self._shared = True
+        return True
+
+    def _getStamps(self, fileNames):
+        """Get modification times of the files, None for missing files
+
+        :returns: tuple of (file name, mtime) pairs
+        """
+        stamps = []
+        for fileName in fileNames:
+            try:
+                stamps.append((fileName, os.path.getmtime(fileName)))
+            except OSError:
+                stamps.append((fileName, None))
+        return tuple(stamps)
+
+    def _copyTokens(self):
+        """Copy the shared tokens before the interpreter sets values"""
+        if self._shared:
+            self.tokens = copy.deepcopy(self.tokens)
+            self._shared = False
+
     def readFromCompiled(self):
         """Set self.tokens from existing compiled file
         """
@@ -292,13 +686,27 @@ class TemplateProcessor:
         # parse input data
         self.tokens = self.tokenize(open(self._file, "r").read())
 
-        # store to binary form
+        # store to binary form, the template directory can be read-only
         if self._compile:
             try:
-                cPickle.dump(self.tokens, open(self._cfile, "w"), True)
+                (fd, tmpName) = tempfile.mkstemp(
+                    prefix=os.path.basename(self._cfile),
+                    dir=os.path.dirname(self._cfile))
+            except Exception, e:
+                logging.warning("Could not store template %s in compiled form: %s"
+                                % (self._file, e))
+                return
+            try:
+                tmpFile = os.fdopen(fd, "wb")
+                cPickle.dump(self.tokens, tmpFile, True)
+                tmpFile.close()
+                os.chmod(tmpName, 0644)
+                os.rename(tmpName, self._cfile)
             except Exception, e:
-                raise TemplateError(
-                    "Could not store file in compiled form: %s. Try to set permission for this directory to 777" % e)
+                logging.warning("Could not store template %s in compiled form: %s"
+                                % (self._file, e))
+                if os.path.exists(tmpName):
+                    os.remove(tmpName)
 
     def tokenize(self, templateData):
         """Tokenize input text data.
@@ -432,10 +840,11 @@ class TemplateProcessor:
         :return: list of tokens
         """
         (templateDir, fileName) = os.path.split(self._file)
+        includeFile = os.path.join(templateDir, INCDIR, token.value)
+        self._includes.append(includeFile)
 
         # use our tokenize method for this work
-        tokens = self.tokenize(
-            open(os.path.join(templateDir, INCDIR, token.value), "r").read())
+        tokens = self.tokenize(open(includeFile, "r").read())
         return tokens
 
     def _getLastIfToken(self, tokens):
@@ -562,9 +971,31 @@ class TemplateProcessor:
             # there is no source file -> always upToDate
             return True
 
+    def getCompiled(self):
+        """Get the tokens compiled to Python functions. Compiled templates
+        are shared by processors of the same template file version.
+
+        :rtype: :class:`CompiledTemplate`
+        """
+        if self.compiled:
+            return self.compiled
+
+        key = None
+        if self._file and self._stamps:
+            key = (self._file, self._stamps)
+            self.compiled = _compiledTemplates.get(key)
+        if not self.compiled:
+            self.compiled = CompiledTemplate(self.tokens, self._file)
+            if key:
+                _compiledTemplates[key] = self.compiled
+        return self.compiled
+
     def __str__(self):
         """Format this template to text form"""
 
+        if not self.interpreted:
+            return self.getCompiled().render(self._context)
+
         str = ""
         # construct the final string from string representation of each
         # token
@@ -572,6 +1003,17 @@ class TemplateProcessor:
             str += token.__str__()
         return str
 
+    def stream(self):
+        """Format this template to text chunks, :class:`FileValue` values
+        are not read into memory at once.
+
+        :rtype: :class:`TemplateStream`
+        """
+        if not self.interpreted:
+            return TemplateStream(self.getCompiled().generate, self._context)
+        text = self.__str__()
+        return TemplateStream(lambda context: [text])
+
     def _setVarValue(self, key, value, tokens, parent=None):
         """Set value of the VAR (or IF) type of token
 
@@ -667,6 +1109,91 @@ class TemplateProcessor:
 
         return tokens
 
+    def _getLoopToken(self, key, tokens=None):
+        """Find the loop token, also within IF tokens
+
+        :param key: loop name
+        :param tokens: list of tokens, where the search the right one
+        :returns: :class:`LoopToken` or None
+        """
+        if tokens is None:
+            tokens = self.tokens
+
+        for token in tokens:
+            if token.type == "loop" and token.name == key:
+                return token
+            if token.type == "if":
+                loopToken = self._getLoopToken(key, token._childs)
+                if loopToken:
+                    return loopToken
+        return None
+
+    def renderLoopItem(self, key, value):
+        """Format one item of the loop to text form, without setting the
+        loop value. The text can then be given to :meth:`setRendered`.
+
+        :param key: loop name
+        :type key: string
+        :param value: values of the loop item
+        :type value: dict
+        :rtype: string
+        """
+        if not self.interpreted:
+            return self.getCompiled().renderLoopItem(key, value)
+
+        token = self._getLoopToken(key)
+        if not token:
+            raise TemplateError("Loop <%s> not found" % key)
+
+        childs = copy.deepcopy(token._childs[:])
+        for name in value:
+            childs = self.set(name, value[name], childs, token)
+
+        text = ""
+        for child in childs:
+            text += child.__str__()
+        return text
+
+    def setRendered(self, key, texts, tokens=None):
+        """Set value of the loop token from items already formated with
+        :meth:`renderLoopItem`
+
+        :param key: loop name
+        :type key: string
+        :param texts: formated loop items
+        :type texts: [string]
+        :param tokens: list of tokens, where the search the right one
+        :returns: list of tokens (with value set to desired value)
+        """
+
+        if not self.interpreted and tokens is None:
+            self._context[key] = list(texts)
+            return self.tokens
+
+        if not tokens:
+            self._copyTokens()
+            tokens = self.tokens
+
+        for token in tokens:
+            if token.type == "if" and \
+                    token.name == key:
+                token.setValue(texts)
+
+            if token.type == "if":
+                self.setRendered(key, texts, token._childs)
+
+            if token.type == "loop" and token.name == key:
+                newValues = []
+                for text in texts:
+                    textToken = Token()
+                    textToken.setValue(text)
+                    textToken.closed = True
+                    newValues.append([textToken])
+                token.setValue(newValues)
+                token.setParent(token.parent)
+
+        return tokens
+
     def set(self, key, value, tokens=None, parent=None):
         """Set value of some token
 
@@ -680,12 +1207,22 @@ class TemplateProcessor:
         :returns: list of tokens (with value set to desired value)
         """
 
+        # only keep the value, it is used by the compiled template
+        if not self.interpreted and tokens is None and parent is None:
+            if type(value) not in VARTYPES and type(value) != type([]) and \
+                    not isinstance(value, FileValue):
+                raise TemplateError("Unknown data type %s of '%s'" %
+                                    (type(value), value))
+            self._context[key] = value
+            return self.tokens
+
         # work on the top level, if on tokens are defined
         if not tokens:
+            self._copyTokens()
             tokens = self.tokens
 
         # consider, if we are supposed to set normal token or LOOP token
-        if type(value) in VARTYPES:
+        if type(value) in VARTYPES or isinstance(value, FileValue):
             return self._setVarValue(key, value, tokens, parent)
         elif type(value) == type([]):
             return self._setLoopValue(key, value, tokens)
@@ -28,6 +28,13 @@ import os
 import types
 import traceback
 import logging
+from collections import OrderedDict
+
+# formated ProcessDescription blocks by (template file, language,
+# configuration fingerprint, process scope, process identifier):
+# (process fingerprint, text), the least recently used are dropped
+_fragments = OrderedDict()
+MAXFRAGMENTS = 1000
 
 
 class DescribeProcess(Request):
@@ -56,7 +63,8 @@ class DescribeProcess(Request):
         # Processes
         #
 
-        self.templateProcessor.set("Processes", self.processesDescription())
+        self.templateProcessor.setRendered("Processes",
+                                           self.processesFragments())
         self.response = self.templateProcessor.__str__()
 
         return
@@ -72,44 +80,88 @@ class DescribeProcess(Request):
 
         # Import processes
         for process in self.getProcesses(self.wps.inputs["identifier"]):
-            processData = {}
-            process.lang.setCode(self.wps.inputs["language"])
-
-            processData["processok"] = 1
-            processData["identifier"] = process.identifier
-            processData["title"] = process.i18n(process.title)
-            if process.abstract:
-                processData["abstract"] = process.i18n(process.abstract)
-            if process.metadata:
-                processData["Metadata"] = self.formatMetadata(process)
-            if process.profile:
-                profiles = []
-                if type(process.profile) == types.ListType:
-                    for profile in process.profile:
-                        profiles.append({"profile": profile})
-                else:
-                    profiles.append({"profile": process.profile})
-                processData["Profiles"] = profiles
-            if process.wsdl:
-                processData["wsdl"] = process.wsdl
-            if process.storeSupported == True:
-                processData["store"] = 'true'
-            else:
-                processData["store"] = 'false'
-            if process.statusSupported == True:
-                processData["status"] = 'true'
-            else:
-                processData["status"] = 'false'
-            if process.version:
-                processData["processversion"] = process.version
+            processesData.append(self.processDescription(process))
+        return processesData
 
-            processData["Datainputs"] = self.processInputs(process)
-            processData["datainputslen"] = len(processData["Datainputs"])
+    def processesFragments(self):
+        """Format process description blocks to text form. The text of
+        processes with :attr:`pywps.Process.WPSProcess.fingerprint` is
+        taken from the cache, if the fingerprint did not change.
 
-            processData["Dataoutputs"] = self.processOutputs(process)
-            processData["dataoutputslen"] = len(processData["Dataoutputs"])
-            processesData.append(processData)
-        return processesData
+        :return: list of strings, which is to be used for
+            :func:`pywps.Template.TemplateProcessor.setRendered`
+        """
+
+        fragments = []
+        configFingerprint = config.getSnapshot().fingerprint
+        # the process is only created, if its description is not cached
+        for summary in self.getProcessSummaries(self.wps.inputs["identifier"]):
+            fingerprint = summary.fingerprint
+            key = (self.templateFile, self.wps.inputs["language"],
+                   configFingerprint, summary.scope, summary.identifier)
+            if fingerprint:
+                cached = _fragments.pop(key, None)
+                if cached and cached[0] == fingerprint:
+                    _fragments[key] = cached
+                    fragments.append(cached[1])
+                    continue
+
+            process = summary
+            if type(process) != types.InstanceType:
+                process = self.getProcess(summary.identifier)
+            fragment = self.templateProcessor.renderLoopItem(
+                "Processes", self.processDescription(process))
+            if fingerprint:
+                _fragments[key] = (fingerprint, fragment)
+                while len(_fragments) > MAXFRAGMENTS:
+                    _fragments.popitem(last=False)
+            fragments.append(fragment)
+        return fragments
+
+    def processDescription(self, process):
+        """Format description block of one process
+
+        :return: dictionary, which is to be used for
+            :func:`pywps.Template.TemplateProcessor.set`
+        """
+
+        processData = {}
+        process.lang.setCode(self.wps.inputs["language"])
+
+        processData["processok"] = 1
+        processData["identifier"] = process.identifier
+        processData["title"] = process.i18n(process.title)
+        if process.abstract:
+            processData["abstract"] = process.i18n(process.abstract)
+        if process.metadata:
+            processData["Metadata"] = self.formatMetadata(process)
+        if process.profile:
+            profiles = []
+            if type(process.profile) == types.ListType:
+                for profile in process.profile:
+                    profiles.append({"profile": profile})
+            else:
+                profiles.append({"profile": process.profile})
+            processData["Profiles"] = profiles
+        if process.wsdl:
+            processData["wsdl"] = process.wsdl
+        if process.storeSupported == True:
+            processData["store"] = 'true'
+        else:
+            processData["store"] = 'false'
+        if process.statusSupported == True:
+            processData["status"] = 'true'
+        else:
+            processData["status"] = 'false'
+        if process.version:
+            processData["processversion"] = process.version
+
+        processData["Datainputs"] = self.processInputs(process)
+        processData["datainputslen"] = len(processData["Datainputs"])
+
+        processData["Dataoutputs"] = self.processOutputs(process)
+        processData["dataoutputslen"] = len(processData["Dataoutputs"])
+        return processData
 
     def processInputs(self, process):
         """Format process inputs block
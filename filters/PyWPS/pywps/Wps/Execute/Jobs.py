@@ -0,0 +1,259 @@
+"""
+Store of the Execute jobs
+
+Every Execute request is recorded in a SQLite database: its status
+transitions, timings, process identifier, size of the input files and the
+stored output files. Jobs can be monitored and cleaned up from the store,
+without reading the status documents in `outputPath`.
+
+The store is configured in the `[server]` section:
+
+    jobstore
+        SQLite database file, default `pywps-jobs.sqlite` in `tempPath`,
+        empty value disables the store
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from pywps import config
+import os
+import threading
+import time
+try:
+    import json
+except ImportError:
+    import simplejson as json
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+JOBSFILE = "pywps-jobs.sqlite"
+
+# seconds to wait for the database locked by other process
+TIMEOUT = 10
+
+# final states
+FINISHED = ("processsucceeded", "processfailed")
+
+# maximal number of listed jobs
+MAXLIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    jobid TEXT PRIMARY KEY,
+    identifier TEXT,
+    status TEXT,
+    message TEXT,
+    percent INTEGER,
+    pid INTEGER,
+    statuslocation TEXT,
+    inputsize INTEGER,
+    outputs TEXT,
+    created REAL,
+    started REAL,
+    finished REAL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated);
+CREATE TABLE IF NOT EXISTS transitions (
+    jobid TEXT,
+    status TEXT,
+    time REAL
+);
+CREATE INDEX IF NOT EXISTS transitions_jobid ON transitions (jobid);
+"""
+
+# connections by database file, in this process
+_stores = {}
+
+
+class JobStore:
+    """Store of the Execute jobs
+
+    :param fileName: SQLite database file
+    """
+
+    fileName = None
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self._local = threading.local()
+
+    def connect(self):
+        """Get connection, create the database, if it does not exist. Every
+        thread has its own connection, the connection of the parent process
+        is not used by forked workers."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.fileName, timeout=TIMEOUT,
+                                         isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.executescript(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def record(self, jobId, status, identifier=None, message=None,
+               percent=None, statusLocation=None, inputSize=None):
+        """Record status transition of the job
+
+        :param jobId: job identifier, e.g. `pywps-<uuid>`
+        :param status: new status, e.g. `processstarted`
+        """
+        now = time.time()
+        values = {"status": status, "updated": now, "pid": os.getpid(),
+                  "identifier": identifier, "message": message,
+                  "percent": percent, "statuslocation": statusLocation,
+                  "inputsize": inputSize}
+        values = dict([(key, value) for (key, value) in values.items()
+                       if value is not None])
+
+        connection = self.connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR IGNORE INTO jobs (jobid, created) VALUES (?, ?)",
+                (jobId, now))
+            assignments = ["%s = ?" % key for key in values.keys()]
+            if status == "processstarted":
+                assignments.append("started = COALESCE(started, %r)" % now)
+            elif status in FINISHED:
+                assignments.append("finished = %r" % now)
+            connection.execute(
+                "UPDATE jobs SET %s WHERE jobid = ?" % ", ".join(assignments),
+                values.values() + [jobId])
+            connection.execute(
+                "INSERT INTO transitions (jobid, status, time) VALUES (?, ?, ?)",
+                (jobId, status, now))
+            connection.execute("COMMIT")
+        except:
+            connection.execute("ROLLBACK")
+            raise
+
+    def setOutputs(self, jobId, outputs):
+        """Record stored output files of the job
+
+        :param outputs: dictionary of output identifiers and file names
+        """
+        self.connect().execute(
+            "UPDATE jobs SET outputs = ?, updated = ? WHERE jobid = ?",
+            (json.dumps(outputs), time.time(), jobId))
+
+    def get(self, jobId):
+        """Get the job with its transitions
+
+        :rtype: dict or None
+        """
+        connection = self.connect()
+        row = connection.execute("SELECT * FROM jobs WHERE jobid = ?",
+                                 (jobId,)).fetchone()
+        if row is None:
+            return None
+        job = self._toDict(row)
+        job["transitions"] = [
+            {"status": status, "time": transitionTime}
+            for (status, transitionTime) in connection.execute(
+                "SELECT status, time FROM transitions WHERE jobid = ? "
+                "ORDER BY time, rowid", (jobId,))]
+        return job
+
+    def list(self, status=None, identifier=None, limit=100, offset=0):
+        """List jobs, the newest first
+
+        :param status: only jobs in the status
+        :param identifier: only jobs of the process
+        :param limit: number of jobs, at most :data:`MAXLIMIT`
+        :rtype: list of dict
+        """
+        limit = min(max(limit, 0), MAXLIMIT)
+        offset = max(offset, 0)
+        conditions = []
+        arguments = []
+        if status:
+            conditions.append("status = ?")
+            arguments.append(status)
+        if identifier:
+            conditions.append("identifier = ?")
+            arguments.append(identifier)
+        query = "SELECT * FROM jobs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created DESC LIMIT ? OFFSET ?"
+        return [self._toDict(row) for row in self.connect().execute(
+            query, arguments + [limit, offset])]
+
+    def getActive(self):
+        """Get the jobs, which are not finished
+
+        :returns: dictionary of job identifiers and the pids of the
+            processes, which have recorded them last
+        """
+        condition = "status NOT IN (%s)" % ", ".join(["?"] * len(FINISHED))
+        return dict(self.connect().execute(
+            "SELECT jobid, pid FROM jobs WHERE %s" % condition,
+            list(FINISHED)).fetchall())
+
+    def prune(self, before):
+        """Remove finished jobs with their transitions
+
+        :param before: time of the last update of the removed jobs
+        :returns: number of removed jobs
+        """
+        connection = self.connect()
+        condition = "status IN (%s) AND updated < ?" % \
+            ", ".join(["?"] * len(FINISHED))
+        arguments = list(FINISHED) + [before]
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM transitions WHERE jobid IN "
+                "(SELECT jobid FROM jobs WHERE %s)" % condition, arguments)
+            removed = connection.execute(
+                "DELETE FROM jobs WHERE %s" % condition, arguments).rowcount
+            connection.execute("COMMIT")
+        except:
+            connection.execute("ROLLBACK")
+            raise
+        return removed
+
+    def _toDict(self, row):
+        job = dict(zip(row.keys(), row))
+        job["outputs"] = json.loads(job["outputs"] or "{}")
+        return job
+
+
+def getJobStore():
+    """Get the job store configured in the `[server]` section
+
+    :returns: :class:`JobStore` or None, if disabled
+    """
+    if sqlite3 is None:
+        return None
+    if config.config.has_option("server", "jobstore"):
+        fileName = config.getConfigValue("server", "jobstore")
+        if not fileName:
+            return None
+    else:
+        fileName = os.path.join(config.getConfigValue("server", "tempPath"),
+                                JOBSFILE)
+    if fileName not in _stores:
+        _stores[fileName] = JobStore(fileName)
+    return _stores[fileName]
@@ -0,0 +1,339 @@
+"""
+Pool of long-lived worker processes running asynchronous Execute requests
+
+The workers are forked from the server process, so they start with
+everything the server has already loaded and initialized (PyWPS, QGIS,
+Processing algorithms). The jobs are sent to the workers through a local
+queue, instead of spawning new Python interpreter for each request.
+
+The pool is configured in the `[server]` section:
+
+    workers
+        number of workers, 0 spawns new Python interpreter for each
+        request. Use the pool only in long-lived servers.
+
+    workermaxjobs
+        number of jobs, after which the worker is replaced, 0 for no limit
+
+    workermaxrss
+        resident memory size (e.g. 1gb), after which the worker is
+        replaced, 0 for no limit
+
+Workers are replaced, when next job is submitted. Jobs still queued, when
+the pool is stopped, are spawned in new Python interpreters.
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from pywps import config
+import os
+import sys
+import time
+import atexit
+import pickle
+import logging
+import traceback
+import multiprocessing
+import subprocess
+import Queue
+
+# seconds between checks of the pool generation and of the parent process
+# by waiting workers
+POLLINTERVAL = 1
+
+_pool = None
+
+
+def getRss():
+    """Resident memory size of this process in bytes"""
+    try:
+        statm = open("/proc/self/statm").read().split()
+        return int(statm[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, IndexError, ValueError, OSError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def execute(pickleFileName, processes=None, snapshot=None):
+    """Run stored asynchronous Execute request, like the spawned
+    interpreter does
+
+    :param pickleFileName: file with pickled :class:`pywps.Pywps` instance
+    :param processes: processes given to the Execute request
+    :param snapshot: :class:`pywps.config.ConfigSnapshot` of the server
+    """
+    import pywps
+    from pywps.Wps.Execute import Execute
+
+    if snapshot:
+        config._setSnapshot(snapshot)
+    wps = pickle.load(open(pickleFileName))
+    wps.setLogFile()
+
+    logging.info(
+        "Worker %d started, continuting to execute the process" % os.getpid())
+    # fix some inputs
+    wps.inputs["responseform"]["responsedocument"]["status"] = False
+
+    if isinstance(wps, pywps.Pywps):
+        Execute(wps, processes=processes, spawned=True)
+
+
+def spawn(pickleFileName, outputFileName=None):
+    """Run stored asynchronous Execute request in new Python interpreter,
+    like Execute does without the pool
+
+    :param outputFileName: status document, the error is written to it, if
+        the request can not be loaded
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "__init__.py")
+    devnull = open(os.devnull, "w")
+    subprocess.Popen([sys.executable, script, pickleFileName,
+                      outputFileName or os.devnull],
+                     stdout=devnull, stderr=devnull)
+    devnull.close()
+
+
+def work(queue, generation, myGeneration, maxJobs=0, maxRss=0):
+    """Main loop of the worker process
+
+    :param queue: queue of pickled jobs
+    :param generation: shared pool generation, the worker stops, when it
+        changes
+    :param myGeneration: pool generation, when the worker was started
+    :param maxJobs: number of jobs, after which the worker stops
+    :param maxRss: resident memory size, after which the worker stops
+    """
+    import pywps
+
+    # like the spawned interpreter, the worker does not write to the
+    # server output
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+
+    parent = os.getppid()
+    jobs = 0
+    while generation.value == myGeneration and os.getppid() == parent:
+        try:
+            job = queue.get(timeout=POLLINTERVAL)
+        except Queue.Empty:
+            continue
+
+        # the pool was recycled, while we were waiting for the job, the
+        # new workers or the stopped pool take it
+        if generation.value != myGeneration:
+            queue.put(job)
+            break
+
+        try:
+            (pickleFileName, processes, snapshot, outputFileName) = \
+                pickle.loads(job)
+            execute(pickleFileName, processes, snapshot)
+        except Exception, e:
+            traceback.print_exc(file=pywps.logFile)
+            logging.error("Worker %d: job failed: %s" % (os.getpid(), e))
+
+        jobs += 1
+        if maxJobs and jobs >= maxJobs:
+            logging.info("Worker %d: %d jobs done, exiting" %
+                         (os.getpid(), jobs))
+            break
+        if maxRss and getRss() > maxRss:
+            logging.info("Worker %d: memory limit exceeded, exiting" %
+                         os.getpid())
+            break
+
+
+class WorkerPool:
+    """Pool of forked worker processes
+
+    :param size: number of workers
+    :param maxJobs: number of jobs, after which the worker is replaced
+    :param maxRss: resident memory size in bytes, after which the worker is
+        replaced
+
+    .. attribute:: started
+
+        number of started workers
+
+    .. attribute:: submitted
+
+        number of submitted jobs
+    """
+
+    size = 0
+    maxJobs = 0
+    maxRss = 0
+    started = 0
+    submitted = 0
+
+    def __init__(self, size, maxJobs=0, maxRss=0):
+        self.size = size
+        self.maxJobs = maxJobs
+        self.maxRss = maxRss
+        self._queue = multiprocessing.Queue()
+        self._generation = multiprocessing.Value("i", 0)
+        self._workers = []
+
+    def maintain(self):
+        """Forget stopped workers, start new ones up to the pool size"""
+        # join stopped workers, also the recycled ones
+        multiprocessing.active_children()
+        self._workers = [worker for worker in self._workers
+                         if worker.is_alive()]
+        while len(self._workers) < self.size:
+            worker = multiprocessing.Process(
+                target=work,
+                args=(self._queue, self._generation,
+                      self._generation.value, self.maxJobs, self.maxRss))
+            worker.start()
+            self.started += 1
+            logging.debug("Worker %d started" % worker.pid)
+            self._workers.append(worker)
+
+    def submit(self, pickleFileName, processes=None, outputFileName=None):
+        """Send stored Execute request to the workers
+
+        :param pickleFileName: file with pickled :class:`pywps.Pywps`
+            instance
+        :param processes: processes of the request, they have to be
+            pickled, e.g. :class:`pywps.Wps.ProcessProvider`
+        :param outputFileName: status document of the request
+        :returns: True if the job was queued
+        """
+        try:
+            job = pickle.dumps((pickleFileName, processes,
+                                config.getSnapshot(), outputFileName),
+                               pickle.HIGHEST_PROTOCOL)
+        except Exception, e:
+            logging.warning("Job can not be sent to the workers: %s" % e)
+            return False
+
+        try:
+            self.maintain()
+            self._queue.put(job)
+        except Exception, e:
+            logging.warning("Job can not be sent to the workers: %s" % e)
+            return False
+        self.submitted += 1
+        return True
+
+    def recycle(self):
+        """Replace every worker, e.g. when the server has loaded new
+        processes. Running jobs are finished first, the new workers take
+        the queued jobs."""
+        self._generation.value += 1
+        self._workers = []
+        self.maintain()
+
+    def stop(self, timeout=None):
+        """Stop the workers, wait for running jobs. The jobs still queued
+        are spawned in new interpreters.
+
+        :param timeout: maximal time to wait in seconds
+        :returns: number of spawned jobs
+        """
+        workers = [worker for worker in self._workers]
+        self._generation.value += 1
+        self._workers = []
+        # waiting workers put back the job they have got meanwhile
+        end = None
+        if timeout is not None:
+            end = time.time() + max(timeout, 2 * POLLINTERVAL)
+        for worker in workers:
+            if end is None:
+                worker.join()
+            else:
+                worker.join(max(end - time.time(), 0))
+
+        spawned = 0
+        while True:
+            try:
+                job = self._queue.get(timeout=0.1)
+            except Queue.Empty:
+                break
+            try:
+                (pickleFileName, processes, snapshot, outputFileName) = \
+                    pickle.loads(job)
+                spawn(pickleFileName, outputFileName)
+                spawned += 1
+            except Exception, e:
+                logging.error("Queued job can not be spawned: %s" % e)
+        if spawned:
+            logging.info("%d queued jobs spawned" % spawned)
+        return spawned
+
+
+def getPool():
+    """Get the pool configured in the `[server]` section
+
+    :returns: :class:`WorkerPool` or None, if there are no workers
+        configured
+    """
+    global _pool
+
+    if os.name != "posix" or \
+            not config.config.has_option("server", "workers"):
+        return None
+
+    size = int(config.getConfigValue("server", "workers") or 0)
+    maxJobs = 0
+    maxRss = 0
+    if config.config.has_option("server", "workermaxjobs"):
+        maxJobs = int(config.getConfigValue("server", "workermaxjobs") or 0)
+    if config.config.has_option("server", "workermaxrss"):
+        maxRss = config.getSize(
+            config.getConfigValue("server", "workermaxrss"))
+
+    # the configuration has changed, replace the workers, queued jobs are
+    # kept, or spawned, if the pool is disabled
+    if _pool is not None and (_pool.size, _pool.maxJobs, _pool.maxRss) != \
+            (size, maxJobs, maxRss):
+        (_pool.size, _pool.maxJobs, _pool.maxRss) = (size, maxJobs, maxRss)
+        if size:
+            _pool.recycle()
+        else:
+            _pool.stop(0)
+
+    if not size:
+        return None
+    if _pool is None:
+        _pool = WorkerPool(size, maxJobs, maxRss)
+        atexit.register(_pool.stop)
+    return _pool
+
+
+def submit(pickleFileName, processes=None, outputFileName=None):
+    """Send stored Execute request to the configured pool
+
+    :returns: True if the job was queued, False if the request should be
+        spawned
+    """
+    pool = getPool()
+    if pool is None:
+        return False
+    return pool.submit(pickleFileName, processes, outputFileName)
+
+
+def recycle():
+    """Replace the workers of the pool, if there is any"""
+    if _pool is not None:
+        _pool.recycle()
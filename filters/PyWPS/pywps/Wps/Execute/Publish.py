@@ -0,0 +1,127 @@
+"""
+Publishing of the Execute output files
+
+Output files are published to `outputPath` without copying them, when it
+is possible. The method is chosen by the location of the file:
+
+    rename
+        the temporary file is moved, when it is on the filesystem of
+        `outputPath`
+    hardlink
+        the other files on the filesystem of `outputPath` are linked
+    reflink
+        copy-on-write clone of the file, when the hard link fails, e.g.
+        with too many links to the file or on a filesystem without hard
+        links. Cloning needs a filesystem supporting it, like btrfs or XFS
+        on Linux
+    copy
+        files on other filesystems are copied
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+import os
+import logging
+from shutil import copyfile as COPY
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RENAME = "rename"
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+COPYFILE = "copy"
+
+# Linux ioctl cloning the file content
+FICLONE = 0x40049409
+
+# methods used in this process, by name
+stats = {}
+
+
+def isSameFilesystem(fileName, dirName):
+    """Check, if the file can be renamed or linked to the directory
+
+    :rtype: boolean
+    """
+    try:
+        return os.stat(fileName).st_dev == os.stat(dirName).st_dev
+    except OSError:
+        return False
+
+
+def reflink(source, target):
+    """Clone the source file to the target file
+
+    :raises: IOError, if the filesystem does not support it
+    """
+    if fcntl is None:
+        raise IOError("reflink is not supported")
+    with open(source, "rb") as src:
+        with open(target, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except IOError:
+                dst.close()
+                os.remove(target)
+                raise
+
+
+def publishFile(source, target, temporary=False):
+    """Publish the source file as the target file, an existing target file
+    is replaced
+
+    :param temporary: the source file is removed afterwards, it can be
+        moved
+    :returns: method used, one of RENAME, HARDLINK, REFLINK, COPYFILE
+    """
+    method = COPYFILE
+    if isSameFilesystem(source, os.path.dirname(os.path.abspath(target))):
+        if temporary:
+            try:
+                os.rename(source, target)
+                method = RENAME
+            except OSError:
+                pass
+        if method == COPYFILE:
+            # link to a new name, which replaces the target atomically
+            tmpTarget = "%s.%d.tmp" % (target, os.getpid())
+            try:
+                os.link(source, tmpTarget)
+                method = HARDLINK
+            except OSError:
+                try:
+                    reflink(source, tmpTarget)
+                    method = REFLINK
+                except (IOError, OSError):
+                    pass
+            if method != COPYFILE:
+                try:
+                    os.rename(tmpTarget, target)
+                except OSError:
+                    os.remove(tmpTarget)
+                    method = COPYFILE
+    if method == COPYFILE:
+        COPY(source, target)
+
+    stats[method] = stats.get(method, 0) + 1
+    logging.info("Output %s published by %s" %
+                 (os.path.basename(target), method))
+    return method
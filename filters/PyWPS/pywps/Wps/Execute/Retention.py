@@ -0,0 +1,444 @@
+"""
+Retention of the files in `outputPath` and `tempPath`
+
+Status documents, QGIS projects and output files in `outputPath` are removed
+after their time to live, then the least recently used ones, until
+`outputPath` is smaller than the quota. Request and state files and working
+directories in `tempPath` are removed after their time to live.
+
+Files of the running jobs are kept: status documents, request and state
+files of the jobs, which are not finished in the job store, and working
+directories of the running processes.
+
+The retention is configured in the `[server]` section, times are in
+seconds or with unit (s, m, h, d), 0 keeps the files:
+
+    statusttl
+        status documents, `pywps-<uuid>.xml`, and the finished jobs in the
+        job store
+    projectttl
+        QGIS projects of the OWS outputs, `.qgs`
+    outputttl
+        other files in `outputPath`
+    tempttl
+        `request-<uuid>`, `state-pywps-<uuid>` and `pywps-instance` working
+        directories in `tempPath`
+    outputquota
+        maximal size of `outputPath`, e.g. 10gb, 0 for no limit
+    retentioninterval
+        time between the sweeps of the background sweeper, 0 disables it,
+        default is 0
+
+One sweep runs at a time, the reclaimed files and bytes are summed up in
+`pywps-retention.json` in `tempPath`. The sweep can run standalone, e.g.
+from cron::
+
+    PYWPS_CFG=/etc/pywps.cfg python -m pywps.Wps.Execute.Retention
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+import os
+import re
+import sys
+import stat
+import time
+import errno
+import shutil
+import threading
+try:
+    import json
+except ImportError:
+    import simplejson as json
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+if __name__ == "__main__":
+    sys.path[0] = os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), "..", "..", "..")
+
+from pywps import config
+from pywps.Wps.Execute import Jobs
+
+STATEFILE = "pywps-retention.json"
+LOCKFILE = "pywps-retention.lock"
+
+# file types
+STATUS = "status"
+PROJECT = "project"
+OUTPUT = "output"
+TEMP = "temp"
+
+TTLOPTIONS = {STATUS: "statusttl", PROJECT: "projectttl",
+              OUTPUT: "outputttl", TEMP: "tempttl"}
+
+# files removed between pauses of the sweep, which gives way to the requests
+BATCHSIZE = 100
+PAUSE = 0.01
+
+STATUSNAME = re.compile(r"^pywps-[0-9a-fA-F-]+\.xml$")
+TEMPPREFIXES = ("request-", "state-pywps-", "pywps-instance")
+# working directory of the process, pywps-instance<pid>-
+WORKINGDIR = re.compile(r"^pywps-instance(\d+)-")
+
+_sweeper = None
+
+
+def getDuration(value):
+    """Convert time with units (s, m, h, d) to seconds
+
+    :param value: time, e.g. 7d
+    :rtype: float
+    """
+    value = str(value).strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value and value[-1] in units:
+        return float(value[:-1] or 0) * units[value[-1]]
+    return float(value or 0)
+
+
+def getFileType(name):
+    """Get the type of the file in `outputPath`"""
+    if name.endswith(".qgs") or name.endswith(".qgs~"):
+        return PROJECT
+    if STATUSNAME.match(name):
+        return STATUS
+    return OUTPUT
+
+
+def _getUsed(st):
+    # listing of the directory by the sweep updates its access time
+    if stat.S_ISDIR(st.st_mode):
+        return st.st_mtime
+    return max(st.st_atime, st.st_mtime)
+
+
+def isRunning(pid):
+    """Check, if the process is running"""
+    try:
+        os.kill(pid, 0)
+    except OSError, e:
+        return e.errno == errno.EPERM
+    return True
+
+
+def getJobId(name):
+    """Get the job of the file, `pywps-<uuid>`, None if it is not a file
+    of a job"""
+    if STATUSNAME.match(name):
+        return name[:-len(".xml")]
+    for prefix in ("request-", "state-"):
+        if name.startswith(prefix):
+            jobId = name[len(prefix):]
+            if not jobId.startswith("pywps-"):
+                jobId = "pywps-" + jobId
+            return jobId
+    return None
+
+
+def getUsage(path):
+    """Get size and last use time of the file or directory, the last
+    access or modification of any file in it
+
+    :returns: (size, time)
+    """
+    st = os.lstat(path)
+    size = st.st_size
+    used = _getUsed(st)
+    if stat.S_ISDIR(st.st_mode):
+        for (dirPath, dirNames, fileNames) in os.walk(path):
+            for name in dirNames + fileNames:
+                try:
+                    st = os.lstat(os.path.join(dirPath, name))
+                except OSError:
+                    continue
+                size += st.st_size
+                used = max(used, _getUsed(st))
+    return (size, used)
+
+
+class Retention:
+    """Retention of the files in the output and temporary directories
+
+    :param outputPath: directory with the outputs
+    :param tempPath: directory with the temporary files
+    :param ttls: time to live in seconds by file type, 0 keeps them
+    :param quota: maximal size of the outputs in bytes, 0 for no limit
+    :param jobStore: :class:`pywps.Wps.Execute.Jobs.JobStore`, its finished
+        jobs are removed with their status documents
+    """
+
+    outputPath = None
+    tempPath = None
+    ttls = None
+    quota = 0
+    jobStore = None
+
+    def __init__(self, outputPath, tempPath, ttls={}, quota=0,
+                 jobStore=None):
+        self.outputPath = outputPath
+        self.tempPath = tempPath
+        self.ttls = ttls
+        self.quota = quota
+        self.jobStore = jobStore
+
+    def sweep(self, now=None):
+        """Remove the expired files, then the least recently used outputs
+        over the quota
+
+        :returns: metrics of the sweep, None if other sweep is running
+        """
+        lockFile = self._lock()
+        if lockFile is False:
+            return None
+        try:
+            start = time.time()
+            if now is None:
+                now = start
+            metrics = {"files": 0, "bytes": 0, "types": {}, "jobs": 0,
+                       "running": 0}
+            self._active = self._getActive()
+
+            outputs = []
+            for (name, path) in self._list(self.outputPath):
+                fileType = getFileType(name)
+                # state of the server, if tempPath is outputPath
+                if name.startswith(TEMPPREFIXES) or \
+                        (name.startswith("pywps-") and fileType == OUTPUT):
+                    continue
+                if self._isRunning(name):
+                    metrics["running"] += 1
+                    continue
+                try:
+                    (size, used) = getUsage(path)
+                except OSError:
+                    continue
+                outputs.append((used, size, fileType, path))
+            for (name, path) in self._list(self.tempPath):
+                if name.startswith(TEMPPREFIXES):
+                    if self._isRunning(name):
+                        metrics["running"] += 1
+                        continue
+                    try:
+                        (size, used) = getUsage(path)
+                    except OSError:
+                        continue
+                    self._expire(metrics, TEMP, path, size, used, now)
+
+            kept = []
+            for (used, size, fileType, path) in outputs:
+                if not self._expire(metrics, fileType, path, size, used, now):
+                    kept.append((used, size, fileType, path))
+
+            total = sum([size for (used, size, fileType, path) in kept])
+            if self.quota:
+                kept.sort()
+                while kept and total > self.quota:
+                    (used, size, fileType, path) = kept.pop(0)
+                    self._remove(metrics, fileType, path, size)
+                    total -= size
+
+            statusTtl = self.ttls.get(STATUS, 0)
+            if self.jobStore and statusTtl:
+                try:
+                    metrics["jobs"] = self.jobStore.prune(now - statusTtl)
+                except Exception:
+                    # the store is not available, next sweep will try again
+                    pass
+
+            metrics["outputsize"] = total
+            metrics["duration"] = time.time() - start
+            self._update(metrics, now)
+            return metrics
+        finally:
+            if lockFile:
+                lockFile.close()
+
+    def getMetrics(self):
+        """Get the metrics summed up over the sweeps
+
+        :rtype: dict
+        """
+        try:
+            with open(os.path.join(self.tempPath, STATEFILE)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {"sweeps": 0, "files": 0, "bytes": 0, "types": {},
+                    "jobs": 0}
+
+    def _getActive(self):
+        """Get the jobs, which are not finished, by the job store, with the
+        pids of their processes"""
+        if self.jobStore is None:
+            return {}
+        try:
+            return self.jobStore.getActive()
+        except Exception:
+            # the store is not available, the files are kept
+            return None
+
+    def _isRunning(self, name):
+        """Check, if the file belongs to a running job or process"""
+        match = WORKINGDIR.match(name)
+        if match:
+            return isRunning(int(match.group(1)))
+        jobId = getJobId(name)
+        if jobId is None:
+            return False
+        if self._active is None:
+            return True
+        pid = self._active.get(jobId)
+        # the process of the job has stopped without finishing it
+        return pid is not None and isRunning(pid)
+
+    def _list(self, path):
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return []
+        return [(name, os.path.join(path, name)) for name in names]
+
+    def _expire(self, metrics, fileType, path, size, used, now):
+        ttl = self.ttls.get(fileType, 0)
+        if ttl and now - used > ttl:
+            self._remove(metrics, fileType, path, size)
+            return True
+        return False
+
+    def _remove(self, metrics, fileType, path, size):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            # removed by the other process meanwhile
+            return
+        metrics["files"] += 1
+        metrics["bytes"] += size
+        typeMetrics = metrics["types"].setdefault(
+            fileType, {"files": 0, "bytes": 0})
+        typeMetrics["files"] += 1
+        typeMetrics["bytes"] += size
+        if metrics["files"] % BATCHSIZE == 0:
+            time.sleep(PAUSE)
+
+    def _lock(self):
+        """Lock the sweep, returns False, if it is locked by other
+        process, None if locks are not supported"""
+        if fcntl is None:
+            return None
+        lockFile = open(os.path.join(self.tempPath, LOCKFILE), "a")
+        # the programs started meanwhile by the server must not keep the lock
+        flags = fcntl.fcntl(lockFile.fileno(), fcntl.F_GETFD)
+        fcntl.fcntl(lockFile.fileno(), fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+        try:
+            fcntl.flock(lockFile.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            lockFile.close()
+            return False
+        return lockFile
+
+    def _update(self, metrics, now):
+        state = self.getMetrics()
+        state["sweeps"] += 1
+        state["files"] += metrics["files"]
+        state["bytes"] += metrics["bytes"]
+        state["jobs"] = state.get("jobs", 0) + metrics["jobs"]
+        for (fileType, typeMetrics) in metrics["types"].items():
+            summed = state["types"].setdefault(
+                fileType, {"files": 0, "bytes": 0})
+            summed["files"] += typeMetrics["files"]
+            summed["bytes"] += typeMetrics["bytes"]
+        state["lastsweep"] = now
+        state["lastduration"] = metrics["duration"]
+        state["lastfiles"] = metrics["files"]
+        state["lastbytes"] = metrics["bytes"]
+        state["outputsize"] = metrics["outputsize"]
+
+        stateFileName = os.path.join(self.tempPath, STATEFILE)
+        with open(stateFileName + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.rename(stateFileName + ".tmp", stateFileName)
+
+
+def _getServerValue(option, default=0):
+    if config.config.has_option("server", option):
+        return config.getConfigValue("server", option) or default
+    return default
+
+
+def getRetention():
+    """Get the retention configured in the `[server]` section
+
+    :returns: :class:`Retention`
+    """
+    ttls = {}
+    for (fileType, option) in TTLOPTIONS.items():
+        ttls[fileType] = getDuration(_getServerValue(option))
+    return Retention(config.getConfigValue("server", "outputPath"),
+                     config.getConfigValue("server", "tempPath"),
+                     ttls, config.getSize(_getServerValue("outputquota")),
+                     Jobs.getJobStore())
+
+
+def getInterval():
+    """Get the time between the sweeps in seconds, 0 if the sweeper is
+    disabled"""
+    return getDuration(_getServerValue("retentioninterval"))
+
+
+def _sweepForever():
+    while True:
+        interval = getInterval()
+        if not interval:
+            break
+        time.sleep(interval)
+        try:
+            getRetention().sweep()
+        except Exception:
+            # the sweeper runs in the server, next sweep will try again
+            pass
+
+
+def startSweeper():
+    """Start the background sweeper thread in this process, if it is
+    enabled and not running yet. The thread is not inherited by the forked
+    processes.
+
+    :returns: True, if the sweeper is running
+    """
+    global _sweeper
+    if _sweeper and _sweeper.pid == os.getpid() and _sweeper.isAlive():
+        return True
+    if not getInterval():
+        return False
+    _sweeper = threading.Thread(target=_sweepForever,
+                                name="pywps-retention")
+    _sweeper.daemon = True
+    _sweeper.pid = os.getpid()
+    _sweeper.start()
+    return True
+
+
+if __name__ == "__main__":
+    config.loadConfiguration()
+    print json.dumps(getRetention().sweep())
@@ -0,0 +1,345 @@
+"""
+Scheduler of the Execute requests
+
+Admits the Execute requests by priority classes, with concurrency limits
+per algorithm and per provider. Requests, which can not run yet, wait in a
+bounded queue, instead of being rejected immediately. The state is shared
+by every server process and worker in a locked file in `tempPath`.
+
+The provider of the process is the part of its identifier before the
+first colon, e.g. `grass7` for `grass7:r.watershed`.
+
+The scheduler is configured in the `[server]` section:
+
+    maxqueue
+        maximal number of waiting requests, 0 rejects the request, which
+        can not run immediately
+
+    queuetimeout
+        maximal waiting time in seconds
+
+and in the `[qgis]` section:
+
+    max_operations
+        concurrency limits of providers or algorithms, e.g.
+        `grass7=2,saga=2,qgis:intersection=4`
+
+    high_priority, low_priority
+        providers or algorithms of the priority classes, the others have
+        normal priority
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+import pywps
+from pywps import config
+import os
+import time
+import uuid
+import errno
+import logging
+try:
+    import json
+except ImportError:
+    import simplejson as json
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# priority classes
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# seconds between admission attempts of waiting requests
+POLLINTERVAL = 0.5
+
+STATEFILE = "pywps-scheduler.json"
+
+
+def getProvider(identifier):
+    """Get provider name from the process identifier
+
+    :rtype: string or None
+    """
+    if identifier and identifier.find(":") > 0:
+        return identifier.split(":")[0]
+    return None
+
+
+def isAlive(pid):
+    """Check, if the process is running"""
+    try:
+        os.kill(pid, 0)
+    except OSError, e:
+        return e.errno == errno.EPERM
+    return True
+
+
+class Scheduler:
+    """Scheduler of the Execute requests
+
+    :param stateFileName: file with the shared state
+    :param maxQueue: maximal number of waiting requests
+    :param timeout: maximal waiting time in seconds
+    :param limits: concurrency limits by provider or algorithm
+    :param priorities: priority classes by provider or algorithm
+    """
+
+    stateFileName = None
+    maxQueue = 0
+    timeout = 0
+    limits = None
+    priorities = None
+
+    def __init__(self, stateFileName, maxQueue=0, timeout=0, limits={},
+                 priorities={}):
+        self.stateFileName = stateFileName
+        self.maxQueue = maxQueue
+        self.timeout = timeout
+        self.limits = limits
+        self.priorities = priorities
+
+    def getPriority(self, identifier):
+        """Get priority class of the process, the algorithm setting
+        overrides the provider setting"""
+        if identifier in self.priorities:
+            return self.priorities[identifier]
+        return self.priorities.get(getProvider(identifier), NORMAL)
+
+    def acquire(self, identifier, reserve=None):
+        """Wait, until the request can run
+
+        :param identifier: process identifier
+        :param reserve: function reserving one of the server slots for the
+            request, returning False, if the server runs maximal number of
+            requests
+        :returns: job identifier, to be given to :meth:`release`
+        """
+        job = {"pid": os.getpid(),
+               "identifier": identifier,
+               "provider": getProvider(identifier),
+               "priority": self.getPriority(identifier),
+               "since": time.time()}
+        jobId = "%d-%s" % (job["pid"], uuid.uuid4())
+
+        while True:
+            (stateFile, state) = self._open()
+            try:
+                if self._admit(state, jobId, job, reserve):
+                    return jobId
+
+                waiting = state["waiting"]
+                waited = time.time() - job["since"]
+                if not jobId in waiting:
+                    if len(waiting) >= self.maxQueue:
+                        state["stats"]["rejected"] += 1
+                        raise pywps.ServerBusy(
+                            value="Maximal number of permitted operations exceeded")
+                    waiting[jobId] = job
+                    logging.info("Request %s is waiting for execution" %
+                                 identifier)
+                elif waited > self.timeout:
+                    del waiting[jobId]
+                    state["stats"]["timedout"] += 1
+                    raise pywps.ServerBusy(
+                        value="Maximal number of permitted operations exceeded, waited %ds" % waited)
+            finally:
+                self._close(stateFile, state)
+            time.sleep(POLLINTERVAL)
+
+    def release(self, jobId):
+        """The request has finished
+
+        :param jobId: job identifier returned by :meth:`acquire`
+        """
+        (stateFile, state) = self._open()
+        try:
+            if jobId in state["running"]:
+                del state["running"][jobId]
+        finally:
+            self._close(stateFile, state)
+
+    def getStats(self):
+        """Get queue depth, running requests and waiting times
+
+        :rtype: dict
+        """
+        (stateFile, state) = self._open()
+        try:
+            now = time.time()
+            stats = dict(state["stats"])
+            stats["running"] = len(state["running"])
+            stats["waiting"] = len(state["waiting"])
+            stats["runningprocesses"] = {}
+            for job in state["running"].values():
+                stats["runningprocesses"][job["identifier"]] = \
+                    stats["runningprocesses"].get(job["identifier"], 0) + 1
+            stats["waitingprocesses"] = [
+                {"identifier": job["identifier"],
+                 "priority": job["priority"],
+                 "waited": now - job["since"]}
+                for job in sorted(state["waiting"].values(),
+                                  key=self._getOrder)]
+            stats["averagewait"] = 0
+            if stats["admitted"]:
+                stats["averagewait"] = stats["totalwait"] / stats["admitted"]
+            return stats
+        finally:
+            self._close(stateFile, state)
+
+    def _admit(self, state, jobId, job, reserve):
+        """Admit the job, if it can run and no job before it in the queue
+        can run
+
+        :returns: True if the job has been admitted
+        """
+        for otherId in sorted(state["waiting"].keys(),
+                              key=lambda key: self._getOrder(
+                                  state["waiting"][key])):
+            if otherId == jobId:
+                break
+            if self._getOrder(state["waiting"][otherId]) >= \
+                    self._getOrder(job):
+                break
+            # this one goes first
+            if self._canRun(state, state["waiting"][otherId]):
+                return False
+
+        if not self._canRun(state, job) or (reserve and not reserve()):
+            return False
+
+        if jobId in state["waiting"]:
+            del state["waiting"][jobId]
+        waited = time.time() - job["since"]
+        stats = state["stats"]
+        stats["admitted"] += 1
+        stats["totalwait"] += waited
+        stats["maxwait"] = max(stats["maxwait"], waited)
+        state["running"][jobId] = job
+        return True
+
+    def _canRun(self, state, job):
+        """Check the concurrency limits of the algorithm and of the
+        provider"""
+        for (key, name) in (("identifier", job["identifier"]),
+                            ("provider", job["provider"])):
+            limit = self.limits.get(name)
+            if not name or not limit:
+                continue
+            running = [other for other in state["running"].values()
+                       if other[key] == name]
+            if len(running) >= limit:
+                return False
+        return True
+
+    def _getOrder(self, job):
+        return (job["priority"], job["since"])
+
+    def _open(self):
+        """Lock and read the state, forget jobs of stopped processes
+
+        :returns: (locked file, state)
+        """
+        stateFile = open(self.stateFileName, "a+")
+        fcntl.flock(stateFile.fileno(), fcntl.LOCK_EX)
+        stateFile.seek(0)
+        try:
+            state = json.loads(stateFile.read())
+        except ValueError:
+            state = {}
+        state.setdefault("running", {})
+        state.setdefault("waiting", {})
+        stats = state.setdefault("stats", {})
+        for key in ("admitted", "rejected", "timedout", "totalwait",
+                    "maxwait"):
+            stats.setdefault(key, 0)
+
+        for jobs in (state["running"], state["waiting"]):
+            for (jobId, job) in jobs.items():
+                if not isAlive(job["pid"]):
+                    logging.info("Forgetting request %s of stopped process %d"
+                                 % (job["identifier"], job["pid"]))
+                    del jobs[jobId]
+        return (stateFile, state)
+
+    def _close(self, stateFile, state):
+        """Write the state and unlock it"""
+        try:
+            stateFile.seek(0)
+            stateFile.truncate()
+            stateFile.write(json.dumps(state))
+            stateFile.flush()
+        finally:
+            fcntl.flock(stateFile.fileno(), fcntl.LOCK_UN)
+            stateFile.close()
+
+
+def _getNames(section, option):
+    """Get comma separated list from the configuration"""
+    if not config.config.has_option(section, option):
+        return []
+    value = config.getConfigValue(section, option)
+    if not value:
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def getScheduler():
+    """Get the scheduler configured in the `[server]` and `[qgis]` sections
+
+    :returns: :class:`Scheduler` or None, if there is neither queue nor
+        limits configured
+    """
+    if fcntl is None:
+        return None
+
+    maxQueue = 0
+    timeout = 0
+    if config.config.has_option("server", "maxqueue"):
+        maxQueue = int(config.getConfigValue("server", "maxqueue") or 0)
+    if config.config.has_option("server", "queuetimeout"):
+        timeout = float(config.getConfigValue("server", "queuetimeout") or 0)
+
+    limits = {}
+    for item in _getNames("qgis", "max_operations"):
+        try:
+            (name, limit) = item.rsplit("=", 1)
+            limit = int(limit)
+        except ValueError:
+            name = limit = None
+        if not name or not name.strip() or limit is None or limit < 0:
+            logging.warning("Ignoring malformed max_operations entry %s" %
+                            item)
+            continue
+        limits[name.strip()] = limit
+
+    priorities = {}
+    for name in _getNames("qgis", "low_priority"):
+        priorities[name] = LOW
+    for name in _getNames("qgis", "high_priority"):
+        priorities[name] = HIGH
+
+    if not maxQueue and not limits:
+        return None
+
+    stateFileName = os.path.join(
+        config.getConfigValue("server", "tempPath"), STATEFILE)
+    return Scheduler(stateFileName, maxQueue, timeout, limits, priorities)
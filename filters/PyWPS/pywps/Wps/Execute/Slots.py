@@ -0,0 +1,125 @@
+"""
+Slots of the running Execute requests
+
+Each running request holds a lock on one of `maxoperations` slot files in
+`tempPath`, instead of counting the working directories. The locks are
+released by the system, when the process holding them stops, so slots of
+crashed processes are reclaimed.
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+import os
+import errno
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SLOTSDIR = "pywps-slots"
+
+
+class Slots:
+    """Slots of the running requests
+
+    :param slotsDir: directory with the slot files
+    :param size: number of slots
+    """
+
+    slotsDir = None
+    size = 0
+
+    def __init__(self, slotsDir, size):
+        self.slotsDir = slotsDir
+        self.size = size
+
+    def acquire(self):
+        """Lock free slot
+
+        :returns: locked slot file, to be given to :meth:`release`, or
+            None, if every slot is taken
+        """
+        try:
+            os.makedirs(self.slotsDir)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # processes start at different slots, so they do not try the same
+        # locked ones
+        start = os.getpid() % self.size
+        for i in range(self.size):
+            slot = self._lock((start + i) % self.size)
+            if slot:
+                return slot
+        return None
+
+    def release(self, slot):
+        """Unlock the slot
+
+        :param slot: slot file returned by :meth:`acquire`
+        """
+        fcntl.flock(slot.fileno(), fcntl.LOCK_UN)
+        slot.close()
+
+    def count(self):
+        """Count taken slots
+
+        :rtype: integer
+        """
+        taken = 0
+        for i in range(self.size):
+            slot = self._lock(i)
+            if slot:
+                self.release(slot)
+            else:
+                taken += 1
+        return taken
+
+    def _lock(self, number):
+        """Try to lock the slot file
+
+        :returns: locked file or None
+        """
+        slot = open(os.path.join(self.slotsDir, "slot-%d" % number), "a")
+        # the programs started by the process, e.g. GRASS or SAGA, must not
+        # keep the slot
+        flags = fcntl.fcntl(slot.fileno(), fcntl.F_GETFD)
+        fcntl.fcntl(slot.fileno(), fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+        try:
+            fcntl.flock(slot.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError, e:
+            slot.close()
+            if e.errno in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                return None
+            raise
+        return slot
+
+
+def getSlots(maxOperations, tempPath):
+    """Get slots of the running requests
+
+    :param maxOperations: number of slots
+    :param tempPath: directory of the slots directory
+    :returns: :class:`Slots` or None, if there is no limit or the locks
+        are not supported
+    """
+    if fcntl is None or not maxOperations:
+        return None
+    return Slots(os.path.join(tempPath, SLOTSDIR), maxOperations)
@@ -0,0 +1,141 @@
+"""
+Writer of the stored status document of asynchronous Execute requests
+
+The document is written to a temporary file, which replaces the stored one,
+so clients polling the status location never read half written document.
+Progress updates are written at most once per `[server] statusinterval`
+milliseconds, unless the status changes. Only the status section is
+rendered again, the rest of the document is kept from the last write.
+"""
+# License:
+#
+# Web Processing Service implementation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from pywps import config
+from pywps.Template import TemplateProcessor
+import os
+import time
+import tempfile
+import logging
+
+# template of the status section, included by the Execute template
+STATUSTEMPLATE = os.path.join("inc", "Execute_Status.tmpl")
+
+
+def getInterval():
+    """Get minimal time between progress updates in seconds from the
+    `[server] statusinterval` option in milliseconds"""
+    if not config.config.has_option("server", "statusinterval"):
+        return 0
+    return float(config.getConfigValue("server", "statusinterval") or 0) / 1000
+
+
+class StatusWriter:
+    """Writer of the stored Execute response document
+
+    :param fileName: stored document
+    :param templateDir: directory of the Execute template
+    :param interval: minimal time between updates of the same status in
+        seconds
+
+    .. attribute:: written
+
+        number of written documents
+    """
+
+    fileName = None
+    interval = 0
+    written = 0
+    _status = None
+    _time = 0
+    _prefix = None
+    _suffix = None
+
+    def __init__(self, fileName, templateDir, interval=0):
+        self.fileName = fileName
+        self.interval = interval
+        self.statusProcessor = TemplateProcessor(
+            os.path.join(templateDir, STATUSTEMPLATE), compile=True)
+
+    def isDue(self, status):
+        """Check, if the update should be written, the status changed or
+        the interval elapsed"""
+        return status != self._status or \
+            time.time() - self._time >= self.interval
+
+    def update(self, templateProcessor, status, values, force=False):
+        """Write the document with new status
+
+        :param templateProcessor: processor of the whole document, with the
+            values already set
+        :param status: status name
+        :param values: values of the status section
+        :param force: write even if the interval did not elapse
+        :returns: True if the document was written
+        """
+        if not force and not self.isDue(status):
+            return False
+
+        for (key, value) in values.items():
+            self.statusProcessor.set(key, value)
+        section = self.statusProcessor.__str__()
+
+        if self._prefix is None or templateProcessor.interpreted:
+            document = templateProcessor.__str__()
+            position = document.find(section)
+            if position > -1:
+                self._prefix = document[:position]
+                self._suffix = document[position + len(section):]
+        else:
+            document = self._prefix + section + self._suffix
+
+        self._write([document])
+        self._status = status
+        return True
+
+    def write(self, response):
+        """Write the whole document, e.g. the final one
+
+        :param response: response document
+        :type response: string or :class:`pywps.Template.TemplateStream`
+        """
+        if type(response) == type(""):
+            response = [response]
+        self._write(response)
+        self._prefix = None
+        self._suffix = None
+
+    def _write(self, chunks):
+        """Write the chunks to temporary file and rename it"""
+        (directory, name) = os.path.split(self.fileName)
+        (fd, tempName) = tempfile.mkstemp(prefix="." + name, dir=directory)
+        try:
+            tempFile = os.fdopen(fd, "wb")
+            for chunk in chunks:
+                tempFile.write(chunk)
+            tempFile.close()
+            os.chmod(tempName, 0644)
+            os.rename(tempName, self.fileName)
+        except:
+            logging.error("Could not write status document %s" %
+                          self.fileName)
+            if os.path.exists(tempName):
+                os.remove(tempName)
+            raise
+        self._time = time.time()
+        self.written += 1
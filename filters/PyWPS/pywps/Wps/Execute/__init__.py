@@ -43,7 +43,7 @@ import pywps
 import pywps.Ftp
 from pywps import config
 from pywps.Wps import Request
-from pywps.Template import TemplateProcessor
+from pywps.Template import TemplateProcessor, FileValue, CHUNKSIZE
 import time
 import tempfile
 import re
@@ -54,7 +54,7 @@ import string
 from shutil import copyfile as COPY
 from shutil import rmtree as RMTREE
 import logging
-from pywps.Wps.Execute import UMN, QGIS
+from pywps.Wps.Execute import UMN, QGIS, Pool, Scheduler, Slots, Status, Jobs, Publish
 import pickle
 import subprocess
 
@@ -202,6 +202,25 @@ class Execute(Request):
         Indicates, wheather this is running as child process of the main
         process
 
+    .. attribute :: statusWriter
+
+        :class:`pywps.Wps.Execute.Status.StatusWriter` of the stored
+        response document
+
+    .. attribute :: slot
+
+        locked file of the :class:`pywps.Wps.Execute.Slots.Slots`, held by
+        this running request
+
+    .. attribute :: scheduler
+
+        :class:`pywps.Wps.Execute.Scheduler.Scheduler`, which admitted this
+        request
+
+    .. attribute :: schedulerJob
+
+        job of this request in the :attr:`scheduler`
+
     """
 
     # status variants
@@ -247,6 +266,13 @@ class Execute(Request):
 
     umn = None
 
+    statusWriter = None
+
+    slots = None
+    slot = None
+    scheduler = None
+    schedulerJob = None
+
     def __init__(self, wps, processes=None, spawned=False):
 
         Request.__init__(self, wps, processes)
@@ -284,8 +310,18 @@ class Execute(Request):
                     outputType = "ftp"
 
                 if outputType == "file":
+                    # the status writer replaces the document, the spawned
+                    # process does not empty it. SOAP envelope is added to
+                    # the whole document.
+                    mode = "w"
+                    if not self.wps.parser.isSoap:
+                        mode = "a"
+                        self.statusWriter = Status.StatusWriter(
+                            self.outputFileName,
+                            os.path.split(self.templateFile)[0],
+                            Status.getInterval())
                     try:
-                        self.outputFile = open(self.outputFileName, "w")
+                        self.outputFile = open(self.outputFileName, mode)
                     except Exception, e:
                         traceback.print_exc(file=pywps.logFile)
                         self.cleanEnv()
@@ -396,6 +432,13 @@ class Execute(Request):
             pickle.dump(wps, self.pickleFile)
             self.pickleFile.close()
 
+            # run this process by the worker pool, if configured
+            if Pool.submit(self.pickleFile.name,
+                           self.processProvider or processes,
+                           self.outputFile.name):
+                logging.info("Process sent to the workers, end.")
+                return
+
             # spawn this process
             logging.info("Spawning process to the background")
             self.outputFile.name
@@ -453,19 +496,20 @@ class Execute(Request):
                 if not self.rawDataOutput:
                     # fill outputs
                     self.processOutputs()
+                    self.recordOutputs()
 
                     # if self.umn:
                     #    self.umn.save()
 
                     # Response document
-                    self.response = self.templateProcessor.__str__()
+                    self.response = self.templateProcessor.stream()
                 # if rawDataOutput is required
                 else:
                     self.setRawData()
 
             # Failed but output lineage anyway
             elif lineageRequired:
-                self.response = self.templateProcessor.__str__()
+                self.response = self.templateProcessor.stream()
 
         except pywps.WPSException, e:
             traceback.print_exc(file=pywps.logFile)
@@ -475,7 +519,7 @@ class Execute(Request):
                                exceptioncode=e.code,
                                locator=e.locator)
             # Response document
-            self.response = self.templateProcessor.__str__()
+            self.response = self.templateProcessor.stream()
 
         except Exception, e:
             # set status to failed
@@ -484,10 +528,12 @@ class Execute(Request):
                                statusMessage=str(e),
                                exceptioncode="NoApplicableCode")
             # Response document
-            self.response = self.templateProcessor.__str__()
+            self.response = self.templateProcessor.stream()
 
         # print status
-        if self.storeRequired or self.spawned:
+        if self.statusWriter:
+            self.statusWriter.write(self.response)
+        elif self.storeRequired or self.spawned:
             pywps.response.response(self.response,
                                     self.outputFile,
                                     self.wps.parser.isSoap,
@@ -737,8 +783,7 @@ class Execute(Request):
         :param locator: where the problem occurred
         """
         self.statusTime = time.localtime()
-        self.templateProcessor.set("statustime", time.strftime(
-            '%Y-%m-%dT%H:%M:%SZ', self.statusTime))
+        statusChanged = self.status != status
         self.status = status
 
         if statusMessage != 0:
@@ -750,61 +795,134 @@ class Execute(Request):
         if locator != 0:
             self.locator = locator
 
-        # init value
-        self.templateProcessor.set("processstarted", 0)
-        self.templateProcessor.set("processsucceeded", 0)
-        self.templateProcessor.set("processpaused", 0)
-        self.templateProcessor.set("processfailed", 0)
-        self.templateProcessor.set("processaccepted", 0)
+        # values of the status section, init value
+        values = {"statustime": time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                              self.statusTime),
+                  "processstarted": 0,
+                  "processsucceeded": 0,
+                  "processpaused": 0,
+                  "processfailed": 0,
+                  "processaccepted": 0}
 
         if self.status == self.accepted:
-            self.templateProcessor.set("processaccepted",
-                                       self.statusMessage)
+            values["processaccepted"] = self.statusMessage
 
         elif self.status == self.started:
-            self.templateProcessor.set("processstarted", self.statusMessage)
-            self.templateProcessor.set("percentcompleted", self.percent)
+            values["processstarted"] = self.statusMessage
+            values["percentcompleted"] = self.percent
 
         elif self.status == self.succeeded:
             self.process.status.set(
                 msg=self.statusMessage, percentDone=100, propagate=False)
-            self.templateProcessor.set("percentcompleted", self.percent)
-            self.templateProcessor.set("processsucceeded",
-                                       self.statusMessage)
+            values["percentcompleted"] = self.percent
+            values["processsucceeded"] = self.statusMessage
 
         elif self.status == self.paused:
-            self.templateProcessor.set("processpaused", self.statusMessage)
-            self.templateProcessor.set("percentcompleted", self.percent)
+            values["processpaused"] = self.statusMessage
+            values["percentcompleted"] = self.percent
 
         elif self.status == self.failed:
-            self.templateProcessor.set("processfailed", 1)
+            values["processfailed"] = 1
             if self.statusMessage:
-                self.templateProcessor.set("exceptiontext", self.statusMessage)
-            self.templateProcessor.set("exceptioncode", self.exceptioncode)
+                values["exceptiontext"] = self.statusMessage
+            values["exceptioncode"] = self.exceptioncode
             if self.locator:
-                self.templateProcessor.set("locator", self.locator)
+                values["locator"] = self.locator
+
+        for (key, value) in values.items():
+            self.templateProcessor.set(key, value)
 
         # update response
-        self.response = self.templateProcessor.__str__()
+        self.response = self.templateProcessor.stream()
 
         # print status
         if self.storeRequired and (self.status == self.accepted or
                                    # self.status == self.succeeded or
                                    self.status == self.failed or
                                    (self.spawned and self.status != self.succeeded)):
-            pywps.response.response(self.response,
-                                    self.outputFile,
-                                    self.wps.parser.soapVersion,
-                                    self.wps.parser.isSoap,
-                                    self.wps.parser.isSoapExecute,
-                                    self.contentType, isPromoteStatus=True)
+            if self.statusWriter:
+                # progress updates are throttled, the other states are
+                # written always
+                self.statusWriter.update(
+                    self.templateProcessor, self.status, values,
+                    force=self.status not in (self.started, self.paused))
+            else:
+                pywps.response.response(self.response,
+                                        self.outputFile,
+                                        self.wps.parser.soapVersion,
+                                        self.wps.parser.isSoap,
+                                        self.wps.parser.isSoapExecute,
+                                        self.contentType, isPromoteStatus=True)
             # self.wps.parser.isSoapExecute
+        if statusChanged:
+            self.recordJob()
+
         if self.status == self.started:
             logging.info("Status [%s][%.1f]: %s" %
                          (self.status, float(self.percent), self.statusMessage))
         else:
             logging.info("Status [%s]: %s" % (self.status, self.statusMessage))
 
+    def recordJob(self):
+        """Record the status transition in the job store, problems of the
+        store do not fail the request"""
+        jobStore = Jobs.getJobStore()
+        if jobStore is None:
+            return
+
+        inputSize = None
+        if self.status == self.started and self.process:
+            inputSize = self.getInputSize()
+        statusLocation = None
+        if self.storeRequired:
+            statusLocation = self.statusLocation
+
+        try:
+            jobStore.record(self.getSessionId(), self.status,
+                            identifier=getattr(self.process, "identifier",
+                                               None),
+                            message=str(self.statusMessage),
+                            percent=int(float(self.percent)),
+                            statusLocation=statusLocation,
+                            inputSize=inputSize)
+        except Exception, e:
+            logging.warning("Could not record the job: %s" % e)
+
+    def recordOutputs(self):
+        """Record the output files stored in the outputPath in the job
+        store"""
+        jobStore = Jobs.getJobStore()
+        if jobStore is None:
+            return
+
+        outputs = {}
+        for output in self.process.outputs.values():
+            if output.type == "ComplexValue" and output.asReference and \
+                    type(output.value) in types.StringTypes and \
+                    os.path.isfile(output.value):
+                outputs[output.identifier] = output.value
+        try:
+            jobStore.setOutputs(self.getSessionId(), outputs)
+        except Exception, e:
+            logging.warning("Could not record the job outputs: %s" % e)
+
+    def getInputSize(self):
+        """Get size of the input files in bytes
+
+        :rtype: integer
+        """
+        size = 0
+        for input in self.process.inputs.values():
+            if input.type != "ComplexValue":
+                continue
+            values = input.value
+            if type(values) != type([]):
+                values = [values]
+            for value in values:
+                if type(value) in types.StringTypes and os.path.isfile(value):
+                    size += os.path.getsize(value)
+        return size
+
     def lineageInputs(self):
         """Called, if lineage request was set. Fills the <DataInputs> part of
         output XML document.
@@ -1075,20 +1193,21 @@ class Execute(Request):
                 base64.encode(open(output.value + ".binary"),
                               open(output.value, "w"))
 
+        isXml = False
+        if output.format["mimetype"] is not None:
+            # if output.format["mimetype"].find("xml") > -1:
+            baseMimeType = output.format["mimetype"].split(';')[0]
+            isXml = baseMimeType in xmlMimeTypes
+
         # set output value
         if output.value.startswith('http'):
             import urllib2
             complexOutput["complexdata"] = urllib2.urlopen(output.value).read()
-        else:
-            complexOutput["complexdata"] = open(output.value, "r").read()
 
-        # remove <?xml version= ... part from beginning of some xml
-        # documents
-        # Better <?xml search due to problems with \n
-        if output.format["mimetype"] is not None:
-            # if output.format["mimetype"].find("xml") > -1:
-            baseMimeType = output.format["mimetype"].split(';')[0]
-            if baseMimeType in xmlMimeTypes:
+            # remove <?xml version= ... part from beginning of some xml
+            # documents
+            # Better <?xml search due to problems with \n
+            if isXml:
                 beginXMLidx = complexOutput["complexdata"].find("?>")
                 # All <?xml..?> will be beginXMLidx + 2
 
@@ -1096,6 +1215,18 @@ class Execute(Request):
                 if beginXMLidx > -1:
                     complexOutput["complexdata"] = complexOutput["complexdata"].replace(
                         complexOutput["complexdata"][:(beginXMLidx + 2)], "")
+        else:
+            # the file is streamed to the response, skip the <?xml ...?>
+            # declaration found in its first chunk
+            offset = 0
+            if isXml:
+                outputFile = open(output.value, "rb")
+                beginXMLidx = outputFile.read(CHUNKSIZE).find("?>")
+                outputFile.close()
+                if beginXMLidx > -1:
+                    offset = beginXMLidx + 2
+            complexOutput["complexdata"] = FileValue(
+                output.value, offset, self._isTemporary(output.value))
 
         return complexOutput
 
@@ -1211,7 +1342,8 @@ class Execute(Request):
                 # data sent to FTP and stored in the local output
                 COPY(os.path.abspath(output.value), outFile)
             elif not self._samefile(output.value, outFile):
-                COPY(os.path.abspath(output.value), outFile)
+                Publish.publishFile(os.path.abspath(output.value), outFile,
+                                    self._isTemporary(output.value))
 
             # If ftp then the path to file is the outputpath otherwise it has
             # to be the outputURL
@@ -1251,6 +1383,14 @@ class Execute(Request):
 
         return templateOutput
 
+    def _isTemporary(self, fileName):
+        """Check, if the file is removed with the temporary dirs"""
+        fileName = os.path.realpath(fileName)
+        for dir in self.dirsToBeRemoved:
+            if fileName.startswith(os.path.join(os.path.realpath(dir), "")):
+                return True
+        return False
+
     def _samefile(self, src, dst):
         # Macintosh, Unix.
         if hasattr(os.path, 'samefile'):
@@ -1362,23 +1502,32 @@ class Execute(Request):
 
         """
 
-        # find out number of running sessions
+        # take one of the slots of running sessions
         maxOperations = int(config.getConfigValue("server", "maxoperations"))
         tempPath = config.getConfigValue("server", "tempPath")
-
-        dirs = os.listdir(tempPath)
-        pyWPSDirs = 0
-        for dir in dirs:
-            if dir.find(TEMPDIRPREFIX) == 0:
-                pyWPSDirs += 1
-
-        if pyWPSDirs >= maxOperations and\
-                maxOperations != 0:
+        slots = Slots.getSlots(maxOperations, tempPath)
+
+        def reserve():
+            if slots:
+                self.slot = slots.acquire()
+                self.slots = slots
+                return self.slot is not None
+            return maxOperations == 0 or \
+                self.countOperations(tempPath) < maxOperations
+
+        # wait in the queue of the scheduler, if there is any
+        scheduler = Scheduler.getScheduler()
+        if scheduler:
+            self.schedulerJob = scheduler.acquire(self.process.identifier,
+                                                  reserve)
+            self.scheduler = scheduler
+        elif not reserve():
             raise pywps.ServerBusy(
                 value="Maximal number of permitted operations exceeded")
 
-        # create temp dir
-        self.workingDir = tempfile.mkdtemp(prefix=TEMPDIRPREFIX, dir=tempPath)
+        # create temp dir, the pid tells the retention the process runs
+        self.workingDir = tempfile.mkdtemp(
+            prefix="%s%d-" % (TEMPDIRPREFIX, os.getpid()), dir=tempPath)
 
         self.workingDir = os.path.join(
             config.getConfigValue("server", "tempPath"), self.workingDir)
@@ -1406,12 +1555,32 @@ class Execute(Request):
 
         return
 
+    def countOperations(self, tempPath):
+        """Count running requests by their working directories, where the
+        slots are not supported
+
+        :param tempPath: directory with the working directories
+        :rtype: integer
+        """
+        pyWPSDirs = 0
+        for dir in os.listdir(tempPath):
+            if dir.find(TEMPDIRPREFIX) == 0:
+                pyWPSDirs += 1
+        return pyWPSDirs
+
     def cleanEnv(self):
         """ Removes temporary created files and dictionaries
         """
 
         os.chdir(self.curdir)
 
+        if self.slot:
+            self.slots.release(self.slot)
+            self.slot = None
+        if self.schedulerJob:
+            self.scheduler.release(self.schedulerJob)
+            self.schedulerJob = None
+
         def onError(*args):
             logging.error("Could not remove temporary dir")
 
@@ -1464,18 +1633,22 @@ class Execute(Request):
         elif output.type == "ComplexValue":
 
             # self.checkMimeTypeIn(output)
-             # copy the file to safe place
-            outName = os.path.basename(output.value)
-            outSuffix = os.path.splitext(outName)[1]
-            tmp = tempfile.mkstemp(suffix=outSuffix, prefix="%s-%s" % (output.identifier,
-                                                                       self.pid), dir=os.path.join(config.getConfigValue("server", "outputPath")))
-            outFile = tmp[1]
-
-            if not self._samefile(output.value, outFile):
-                COPY(os.path.abspath(output.value), outFile)
+            outFile = os.path.abspath(output.value)
+            # copy the file to safe place, unless it is kept after the
+            # temporary dirs are removed
+            if self._isTemporary(outFile):
+                outName = os.path.basename(output.value)
+                outSuffix = os.path.splitext(outName)[1]
+                tmp = tempfile.mkstemp(suffix=outSuffix, prefix="%s-%s" % (output.identifier,
+                                                                           self.pid), dir=os.path.join(config.getConfigValue("server", "outputPath")))
+                os.close(tmp[0])
+                outFile = tmp[1]
+                Publish.publishFile(os.path.abspath(output.value), outFile,
+                                    True)
 
             # check
             self.contentType = output.format["mimetype"]
+            # the file is streamed from its location
             self.response = open(outFile, "rb")
 
 """
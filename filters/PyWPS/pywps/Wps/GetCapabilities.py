@@ -147,17 +147,20 @@ class GetCapabilities(Request):
         # Processes
         processesData = []
 
-        for process in self.getProcesses("all"):
+        # summaries given by a process provider can be classes
+        for process in self.getProcessSummaries("all"):
             processData = {}
-            if type(process) == types.InstanceType:
-                process.lang.setCode(self.wps.inputs["language"])
+            if type(process) in (types.InstanceType, types.ClassType):
+                if type(process) == types.InstanceType:
+                    process.lang.setCode(self.wps.inputs["language"])
 
                 processData["processok"] = 1
                 processData["identifier"] = process.identifier
                 processData["processversion"] = process.version
-                processData["title"] = process.i18n(process.title)
+                processData["title"] = self.i18n(process, process.title)
                 if process.abstract:
-                    processData["abstract"] = process.i18n(process.abstract)
+                    processData["abstract"] = self.i18n(process,
+                                                        process.abstract)
                 if process.metadata:
                     processData["Metadata"] = self.formatMetadata(process)
                 if process.profile:
@@ -186,3 +189,15 @@ class GetCapabilities(Request):
 
         self.response = self.templateProcessor.__str__()
         return
+
+    def i18n(self, process, key):
+        """Translate the key with the process language, summaries given as
+        classes are not translated
+
+        :param process: process instance or class
+        :param key: key value to be translated
+        :return: translated string
+        """
+        if type(process) == types.ClassType:
+            return key
+        return process.i18n(key)
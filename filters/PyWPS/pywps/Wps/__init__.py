@@ -42,6 +42,66 @@ import traceback
 import logging
 
 
+class ProcessProvider:
+    """Lazy source of processes, which can be given to :class:`Request`
+    instead of the list of processes. Process identifiers and summaries
+    must be cheap to get, the :class:`pywps.Process.WPSProcess` instance
+    is only created, when the request needs its inputs and outputs.
+    """
+
+    def getIdentifiers(self):
+        """Get identifiers of provided processes
+
+        :rtype: list of strings
+        """
+        raise NotImplementedError
+
+    def getSummary(self, identifier):
+        """Get process summary: object with identifier, title, abstract,
+        version, metadata, profile, wsdl and fingerprint attributes, as
+        used by GetCapabilities. Default is the process instance itself.
+
+        :param identifier: process identifier
+        """
+        return self.getProcess(identifier)
+
+    def getProcess(self, identifier):
+        """Create the process instance
+
+        :param identifier: process identifier
+        :rtype: :class:`pywps.Process.WPSProcess`
+        """
+        raise NotImplementedError
+
+
+class ProcessClassProvider(ProcessProvider):
+    """Provider of process classes, with class level identifier, title,
+    abstract and version attributes. The classes are summaries of the
+    processes, they are instantiated only when needed.
+
+    :param processes: list of :class:`pywps.Process.WPSProcess` classes,
+        None items are ignored
+    """
+
+    def __init__(self, processes):
+        self._identifiers = []
+        self._classes = {}
+        for process in processes:
+            if process is None:
+                continue
+            self._identifiers.append(process.identifier)
+            self._classes[process.identifier] = process
+
+    def getIdentifiers(self):
+        return self._identifiers
+
+    def getSummary(self, identifier):
+        return self._classes[identifier]
+
+    def getProcess(self, identifier):
+        return self._classes[identifier]()
+
+
 class Request:
     """WPS Request performing, and response formating
 
@@ -84,7 +144,12 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
 
     .. attribute:: processes
 
-        list of instances of :`class:`pywps.Process.WPSProcess`
+        list of instances of :`class:`pywps.Process.WPSProcess`, only
+        the already created ones, if :attr:`processProvider` is set
+
+    .. attribute:: processProvider
+
+        instance of :class:`ProcessProvider` or None
 
     .. attribute:: processSources
 
@@ -105,6 +170,7 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
     stdOutClosed = False
     templateProcessor = None
     processes = None
+    processProvider = None
     processSources = None
     contentType = "application/xml"
 
@@ -232,6 +298,11 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
 
         # for each process
         for prc in self.wps.inputs["identifier"]:
+            if self.processProvider:
+                if not prc in self.processProvider.getIdentifiers():
+                    raise InvalidParameterValue(
+                        prc, "Process %s not available" % prc)
+                continue
             try:
                 if not prc in self.processes.__all__:
                     raise InvalidParameterValue(
@@ -296,6 +367,13 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
             located, ..."""
         global pywps
 
+        # processes are created lazily by the provider
+        if isinstance(processes, ProcessProvider):
+            logging.info("Processes are provided by %s" % repr(processes))
+            self.processProvider = processes
+            self.processes = []
+            return self.processes
+
         if processes and type(processes) == type(""):
             logging.info("Reading processes from directory [%s]" % processes)
             self.processes = self._initFromDirectory(processes)
@@ -341,6 +419,14 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
                 continue
             if process.identifier == identifier:
                 return process
+
+        # create the process with the provider
+        if self.processProvider and \
+                identifier in self.processProvider.getIdentifiers():
+            process = self.processProvider.getProcess(identifier)
+            if process:
+                self.processes.append(process)
+                return process
         raise InvalidParameterValue(identifier)
 
     def getProcesses(self, identifiers=None):
@@ -355,14 +441,14 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
 
         if type(identifiers) == types.StringType:
             if identifiers.lower() == "all":
-                return self.processes
+                return self._getAllProcesses()
             else:
                 return self.getProcess(identifiers)
         else:
             processes = []
             for identifier in identifiers:
                 if identifier.lower() == "all":
-                    return self.processes
+                    return self._getAllProcesses()
                 else:
                     processes.append(self.getProcess(identifier))
 
@@ -371,6 +457,46 @@ http://wiki.rsg.pml.ac.uk/pywps/Introduction
             else:
                 return processes
 
+    def _getAllProcesses(self):
+        """Get all processes, create them with the provider if needed"""
+
+        if self.processProvider:
+            return [self.getProcess(identifier) for identifier in
+                    self.processProvider.getIdentifiers()]
+        return self.processes
+
+    def getProcessSummaries(self, identifiers=None):
+        """Get list of process summaries identified by list of identifiers.
+        Without :attr:`processProvider`, the summaries are the processes.
+
+        :param identifiers: List of identifiers. Either list of strings, or 'all'
+        :returns: list of process summaries, see
+            :meth:`ProcessProvider.getSummary`
+        """
+
+        if not self.processProvider:
+            processes = self.getProcesses(identifiers)
+            if type(processes) != type([]):
+                processes = [processes]
+            return processes
+
+        if not identifiers:
+            raise MissingParameterValue("Identifier")
+
+        if type(identifiers) == types.StringType:
+            identifiers = [identifiers]
+
+        available = self.processProvider.getIdentifiers()
+        if "all" in [identifier.lower() for identifier in identifiers]:
+            identifiers = available
+
+        summaries = []
+        for identifier in identifiers:
+            if not identifier in available:
+                raise InvalidParameterValue(identifier)
+            summaries.append(self.processProvider.getSummary(identifier))
+        return summaries
+
     def formatMetadata(self, process):
         """Create structure suitble for template form process.metadata
 
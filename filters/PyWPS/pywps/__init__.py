@@ -93,6 +93,7 @@ import response
 import Parser
 import Exceptions
 import Wps
+import Template
 from Exceptions import *
 
 import logging
@@ -216,11 +217,14 @@ class Pywps:
         self.inputs = self.parser.parse(queryStringObject)
         return self.inputs
 
-    def performRequest(self, inputs=None, processes=None):
+    def performRequest(self, inputs=None, processes=None, stream=False):
         """Performs the desired WSP Request.
 
         :param inputs: idealy self.inputs (Default) object, result from
             parseRequest. Default is self.inputs
+        :param stream: keep streamed responses as
+            :class:`pywps.Template.TemplateStream`, to be written chunk by
+            chunk, instead of formating them to string
         :rtype: pywps.Wps.Response
         """
 
@@ -246,6 +250,12 @@ class Pywps:
             raise Exceptions.InvalidParameterValue(
                 "request: " + inputs["request"])
         self.response = self.request.response
+        if not stream and isinstance(self.response, Template.TemplateStream):
+            stream = self.response
+            try:
+                self.response = stream.__str__()
+            finally:
+                stream.close()
         return self.response
 
     def setLogFile(self):
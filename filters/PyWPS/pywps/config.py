@@ -3,14 +3,153 @@
 .. param:: config
 
     Configuration object
+
+.. param:: snapshot
+
+    :class:`ConfigSnapshot` of the loaded configuration files
 """
 
 import os
+import re
 import sys
+import hashlib
 import pywps
 import ConfigParser
 
 config = None
+snapshot = None
+
+# configuration snapshots by configuration files
+_snapshots = {}
+
+
+class ConfigSnapshot:
+    """Configuration read from configuration files at a given state of
+    the files, with the values already converted.
+
+    A snapshot is never modified: :func:`setConfigValue` derives a new one.
+
+    .. attribute:: files
+
+        tuple of configuration file names
+
+    .. attribute:: stamp
+
+        tuple of (file name, mtime, size), None for missing files
+
+    .. attribute:: fingerprint
+
+        fingerprint of the stamp and of the derived values
+
+    .. attribute:: parser
+
+        :class:`ConfigParser.ConfigParser` instance
+    """
+
+    files = None
+    stamp = None
+    fingerprint = None
+    parser = None
+
+    def __init__(self, files, stamp, parser, fingerprint=None):
+        self.files = files
+        self.stamp = stamp
+        self.parser = parser
+        if fingerprint is None:
+            fingerprint = hashlib.md5(repr(stamp)).hexdigest()
+        self.fingerprint = fingerprint
+        self._values = {}
+        for section in parser.sections():
+            for option in parser.options(section):
+                try:
+                    self._values[(section, option)] = _convert(
+                        parser.get(section, option))
+                except ConfigParser.Error:
+                    # let get raise the error when the value is asked
+                    pass
+
+    def get(self, section, option):
+        """Get converted value
+
+        :param section: section in configuration files
+        :param option: option in the section
+        :returns: value, True or False for boolean strings
+        """
+        try:
+            return self._values[(section, option.lower())]
+        except KeyError:
+            return _convert(self.parser.get(section, option))
+
+    def derive(self, section, option, value):
+        """Get a new snapshot with a modified value
+
+        :param section: section in configuration files
+        :param option: option in the section
+        :param value: new value
+        :rtype: :class:`ConfigSnapshot`
+        """
+        parser = ConfigParser.ConfigParser()
+        for (name, default) in self.parser.defaults().items():
+            parser.set(ConfigParser.DEFAULTSECT, name, default)
+        for sect in self.parser.sections():
+            parser.add_section(sect)
+            for opt in self.parser.options(sect):
+                if opt in self.parser.defaults():
+                    continue
+                parser.set(sect, opt, self.parser.get(sect, opt, raw=True))
+        parser.set(section, option, value)
+        fingerprint = hashlib.md5(
+            '%s:%r:%r:%r' % (self.fingerprint, section, option, value)
+        ).hexdigest()
+        return ConfigSnapshot(self.files, self.stamp, parser, fingerprint)
+
+
+def _convert(value):
+    """Convert Boolean string to real Boolean values"""
+    if value.lower() == "false":
+        value = False
+    elif value.lower() == "true":
+        value = True
+    return value
+
+
+def getSize(value):
+    """Convert size with units (b, kb, mb, gb) to bytes
+
+    :param value: size, e.g. 512mb
+    :rtype: integer
+    """
+    value = str(value).lower()
+    size = float(re.sub("[gmkb].*", "", value) or 0)
+    if value.find("g") > -1:
+        size *= 1024 * 1024 * 1024
+    elif value.find("m") > -1:
+        size *= 1024 * 1024
+    elif value.find("k") > -1:
+        size *= 1024
+    return int(size)
+
+
+def _getStamp(cfgfiles):
+    """Get (file name, mtime, size) of each configuration file"""
+    stamp = []
+    for cfgfile in cfgfiles:
+        try:
+            st = os.stat(cfgfile)
+            stamp.append((cfgfile, st.st_mtime, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def getSnapshot():
+    """Get the current configuration snapshot, load it if needed
+
+    :rtype: :class:`ConfigSnapshot`
+    """
+    if not snapshot:
+        loadConfiguration()
+    return snapshot
 
 
 def getConfigValue(*args):
@@ -24,17 +163,11 @@ def getConfigValue(*args):
     :rtype: string
     """
 
-    if not config:
-        loadConfiguration()
+    current = getSnapshot()
+    if len(args) == 2:
+        return current.get(*args)
 
-    value = config.get(*args)
-
-    # Convert Boolean string to real Boolean values
-    if value.lower() == "false":
-        value = False
-    elif value.lower() == "true":
-        value = True
-    return value
+    return _convert(current.parser.get(*args))
 
 
 def setConfigValue(*args):
@@ -50,13 +183,8 @@ def setConfigValue(*args):
     :rtype: string
     """
     # Note this function is mainly used in the unnitest
-    #RawConfigParser.set(section, option, value)
-    if not config:
-        loadConfiguration()
-
-    value = config.set(*args)
-
-    # Convert Boolean string to real Boolean values
+    # the loaded snapshot is shared, derive a new one
+    _setSnapshot(getSnapshot().derive(*args))
 
 
 def loadConfiguration(cfgfiles=None):
@@ -64,19 +192,38 @@ def loadConfiguration(cfgfiles=None):
     The later configuration file in the array overwrites configuration
     from the first.
 
+    The configuration is only read again if one of the files has
+    changed since the last load of the same files.
+
     :param cfgfiles: list of file names, where to get configuration from.
     :type cfgfiles: list of strings
     """
-    global config
 
     if cfgfiles == None:
         cfgfiles = _getDefaultConfigFilesLocation()
 
     if type(cfgfiles) != type(()):
-        cfgfiles = (cfgfiles)
+        if isinstance(cfgfiles, list):
+            cfgfiles = tuple(cfgfiles)
+        else:
+            cfgfiles = (cfgfiles,)
+
+    stamp = _getStamp(cfgfiles)
+    current = _snapshots.get(cfgfiles)
+    if not current or current.stamp != stamp:
+        parser = ConfigParser.ConfigParser()
+        parser.read(cfgfiles)
+        current = ConfigSnapshot(cfgfiles, stamp, parser)
+        _snapshots[cfgfiles] = current
+    _setSnapshot(current)
+
+
+def _setSnapshot(newSnapshot):
+    """Make the snapshot the current configuration"""
+    global config, snapshot
 
-    config = ConfigParser.ConfigParser()
-    config.read(cfgfiles)
+    snapshot = newSnapshot
+    config = newSnapshot.parser
 
 
 def _getDefaultConfigFilesLocation():
@@ -17,6 +17,7 @@ import cStringIO
 from pywps import Exceptions
 from os import name as OSNAME
 from pywps import Soap
+from pywps.Template import TemplateStream, CHUNKSIZE
 import pywps.Ftp
 
 
@@ -30,13 +31,15 @@ def response(response, targets, soapVersion=None, isSoap=False, isSoapExecute=Fa
     :param isSoap: print the response in SOAP envelope
     :type isSoap: bool
     :param response: the response object 
-    :type response: file or string
+    :type response: file, string or :class:`pywps.Template.TemplateStream`
     """
 
     # convert single file to array
     if type(targets) != type([]):
         targets = [targets]
     if isSoap:
+        if isinstance(response, TemplateStream):
+            response = response.__str__()
         soap = Soap.SOAP()
         response = soap.getResponse(
             response, soapVersion, isSoapExecute, isPromoteStatus)
@@ -76,10 +79,8 @@ def _printResponseModPython(request, response, contentType="application/xml"):
     if contentType:
         request.content_type = contentType
 
-    if type(response) == types.FileType:
-        request.write(response.read())
-    else:
-        request.write(response)
+    for chunk in _chunks(response):
+        request.write(chunk)
 
 
 def _printResponseFile(fileOut, response, contentType="application/xml"):
@@ -89,10 +90,8 @@ def _printResponseFile(fileOut, response, contentType="application/xml"):
     elif fileOut.closed:
         fileOut = open(fileOut.name, "w")
 
-    if type(response) == types.FileType:
-        fileOut.write(response.read())
-    else:
-        fileOut.write(response)
+    for chunk in _chunks(response):
+        fileOut.write(chunk)
     fileOut.flush()
 
     if fileOut != STDOUT:
@@ -103,8 +102,10 @@ def _sendResponseFTP(ftpConnection, response):
     try:
         ftpConnection.connect()
         ftpConnection.relogin()
-        # In case the response is a file, we can send it directly
-        if type(response) == types.FileType:
+        # In case the response is a file or a stream, we can send it
+        # directly
+        if type(response) == types.FileType or \
+                isinstance(response, TemplateStream):
             ftpConnection.storbinary(
                 "STOR " + ftpConnection.fileName, response)
         else:
@@ -128,7 +129,21 @@ def _printResponseJava(resp, response, contentType="application/xml"):
         resp.setContentType(contentType)
     toClient = resp.getWriter()
 
+    for chunk in _chunks(response):
+        toClient.write(chunk)
+    toClient.println()
+
+
+def _chunks(response):
+    """Iterate the response in chunks, files and streams are not read into
+    memory at once
+
+    :param response: file, string or :class:`pywps.Template.TemplateStream`
+    """
+
     if type(response) == types.FileType:
-        toClient.println(response.read())
+        return iter(lambda: response.read(CHUNKSIZE), "")
+    elif isinstance(response, TemplateStream):
+        return iter(response)
     else:
-        toClient.println(response)
+        return [response]
@@ -0,0 +1,91 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+import pywps.config
+
+import unittest
+import shutil
+import tempfile
+
+
+class ConfigSnapshotTestCase(unittest.TestCase):
+    """Test the configuration is only read again when files change"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.cfgFile = os.path.join(self.tmpDir, "pywps.cfg")
+        self._write("[wps]\ntitle=First\n[server]\nlogFile=\ndebug=true\n")
+        self.cfgFiles = (os.path.join(pywpsPath, "pywps", "default.cfg"),
+                         self.cfgFile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def _write(self, content, delay=0):
+        f = open(self.cfgFile, "w")
+        f.write(content)
+        f.close()
+        if delay:
+            st = os.stat(self.cfgFile)
+            os.utime(self.cfgFile, (st.st_atime, st.st_mtime + delay))
+
+    def testSnapshotCached(self):
+        """Test the snapshot is shared while files are unchanged"""
+        pywps.config.loadConfiguration(self.cfgFiles)
+        snapshot = pywps.config.getSnapshot()
+        self.assertEquals(pywps.config.getConfigValue("wps", "title"), "First")
+        self.assertEquals(pywps.config.getConfigValue("server", "debug"), True)
+        self.assertEquals(pywps.config.getConfigValue("server", "logFile"), "")
+        self.assertTrue(pywps.config.config is snapshot.parser)
+
+        pywps.config.loadConfiguration(self.cfgFiles)
+        self.assertTrue(pywps.config.getSnapshot() is snapshot)
+
+        self._write("[wps]\ntitle=Second\n", 10)
+        pywps.config.loadConfiguration(self.cfgFiles)
+        self.assertFalse(pywps.config.getSnapshot() is snapshot)
+        self.assertNotEquals(pywps.config.getSnapshot().fingerprint,
+                             snapshot.fingerprint)
+        self.assertEquals(pywps.config.getConfigValue("wps", "title"),
+                          "Second")
+        # the previous snapshot is untouched
+        self.assertEquals(snapshot.get("wps", "title"), "First")
+
+    def testSetConfigValue(self):
+        """Test setConfigValue does not modify the shared snapshot"""
+        pywps.config.loadConfiguration(self.cfgFiles)
+        snapshot = pywps.config.getSnapshot()
+        pywps.config.setConfigValue("wps", "title", "Changed")
+        self.assertEquals(pywps.config.getConfigValue("wps", "title"),
+                          "Changed")
+        self.assertEquals(snapshot.get("wps", "title"), "First")
+
+        pywps.config.loadConfiguration(self.cfgFiles)
+        self.assertTrue(pywps.config.getSnapshot() is snapshot)
+
+    def testMissingOption(self):
+        """Test missing options still raise ConfigParser errors"""
+        import ConfigParser
+        pywps.config.loadConfiguration(self.cfgFiles)
+        self.assertRaises(ConfigParser.NoOptionError,
+                          pywps.config.getConfigValue, "wps", "missing")
+        self.assertRaises(ConfigParser.NoSectionError,
+                          pywps.config.getConfigValue, "missing", "title")
+
+    def testSize(self):
+        """Test sizes with units are converted to bytes"""
+        self.assertEquals(pywps.config.getSize("1gb"), 1024 * 1024 * 1024)
+        self.assertEquals(pywps.config.getSize("512kB"), 512 * 1024)
+        self.assertEquals(pywps.config.getSize("100"), 100)
+        self.assertEquals(pywps.config.getSize(0), 0)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ConfigSnapshotTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
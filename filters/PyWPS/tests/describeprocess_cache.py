@@ -0,0 +1,121 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+import pywps.Process
+from pywps.Wps import DescribeProcess
+
+import unittest
+from xml.dom import minidom
+
+
+class DescribeProcessCacheTestCase(unittest.TestCase):
+    """Test process descriptions are formated once per fingerprint"""
+    describeprocessrequest = "service=wps&request=describeprocess&version=1.0.0&identifier=all"
+    owsns = "http://www.opengis.net/ows/1.1"
+
+    def setUp(self):
+        DescribeProcess._fragments.clear()
+        self.described = []
+        described = self.described
+
+        class fooProcess(pywps.Process.WPSProcess):
+
+            def __init__(self):
+                pywps.Process.WPSProcess.__init__(
+                    self, identifier="foo", title="bar")
+                self.addLiteralInput(identifier="input", title="Input")
+                self.addLiteralOutput(identifier="output", title="Output")
+
+        class bazProcess(pywps.Process.WPSProcess):
+
+            def __init__(self):
+                pywps.Process.WPSProcess.__init__(
+                    self, identifier="baz", title="qux")
+
+        self.fooProcess = fooProcess
+        self.bazProcess = bazProcess
+
+        processDescription = DescribeProcess.DescribeProcess.processDescription
+
+        def countedDescription(request, process):
+            described.append(process.identifier)
+            return processDescription(request, process)
+        DescribeProcess.DescribeProcess.processDescription = countedDescription
+        self.processDescription = processDescription
+
+    def tearDown(self):
+        DescribeProcess.DescribeProcess.processDescription = \
+            self.processDescription
+        DescribeProcess._fragments.clear()
+
+    def _describe(self):
+        mypywps = pywps.Pywps(pywps.METHOD_GET)
+        inputs = mypywps.parseRequest(self.describeprocessrequest)
+        mypywps.performRequest(inputs, [self.fooProcess, self.bazProcess])
+        return mypywps.response
+
+    def testCache(self):
+        """Test only processes with fingerprint are cached"""
+        self.fooProcess.fingerprint = "a"
+        first = self._describe()
+        self.assertEquals(sorted(self.described), ["baz", "foo"])
+
+        second = self._describe()
+        self.assertEquals(sorted(self.described), ["baz", "baz", "foo"])
+        self.assertEquals(first, second)
+
+        xmldom = minidom.parseString(second)
+        identifiers = [node.firstChild.nodeValue for node in
+                       xmldom.getElementsByTagNameNS(self.owsns, "Identifier")]
+        self.assertTrue("foo" in identifiers)
+        self.assertTrue("input" in identifiers)
+        self.assertTrue("baz" in identifiers)
+
+        # new fingerprint, new description
+        self.fooProcess.fingerprint = "b"
+        self._describe()
+        self.assertEquals(sorted(self.described),
+                          ["baz", "baz", "baz", "foo", "foo"])
+
+    def testScope(self):
+        """Test processes of other scopes do not replace the cached ones"""
+        self.fooProcess.fingerprint = "a"
+        self.fooProcess.scope = "first.qgs"
+        self._describe()
+        self.fooProcess.fingerprint = "b"
+        self.fooProcess.scope = "second.qgs"
+        self._describe()
+        self.fooProcess.fingerprint = "a"
+        self.fooProcess.scope = "first.qgs"
+        self._describe()
+        self.assertEquals(self.described.count("foo"), 2)
+        self.assertEquals(len(DescribeProcess._fragments), 2)
+
+    def testLimit(self):
+        """Test the least recently used descriptions are dropped"""
+        maxFragments = DescribeProcess.MAXFRAGMENTS
+        DescribeProcess.MAXFRAGMENTS = 1
+        try:
+            self.fooProcess.fingerprint = "a"
+            self.fooProcess.scope = "first.qgs"
+            self._describe()
+            self.fooProcess.scope = "second.qgs"
+            self._describe()
+            self.assertEquals(len(DescribeProcess._fragments), 1)
+            self.fooProcess.scope = "first.qgs"
+            self._describe()
+            self.assertEquals(self.described.count("foo"), 3)
+        finally:
+            DescribeProcess.MAXFRAGMENTS = maxFragments
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        DescribeProcessCacheTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
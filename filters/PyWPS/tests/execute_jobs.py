@@ -0,0 +1,128 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import config
+from pywps.Wps.Execute import Jobs
+
+import unittest
+import tempfile
+import shutil
+import threading
+import time
+
+
+class ExecuteJobsTestCase(unittest.TestCase):
+    """Test Execute jobs are recorded in the job store"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.store = Jobs.JobStore(os.path.join(self.tmpDir, Jobs.JOBSFILE))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def testRecord(self):
+        """Test status transitions, timings and outputs are recorded"""
+        self.store.record("pywps-1", "processaccepted", identifier="buffer",
+                          statusLocation="http://foo/pywps-1.xml")
+        self.store.record("pywps-1", "processstarted", inputSize=1024)
+        self.store.record("pywps-1", "processsucceeded", percent=100)
+        self.store.setOutputs("pywps-1", {"output": "/tmp/output-1.gml"})
+
+        job = self.store.get("pywps-1")
+        self.assertEquals(job["identifier"], "buffer")
+        self.assertEquals(job["status"], "processsucceeded")
+        self.assertEquals(job["inputsize"], 1024)
+        self.assertEquals(job["percent"], 100)
+        self.assertEquals(job["statuslocation"], "http://foo/pywps-1.xml")
+        self.assertEquals(job["outputs"], {"output": "/tmp/output-1.gml"})
+        self.assertTrue(job["created"] <= job["started"] <= job["finished"])
+        self.assertEquals([t["status"] for t in job["transitions"]],
+                          ["processaccepted", "processstarted",
+                           "processsucceeded"])
+        self.assertEquals(self.store.get("pywps-2"), None)
+
+    def testList(self):
+        """Test jobs are listed by status and process, newest first"""
+        self.store.record("pywps-1", "processfailed", identifier="buffer")
+        self.store.record("pywps-2", "processstarted", identifier="buffer")
+        self.store.record("pywps-3", "processstarted", identifier="clip")
+
+        self.assertEquals([job["jobid"] for job in self.store.list()],
+                          ["pywps-3", "pywps-2", "pywps-1"])
+        self.assertEquals(
+            [job["jobid"] for job in self.store.list("processstarted")],
+            ["pywps-3", "pywps-2"])
+        self.assertEquals(
+            [job["jobid"] for job in self.store.list(identifier="buffer",
+                                                     limit=1, offset=1)],
+            ["pywps-1"])
+
+        limit = Jobs.MAXLIMIT
+        Jobs.MAXLIMIT = 2
+        try:
+            self.assertEquals(len(self.store.list(limit=-1)), 0)
+            self.assertEquals(len(self.store.list(limit=10)), 2)
+        finally:
+            Jobs.MAXLIMIT = limit
+
+    def testPrune(self):
+        """Test finished jobs are removed with their transitions"""
+        self.store.record("pywps-1", "processsucceeded")
+        self.store.record("pywps-2", "processstarted")
+        self.store.record("pywps-3", "processfailed")
+        self.assertEquals(self.store.prune(0), 0)
+        self.assertEquals(self.store.prune(time.time() + 1), 2)
+        self.assertEquals([job["jobid"] for job in self.store.list()],
+                          ["pywps-2"])
+        self.assertEquals(self.store.connect().execute(
+            "SELECT COUNT(*) FROM transitions").fetchone()[0], 1)
+
+    def testProcesses(self):
+        """Test jobs recorded by forked workers"""
+        self.store.record("pywps-1", "processaccepted", identifier="buffer")
+        pid = os.fork()
+        if not pid:
+            self.store.record("pywps-1", "processstarted")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        job = self.store.get("pywps-1")
+        self.assertEquals(job["status"], "processstarted")
+        self.assertEquals(job["pid"], pid)
+
+    def testThreads(self):
+        """Test jobs recorded by other threads"""
+        self.store.record("pywps-1", "processaccepted", identifier="buffer")
+        errors = []
+
+        def record():
+            try:
+                self.store.record("pywps-1", "processstarted")
+            except Exception, e:
+                errors.append(e)
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+        self.assertEquals(errors, [])
+        self.assertEquals(self.store.get("pywps-1")["status"],
+                          "processstarted")
+
+    def testConfiguration(self):
+        """Test the store is configured in the server section"""
+        config.setConfigValue("server", "jobstore", "")
+        self.assertEquals(Jobs.getJobStore(), None)
+        fileName = os.path.join(self.tmpDir, "jobs.sqlite")
+        config.setConfigValue("server", "jobstore", fileName)
+        self.assertEquals(Jobs.getJobStore().fileName, fileName)
+        self.assertTrue(Jobs.getJobStore() is Jobs.getJobStore())
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecuteJobsTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
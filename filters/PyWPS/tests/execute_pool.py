@@ -0,0 +1,113 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import config
+from pywps.Wps.Execute import Pool
+
+import unittest
+import tempfile
+import shutil
+import time
+
+
+def execute(pickleFileName, processes=None, snapshot=None):
+    """Job stub, writes the worker pid to the job file"""
+    open(pickleFileName, "w").write(str(os.getpid()))
+
+
+class ExecutePoolTestCase(unittest.TestCase):
+    """Test asynchronous Execute jobs are run by forked workers"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.execute = Pool.execute
+        Pool.execute = execute
+        self.pool = None
+
+    def tearDown(self):
+        Pool.execute = self.execute
+        if self.pool:
+            self.pool.stop(5)
+        shutil.rmtree(self.tmpDir)
+
+    def waitForJobs(self, jobs, timeout=10):
+        """Wait for the jobs, replace stopped workers meanwhile"""
+        end = time.time() + timeout
+        pids = []
+        while time.time() < end:
+            pids = [open(job).read() for job in jobs
+                    if os.path.exists(job) and os.path.getsize(job)]
+            if len(pids) == len(jobs):
+                break
+            self.pool.maintain()
+            time.sleep(0.1)
+        return pids
+
+    def testWorkers(self):
+        """Test workers are reused and replaced after maximum jobs"""
+        self.pool = Pool.WorkerPool(2, maxJobs=2)
+        jobs = [os.path.join(self.tmpDir, "job-%d" % i) for i in range(6)]
+        for job in jobs:
+            self.assertTrue(self.pool.submit(job))
+        pids = self.waitForJobs(jobs)
+        self.assertEquals(len(pids), 6)
+        self.assertFalse(str(os.getpid()) in pids)
+        for pid in set(pids):
+            self.assertTrue(pids.count(pid) <= 2)
+        self.assertTrue(self.pool.started >= 3)
+        self.assertEquals(self.pool.submitted, 6)
+
+    def testRecycle(self):
+        """Test recycled workers are replaced by new ones"""
+        self.pool = Pool.WorkerPool(1)
+        first = os.path.join(self.tmpDir, "first")
+        self.pool.submit(first)
+        self.assertEquals(len(self.waitForJobs([first])), 1)
+
+        # the new worker is started at once for the queued jobs
+        self.pool.recycle()
+        self.assertEquals(self.pool.started, 2)
+        second = os.path.join(self.tmpDir, "second")
+        self.pool.submit(second)
+        self.assertEquals(len(self.waitForJobs([second])), 1)
+        self.assertNotEquals(open(first).read(), open(second).read())
+        self.assertEquals(self.pool.started, 2)
+
+    def testStop(self):
+        """Test jobs still queued are spawned, when the pool stops"""
+        spawned = []
+        spawn = Pool.spawn
+        Pool.spawn = lambda *args: spawned.append(args)
+        try:
+            self.pool = Pool.WorkerPool(0)
+            self.assertTrue(self.pool.submit("job-1", None, "status-1"))
+            self.assertTrue(self.pool.submit("job-2", None, "status-2"))
+            self.assertEquals(self.pool.stop(0), 2)
+        finally:
+            Pool.spawn = spawn
+        self.assertEquals(spawned, [("job-1", "status-1"),
+                                    ("job-2", "status-2")])
+
+    def testPickleError(self):
+        """Test jobs with processes, which can not be pickled, are not
+        queued"""
+        self.pool = Pool.WorkerPool(1)
+        self.assertFalse(self.pool.submit("job", lambda: None))
+        self.assertEquals(self.pool.started, 0)
+
+    def testConfiguration(self):
+        """Test the pool is configured in the server section"""
+        config.setConfigValue("server", "workers", "0")
+        self.assertEquals(Pool.getPool(), None)
+        self.assertFalse(Pool.submit("job"))
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecutePoolTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,88 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps.Wps.Execute import Publish
+
+import unittest
+import tempfile
+import shutil
+
+
+class ExecutePublishTestCase(unittest.TestCase):
+    """Test output files are published without copies"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpDir, "output.tif")
+        self.target = os.path.join(self.tmpDir, "output-1.tif")
+        with open(self.source, "w") as f:
+            f.write("raster")
+
+    def tearDown(self):
+        Publish.isSameFilesystem = self.isSameFilesystem
+        os.link = self.link
+        os.rename = self.rename
+        shutil.rmtree(self.tmpDir)
+
+    isSameFilesystem = staticmethod(Publish.isSameFilesystem)
+    link = staticmethod(os.link)
+    rename = staticmethod(os.rename)
+
+    def testRename(self):
+        """Test temporary files are moved"""
+        self.assertEquals(
+            Publish.publishFile(self.source, self.target, True),
+            Publish.RENAME)
+        self.assertFalse(os.path.exists(self.source))
+        self.assertEquals(open(self.target).read(), "raster")
+
+    def testHardlink(self):
+        """Test other files are linked, the target is replaced"""
+        with open(self.target, "w") as f:
+            f.write("reserved")
+        self.assertEquals(Publish.publishFile(self.source, self.target),
+                          Publish.HARDLINK)
+        self.assertEquals(os.stat(self.source).st_ino,
+                          os.stat(self.target).st_ino)
+        self.assertEquals(sorted(os.listdir(self.tmpDir)),
+                          ["output-1.tif", "output.tif"])
+
+    def testCopy(self):
+        """Test files are copied to other filesystems, or cloned when they
+        can not be linked"""
+        Publish.isSameFilesystem = lambda fileName, dirName: False
+        self.assertEquals(Publish.publishFile(self.source, self.target, True),
+                          Publish.COPYFILE)
+        self.assertTrue(os.path.exists(self.source))
+        Publish.isSameFilesystem = self.isSameFilesystem
+
+        def link(source, target):
+            raise OSError("link is not permitted")
+        os.link = link
+        self.assertTrue(Publish.publishFile(self.source, self.target) in
+                        (Publish.REFLINK, Publish.COPYFILE))
+        self.assertEquals(open(self.target).read(), "raster")
+        self.assertTrue(Publish.stats[Publish.COPYFILE] >= 1)
+
+    def testRenameError(self):
+        """Test the linked file is removed, when it can not replace the
+        target, and the file is copied"""
+        def rename(source, target):
+            raise OSError("rename is not permitted")
+        os.rename = rename
+        self.assertEquals(Publish.publishFile(self.source, self.target),
+                          Publish.COPYFILE)
+        self.assertEquals(open(self.target).read(), "raster")
+        self.assertEquals(sorted(os.listdir(self.tmpDir)),
+                          ["output-1.tif", "output.tif"])
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecutePublishTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,83 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import config
+from pywps.Wps.Execute import Execute
+
+import unittest
+import tempfile
+import shutil
+
+
+class FakeOutput:
+    type = "ComplexValue"
+    identifier = "output"
+    format = {"mimetype": "image/tiff"}
+
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeProcess:
+
+    def __init__(self, value):
+        self.outputs = {"output": FakeOutput(value)}
+
+
+class RawDataExecute(Execute):
+    """Execute request without the process run"""
+
+    def __init__(self):
+        pass
+
+
+class ExecuteRawDataTestCase(unittest.TestCase):
+    """Test raw outputs are streamed from their location"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.outputPath = os.path.join(self.tmpDir, "outputs")
+        self.workingDir = os.path.join(self.tmpDir, "pywps-instance")
+        os.mkdir(self.outputPath)
+        os.mkdir(self.workingDir)
+        config.setConfigValue("server", "outputPath", self.outputPath)
+        self.execute = RawDataExecute()
+        self.execute.pid = os.getpid()
+        self.execute.rawDataOutput = "output"
+        self.execute.dirsToBeRemoved = [self.workingDir]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def setRawData(self, fileName):
+        with open(fileName, "wb") as f:
+            f.write("raster")
+        self.execute.process = FakeProcess(fileName)
+        self.execute.setRawData()
+        self.execute.response.close()
+        return self.execute.response.name
+
+    def testPersistent(self):
+        """Test output outside of the temporary dirs is not copied"""
+        fileName = os.path.join(self.tmpDir, "output.tif")
+        self.assertEquals(self.setRawData(fileName), fileName)
+        self.assertEquals(self.execute.contentType, "image/tiff")
+        self.assertEquals(os.listdir(self.outputPath), [])
+
+    def testTemporary(self):
+        """Test output in the working dir is copied to outputPath"""
+        fileName = os.path.join(self.workingDir, "output.tif")
+        outFile = self.setRawData(fileName)
+        self.assertEquals(os.path.dirname(outFile), self.outputPath)
+        self.assertEquals(open(outFile).read(), "raster")
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecuteRawDataTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,178 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import config
+from pywps.Wps.Execute import Retention, Jobs
+
+import unittest
+import tempfile
+import shutil
+import threading
+import time
+
+DAY = 86400
+
+
+class ExecuteRetentionTestCase(unittest.TestCase):
+    """Test old outputs and temporary files are removed"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.outputPath = os.path.join(self.tmpDir, "outputs")
+        self.tempPath = os.path.join(self.tmpDir, "temp")
+        os.mkdir(self.outputPath)
+        os.mkdir(self.tempPath)
+        self.now = time.time()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def create(self, path, name, age, size=100):
+        fileName = os.path.join(path, name)
+        with open(fileName, "w") as f:
+            f.write("x" * size)
+        used = self.now - age * DAY
+        os.utime(fileName, (used, used))
+        return fileName
+
+    def testTtl(self):
+        """Test files are removed after the time to live of their type"""
+        self.create(self.outputPath, "pywps-1234-abcd.xml", 3)
+        self.create(self.outputPath, "pywps-1234-abcd.qgs", 3)
+        self.create(self.outputPath, "output-1234-abcd.tif", 3, 1000)
+        self.create(self.outputPath, "output-5678-abcd.tif", 1)
+        self.create(self.tempPath, "request-1234-abcd", 3)
+        self.create(self.tempPath, "pywps-jobs.sqlite", 3)
+        workingDir = os.path.join(self.tempPath, "pywps-instanceXYZ")
+        os.mkdir(workingDir)
+        self.create(workingDir, "input", 3)
+        used = self.now - 3 * DAY
+        os.utime(workingDir, (used, used))
+
+        jobStore = Jobs.JobStore(os.path.join(self.tmpDir, Jobs.JOBSFILE))
+        jobStore.record("pywps-1234-abcd", "processsucceeded")
+        jobStore.connect().execute("UPDATE jobs SET updated = ?",
+                                   (self.now - 3 * DAY,))
+        jobStore.record("pywps-5678-abcd", "processsucceeded")
+
+        retention = Retention.Retention(
+            self.outputPath, self.tempPath,
+            {Retention.STATUS: 2 * DAY, Retention.OUTPUT: 2 * DAY,
+             Retention.TEMP: 2 * DAY}, jobStore=jobStore)
+        metrics = retention.sweep(self.now)
+        self.assertEquals(metrics["jobs"], 1)
+        self.assertEquals(jobStore.get("pywps-1234-abcd"), None)
+        self.assertEquals(sorted(os.listdir(self.outputPath)),
+                          ["output-5678-abcd.tif", "pywps-1234-abcd.qgs"])
+        self.assertEquals(sorted(os.listdir(self.tempPath)),
+                          ["pywps-jobs.sqlite", "pywps-retention.json",
+                           "pywps-retention.lock"])
+        self.assertEquals(metrics["files"], 4)
+        self.assertEquals(metrics["types"][Retention.OUTPUT],
+                          {"files": 1, "bytes": 1000})
+        self.assertEquals(metrics["outputsize"], 200)
+
+    def testRunning(self):
+        """Test files of the running jobs and processes are kept"""
+        pid = os.fork()
+        if not pid:
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        jobStore = Jobs.JobStore(os.path.join(self.tmpDir, Jobs.JOBSFILE))
+        jobStore.record("pywps-1234-abcd", "processstarted")
+        jobStore.record("pywps-5678-abcd", "processstarted")
+        jobStore.connect().execute(
+            "UPDATE jobs SET pid = ? WHERE jobid = ?",
+            (pid, "pywps-5678-abcd"))
+        for jobId in ("1234-abcd", "5678-abcd"):
+            self.create(self.outputPath, "pywps-%s.xml" % jobId, 3)
+            self.create(self.tempPath, "request-%s" % jobId, 3)
+            self.create(self.tempPath, "state-pywps-%s" % jobId, 3)
+        for workingPid in (os.getpid(), pid):
+            workingDir = os.path.join(self.tempPath,
+                                      "pywps-instance%d-XYZ" % workingPid)
+            os.mkdir(workingDir)
+            used = self.now - 3 * DAY
+            os.utime(workingDir, (used, used))
+
+        retention = Retention.Retention(
+            self.outputPath, self.tempPath,
+            {Retention.STATUS: DAY, Retention.TEMP: DAY}, jobStore=jobStore)
+        metrics = retention.sweep(self.now)
+        self.assertEquals(os.listdir(self.outputPath),
+                          ["pywps-1234-abcd.xml"])
+        self.assertEquals(sorted(os.listdir(self.tempPath)),
+                          ["pywps-instance%d-XYZ" % os.getpid(),
+                           "pywps-retention.json", "pywps-retention.lock",
+                           "request-1234-abcd", "state-pywps-1234-abcd"])
+        self.assertEquals(metrics["running"], 4)
+        self.assertEquals(metrics["files"], 4)
+
+    def testThread(self):
+        """Test the sweeper thread uses the job store of the server"""
+        jobStore = Jobs.JobStore(os.path.join(self.tmpDir, Jobs.JOBSFILE))
+        jobStore.record("pywps-1234-abcd", "processsucceeded")
+        jobStore.connect().execute("UPDATE jobs SET updated = ?",
+                                   (self.now - 3 * DAY,))
+        self.create(self.outputPath, "pywps-1234-abcd.xml", 3)
+        self.create(self.tempPath, "request-1234-abcd", 3)
+
+        retention = Retention.Retention(
+            self.outputPath, self.tempPath,
+            {Retention.STATUS: DAY, Retention.TEMP: DAY}, jobStore=jobStore)
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(retention.sweep(self.now)))
+        thread.start()
+        thread.join()
+        self.assertEquals(results[0]["jobs"], 1)
+        self.assertEquals(results[0]["files"], 2)
+        self.assertEquals(os.listdir(self.outputPath), [])
+        jobStore.record("pywps-5678-abcd", "processaccepted")
+        self.assertEquals(jobStore.getActive().keys(), ["pywps-5678-abcd"])
+
+    def testQuota(self):
+        """Test the least recently used outputs are removed over quota"""
+        self.create(self.outputPath, "a.tif", 3)
+        self.create(self.outputPath, "b.tif", 1)
+        self.create(self.outputPath, "c.tif", 2)
+        retention = Retention.Retention(self.outputPath, self.tempPath,
+                                        quota=250)
+        retention.sweep(self.now)
+        self.assertEquals(sorted(os.listdir(self.outputPath)),
+                          ["b.tif", "c.tif"])
+        retention.quota = 150
+        retention.sweep(self.now)
+        self.assertEquals(os.listdir(self.outputPath), ["b.tif"])
+
+        metrics = retention.getMetrics()
+        self.assertEquals(metrics["sweeps"], 2)
+        self.assertEquals(metrics["files"], 2)
+        self.assertEquals(metrics["bytes"], 200)
+        self.assertEquals(metrics["outputsize"], 100)
+
+    def testConfiguration(self):
+        """Test the retention is configured in the server section"""
+        config.setConfigValue("server", "outputPath", self.outputPath)
+        config.setConfigValue("server", "tempPath", self.tempPath)
+        config.setConfigValue("server", "statusttl", "7d")
+        config.setConfigValue("server", "outputquota", "1mb")
+        config.setConfigValue("server", "retentioninterval", "0")
+        retention = Retention.getRetention()
+        self.assertEquals(retention.ttls[Retention.STATUS], 7 * DAY)
+        self.assertEquals(retention.quota, 1024 * 1024)
+        self.assertEquals(Retention.getDuration("90"), 90)
+        self.assertEquals(Retention.getDuration("2h"), 7200)
+        self.assertFalse(Retention.startSweeper())
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecuteRetentionTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
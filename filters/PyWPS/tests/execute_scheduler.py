@@ -0,0 +1,141 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import config
+from pywps.Wps.Execute import Scheduler
+
+import unittest
+import tempfile
+import shutil
+import time
+
+
+class ExecuteSchedulerTestCase(unittest.TestCase):
+    """Test Execute requests are admitted by priorities and limits"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.stateFile = os.path.join(self.tmpDir, Scheduler.STATEFILE)
+        self.pollInterval = Scheduler.POLLINTERVAL
+        Scheduler.POLLINTERVAL = 0.05
+
+    def tearDown(self):
+        Scheduler.POLLINTERVAL = self.pollInterval
+        shutil.rmtree(self.tmpDir)
+
+    def getJob(self, identifier, priority, since):
+        return {"pid": os.getpid(), "identifier": identifier,
+                "provider": Scheduler.getProvider(identifier),
+                "priority": priority, "since": since}
+
+    def testLimits(self):
+        """Test the provider and algorithm limits"""
+        scheduler = Scheduler.Scheduler(
+            self.stateFile, limits={"grass7": 1, "saga:slope": 1})
+        grass = scheduler.acquire("grass7:r.slope")
+        self.assertRaises(pywps.ServerBusy, scheduler.acquire,
+                          "grass7:r.aspect")
+        slope = scheduler.acquire("saga:slope")
+        self.assertRaises(pywps.ServerBusy, scheduler.acquire, "saga:slope")
+        scheduler.release(scheduler.acquire("saga:aspect"))
+
+        scheduler.release(grass)
+        scheduler.release(scheduler.acquire("grass7:r.aspect"))
+
+        stats = scheduler.getStats()
+        self.assertEquals(stats["running"], 1)
+        self.assertEquals(stats["runningprocesses"], {"saga:slope": 1})
+        self.assertEquals(stats["admitted"], 4)
+        self.assertEquals(stats["rejected"], 2)
+
+    def testMaximalOperations(self):
+        """Test the requests wait for maxoperations and time out"""
+        scheduler = Scheduler.Scheduler(self.stateFile, maxQueue=1,
+                                        timeout=0.2, limits={"grass7": 2})
+        start = time.time()
+        self.assertRaises(pywps.ServerBusy, scheduler.acquire,
+                          "saga:slope", lambda: False)
+        self.assertTrue(time.time() - start >= 0.2)
+
+        stats = scheduler.getStats()
+        self.assertEquals(stats["timedout"], 1)
+        self.assertEquals(stats["waiting"], 0)
+        self.assertEquals(stats["running"], 0)
+
+    def testPriority(self):
+        """Test the waiting requests are admitted by priority, the request
+        at the limit does not block the others"""
+        scheduler = Scheduler.Scheduler(self.stateFile, maxQueue=10,
+                                        limits={"grass7": 1})
+        state = {"running": {}, "waiting": {},
+                 "stats": {"admitted": 0, "totalwait": 0, "maxwait": 0}}
+        now = time.time()
+        state["running"]["1"] = self.getJob("grass7:r.slope",
+                                            Scheduler.NORMAL, now - 5)
+        state["waiting"]["2"] = self.getJob("grass7:r.aspect",
+                                            Scheduler.HIGH, now - 3)
+        state["waiting"]["3"] = self.getJob("saga:slope",
+                                            Scheduler.NORMAL, now - 2)
+        state["waiting"]["4"] = self.getJob("qgis:buffer",
+                                            Scheduler.LOW, now - 4)
+
+        # grass7 is at the limit, saga is first
+        self.assertFalse(scheduler._admit(state, "4", state["waiting"]["4"],
+                                          None))
+        self.assertTrue(scheduler._admit(state, "3", state["waiting"]["3"],
+                                         None))
+        self.assertTrue(scheduler._admit(state, "4", state["waiting"]["4"],
+                                         None))
+        self.assertEquals(state["waiting"].keys(), ["2"])
+        self.assertEquals(state["stats"]["admitted"], 2)
+        self.assertTrue(state["stats"]["maxwait"] >= 4)
+
+    def testStoppedProcess(self):
+        """Test requests of stopped processes are forgotten"""
+        scheduler = Scheduler.Scheduler(self.stateFile, limits={"grass7": 1})
+        pid = os.fork()
+        if not pid:
+            scheduler.acquire("grass7:r.slope")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        scheduler.release(scheduler.acquire("grass7:r.slope"))
+
+    def testConfiguration(self):
+        """Test the scheduler is configured in the server and qgis
+        sections"""
+        config.setConfigValue("server", "maxqueue", "0")
+        config.setConfigValue("qgis", "max_operations", "")
+        self.assertEquals(Scheduler.getScheduler(), None)
+
+        config.setConfigValue("server", "maxqueue", "3")
+        config.setConfigValue("server", "queuetimeout", "30")
+        config.setConfigValue("qgis", "max_operations",
+                              "grass7=2, saga:slope=1")
+        config.setConfigValue("qgis", "high_priority", "qgis")
+        config.setConfigValue("qgis", "low_priority", "grass7,qgis:buffer")
+        scheduler = Scheduler.getScheduler()
+        self.assertEquals(scheduler.maxQueue, 3)
+        self.assertEquals(scheduler.timeout, 30)
+        self.assertEquals(scheduler.limits, {"grass7": 2, "saga:slope": 1})
+        self.assertEquals(scheduler.getPriority("qgis:buffer"),
+                          Scheduler.LOW)
+        self.assertEquals(scheduler.getPriority("qgis:clip"), Scheduler.HIGH)
+        self.assertEquals(scheduler.getPriority("saga:slope"),
+                          Scheduler.NORMAL)
+
+        # malformed limits are ignored
+        config.setConfigValue("qgis", "max_operations",
+                              "grass7, saga:slope=x, =2, qgis=-1, gdal=3")
+        self.assertEquals(Scheduler.getScheduler().limits, {"gdal": 3})
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        ExecuteSchedulerTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
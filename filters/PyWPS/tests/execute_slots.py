@@ -0,0 +1,82 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps.Wps.Execute import Slots
+
+import unittest
+import tempfile
+import shutil
+import subprocess
+import signal
+
+
+class ExecuteSlotsTestCase(unittest.TestCase):
+    """Test running requests are counted by locked slot files"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.slots = Slots.getSlots(2, self.tmpDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def testSlots(self):
+        """Test the slots are taken and released"""
+        first = self.slots.acquire()
+        second = self.slots.acquire()
+        self.assertTrue(first and second)
+        self.assertNotEquals(first.name, second.name)
+        self.assertEquals(self.slots.acquire(), None)
+        self.assertEquals(self.slots.count(), 2)
+
+        self.slots.release(first)
+        self.assertEquals(self.slots.count(), 1)
+        third = self.slots.acquire()
+        self.assertEquals(third.name, first.name)
+        self.slots.release(second)
+        self.slots.release(third)
+        self.assertEquals(self.slots.count(), 0)
+
+    def testStoppedProcess(self):
+        """Test slots of stopped processes are reclaimed"""
+        pid = os.fork()
+        if not pid:
+            self.slots.acquire()
+            self.slots.acquire()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEquals(self.slots.count(), 0)
+
+    def testChildProcess(self):
+        """Test programs started by the process do not keep the slot of
+        the stopped process"""
+        pid = os.fork()
+        if not pid:
+            slot = self.slots.acquire()
+            child = subprocess.Popen(["sleep", "10"])
+            open(os.path.join(self.tmpDir, "child"), "w").write(
+                str(child.pid))
+            os._exit(0)
+        os.waitpid(pid, 0)
+        try:
+            self.assertEquals(self.slots.count(), 0)
+        finally:
+            os.kill(int(open(os.path.join(self.tmpDir, "child")).read()),
+                    signal.SIGTERM)
+
+    def testConfiguration(self):
+        """Test there are no slots without limit"""
+        self.assertEquals(Slots.getSlots(0, self.tmpDir), None)
+        self.assertEquals(self.slots.slotsDir,
+                          os.path.join(self.tmpDir, Slots.SLOTSDIR))
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecuteSlotsTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,93 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps.Template import TemplateProcessor
+from pywps.Wps.Execute import Status
+
+import unittest
+import tempfile
+import shutil
+import time
+
+TEMPLATEDIR = os.path.join(pywpsPath, "pywps", "Templates", "1_0_0")
+
+
+class ExecuteStatusTestCase(unittest.TestCase):
+    """Test the stored status document is throttled and replaced"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.tmpDir, "status.xml")
+        self.templateProcessor = TemplateProcessor(
+            os.path.join(TEMPLATEDIR, "Execute.tmpl"))
+        for (key, value) in {"encoding": "utf-8", "identifier": "dummy",
+                             "title": "Dummy", "lang": "en-CA",
+                             "statuslocation": "http://foo/status.xml"}.items():
+            self.templateProcessor.set(key, value)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def update(self, writer, status, percent=0, force=False):
+        values = {"statustime": "2016-01-01T00:00:00Z",
+                  "processaccepted": 0, "processstarted": 0,
+                  "percentcompleted": percent}
+        values[status] = "Process %s" % status
+        for (key, value) in values.items():
+            self.templateProcessor.set(key, value)
+        return writer.update(self.templateProcessor, status, values, force)
+
+    def testThrottle(self):
+        """Test progress updates are written at most once per interval,
+        changes of the status always"""
+        writer = Status.StatusWriter(self.fileName, TEMPLATEDIR, 10)
+        self.assertTrue(self.update(writer, "processaccepted"))
+        self.assertTrue(self.update(writer, "processstarted", 10))
+        self.assertFalse(self.update(writer, "processstarted", 20))
+        self.assertTrue(self.update(writer, "processstarted", 30, True))
+        self.assertEquals(writer.written, 3)
+
+        writer.interval = 0
+        self.assertTrue(self.update(writer, "processstarted", 40))
+        self.assertEquals(writer.written, 4)
+
+    def testIncremental(self):
+        """Test the document with new status section is the same as the
+        whole rendered one"""
+        writer = Status.StatusWriter(self.fileName, TEMPLATEDIR)
+        self.update(writer, "processaccepted")
+        self.assertTrue(writer._prefix)
+        for percent in (10, 55):
+            self.update(writer, "processstarted", percent)
+            document = open(self.fileName).read()
+            self.assertEquals(document, self.templateProcessor.__str__())
+            self.assertTrue(document.find('percentCompleted="%d"' %
+                                          percent) > -1)
+
+    def testAtomic(self):
+        """Test the document is replaced, temporary files are removed"""
+        open(self.fileName, "w").write("old")
+        reader = open(self.fileName)
+        writer = Status.StatusWriter(self.fileName, TEMPLATEDIR)
+        writer.write(self.templateProcessor.stream())
+        self.assertEquals(reader.read(), "old")
+        self.assertEquals(open(self.fileName).read(),
+                          self.templateProcessor.__str__())
+        self.assertEquals(os.listdir(self.tmpDir), ["status.xml"])
+        self.assertEquals(writer._prefix, None)
+
+    def testInterval(self):
+        """Test the interval is configured in milliseconds"""
+        pywps.config.setConfigValue("server", "statusinterval", "250")
+        self.assertEquals(Status.getInterval(), 0.25)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(ExecuteStatusTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,121 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+import pywps.Process
+from pywps.Wps import ProcessClassProvider
+
+import unittest
+from StringIO import StringIO
+from xml.dom import minidom
+
+created = []
+
+
+class fooProcess(pywps.Process.WPSProcess):
+    identifier = "foo"
+    title = "Foo"
+    abstract = "Foo process"
+    version = "0.1"
+
+    def __init__(self):
+        created.append(self.identifier)
+        pywps.Process.WPSProcess.__init__(
+            self, identifier="foo", title="Foo", version="0.1")
+        self.value = self.addLiteralInput(identifier="value", title="Value",
+                                          type=type(0))
+        self.output = self.addLiteralOutput(identifier="output",
+                                            title="Output", type=type(0))
+
+    def execute(self):
+        self.output.setValue(self.value.getValue() + 1)
+
+
+class barProcess(fooProcess):
+    identifier = "bar"
+    title = "Bar"
+
+    def __init__(self):
+        created.append(self.identifier)
+        pywps.Process.WPSProcess.__init__(
+            self, identifier="bar", title="Bar", version="0.1")
+
+
+class ProcessProviderTestCase(unittest.TestCase):
+    """Test processes given by a provider are only created when needed"""
+    getcapabilitiesrequest = "service=wps&request=getcapabilities"
+    getdescribeprocessrequest = "service=wps&request=describeprocess&version=1.0.0&identifier=foo"
+    getexecuterequest = "service=wps&request=execute&version=1.0.0&identifier=foo&datainputs=[value=41]"
+    postdescribeprocessrequest = """<?xml version="1.0" encoding="UTF-8"?>
+<DescribeProcess xmlns="http://www.opengis.net/wps/1.0.0"
+	xmlns:ows="http://www.opengis.net/ows/1.1"
+	service="WPS" version="1.0.0">
+	<ows:Identifier>bar</ows:Identifier>
+</DescribeProcess>"""
+    wpsns = "http://www.opengis.net/wps/1.0.0"
+    owsns = "http://www.opengis.net/ows/1.1"
+
+    def setUp(self):
+        del created[:]
+        self.provider = ProcessClassProvider([None, fooProcess, barProcess])
+
+    def testGetCapabilities(self):
+        """Test GetCapabilities does not create processes"""
+        mypywps = pywps.Pywps(pywps.METHOD_GET)
+        inputs = mypywps.parseRequest(self.getcapabilitiesrequest)
+        mypywps.performRequest(inputs, self.provider)
+        xmldom = minidom.parseString(mypywps.response)
+        self.assertEquals(
+            len(xmldom.getElementsByTagNameNS(self.wpsns, "Process")), 2)
+        self.assertEquals(created, [])
+
+    def testDescribeProcess(self):
+        """Test DescribeProcess creates only the described process"""
+        mypywps = pywps.Pywps(pywps.METHOD_GET)
+        inputs = mypywps.parseRequest(self.getdescribeprocessrequest)
+        mypywps.performRequest(inputs, self.provider)
+        xmldom = minidom.parseString(mypywps.response)
+        self.assertEquals(len(xmldom.getElementsByTagNameNS(
+            self.wpsns, "ProcessDescriptions")), 1)
+        self.assertEquals(created, ["foo"])
+
+        # POST request, the identifier is in the body
+        del created[:]
+        mypywps = pywps.Pywps(pywps.METHOD_POST)
+        inputs = mypywps.parseRequest(
+            StringIO(self.postdescribeprocessrequest))
+        mypywps.performRequest(inputs, self.provider)
+        xmldom = minidom.parseString(mypywps.response)
+        self.assertEquals(len(xmldom.getElementsByTagNameNS(
+            self.wpsns, "ProcessDescriptions")), 1)
+        self.assertEquals(created, ["bar"])
+
+    def testExecute(self):
+        """Test Execute creates only the executed process"""
+        mypywps = pywps.Pywps(pywps.METHOD_GET)
+        inputs = mypywps.parseRequest(self.getexecuterequest)
+        mypywps.performRequest(inputs, self.provider)
+        xmldom = minidom.parseString(mypywps.response)
+        self.assertEquals(len(xmldom.getElementsByTagNameNS(
+            self.wpsns, "ProcessSucceeded")), 1)
+        self.assertEquals(created, ["foo"])
+
+    def testUnknownProcess(self):
+        """Test unknown identifiers are still invalid"""
+        mypywps = pywps.Pywps(pywps.METHOD_GET)
+        inputs = mypywps.parseRequest(
+            "service=wps&request=describeprocess&version=1.0.0&identifier=baz")
+        self.assertRaises(pywps.InvalidParameterValue,
+                          mypywps.performRequest, inputs, self.provider)
+        self.assertEquals(created, [])
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        ProcessProviderTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
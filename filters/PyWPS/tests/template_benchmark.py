@@ -0,0 +1,90 @@
+"""
+Benchmark of the PyWPS templates: the token interpreter compared to the
+templates compiled to Python functions, on the 1_0_0 templates.
+
+Values are taken from GetCapabilities and DescribeProcess requests on the
+test processes, the process list is repeated to get a large catalog.
+"""
+__license__ = "GPL"
+
+import os
+import sys
+import time
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path.insert(0, pywpsPath)
+
+import pywps
+from pywps.Template import TemplateProcessor
+
+os.environ["PYWPS_CFG"] = os.path.join(pywpsPath, "pywps", "default.cfg")
+os.environ["PYWPS_PROCESSES"] = os.path.join(pywpsPath, "tests", "processes")
+
+REPEAT = 5
+
+
+class RecordingTemplateProcessor(TemplateProcessor):
+    """Template processor keeping the values set by the requests"""
+    contexts = {}
+
+    def set(self, key, value, tokens=None, parent=None):
+        if tokens is None and parent is None:
+            RecordingTemplateProcessor.contexts.setdefault(
+                self._file, {})[key] = value
+        return TemplateProcessor.set(self, key, value, tokens, parent)
+
+
+def getContexts():
+    """Values of the GetCapabilities and DescribeProcess templates"""
+    import pywps.Wps
+    pywps.Wps.TemplateProcessor = RecordingTemplateProcessor
+    try:
+        for request in ["service=wps&request=getcapabilities",
+                        "service=wps&request=describeprocess&version=1.0.0&identifier=all"]:
+            mypywps = pywps.Pywps(pywps.METHOD_GET)
+            inputs = mypywps.parseRequest(request)
+            mypywps.performRequest(inputs)
+    finally:
+        pywps.Wps.TemplateProcessor = TemplateProcessor
+
+    contexts = RecordingTemplateProcessor.contexts
+    for templateFile in contexts:
+        for key in ("Processes",):
+            if key in contexts[templateFile]:
+                contexts[templateFile][key] = contexts[
+                    templateFile][key] * REPEAT
+    return contexts
+
+
+def benchmark(templateFile, context, interpreted, count=3):
+    """Format the template, return the CPU time of one run"""
+    start = time.clock()
+    for i in range(count):
+        template = TemplateProcessor(templateFile, interpreted=interpreted)
+        for key in context:
+            template.set(key, context[key])
+        text = template.__str__()
+    return ((time.clock() - start) / count, text)
+
+
+if __name__ == "__main__":
+    contexts = getContexts()
+    for templateFile in sorted(contexts):
+        context = contexts[templateFile]
+        # DescribeProcess sets formated items, set the values instead
+        if "DescribeProcess" in templateFile:
+            mypywps = pywps.Pywps(pywps.METHOD_GET)
+            mypywps.parseRequest(
+                "service=wps&request=describeprocess&version=1.0.0&identifier=all")
+            mypywps.performRequest()
+            context["Processes"] = mypywps.request.processesDescription() * \
+                REPEAT
+        (interpretedTime, interpretedText) = benchmark(templateFile,
+                                                       context, True)
+        (compiledTime, compiledText) = benchmark(templateFile,
+                                                 context, False)
+        print "%s (%d processes): interpreted %.4f, compiled %.4f CPU Time, x%.1f%s" % (
+            os.path.basename(templateFile), len(context.get("Processes", [])),
+            interpretedTime, compiledTime,
+            interpretedTime / max(compiledTime, 0.000001),
+            interpretedText != compiledText and " DIFFERENT OUTPUT" or "")
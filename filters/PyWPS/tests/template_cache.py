@@ -0,0 +1,98 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import Template
+from pywps.Template import TemplateProcessor
+
+import unittest
+import tempfile
+import shutil
+
+TEMPLATE = """<r><TMPL_VAR title><TMPL_INCLUDE Part.tmpl></r>
+"""
+PART = """<p><TMPL_VAR title></p>"""
+
+
+class TemplateCacheTestCase(unittest.TestCase):
+    """Test parsed templates are shared by the processors of the process"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmpDir, Template.INCDIR))
+        self.templateFile = os.path.join(self.tmpDir, "Test.tmpl")
+        self.compiledFile = os.path.join(self.tmpDir, "Test.tmplc")
+        self.partFile = os.path.join(self.tmpDir, Template.INCDIR,
+                                     "Part.tmpl")
+        open(self.templateFile, "w").write(TEMPLATE)
+        open(self.partFile, "w").write(PART)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def touch(self, fileName, text):
+        """Rewrite the file with newer modification time"""
+        mtime = os.path.getmtime(fileName)
+        open(fileName, "w").write(text)
+        os.utime(fileName, (mtime + 10, mtime + 10))
+
+    def testShared(self):
+        """Test the tokens are parsed once, the compiled file is not read
+        again"""
+        first = TemplateProcessor(self.templateFile)
+        self.assertTrue(os.path.isfile(self.compiledFile))
+        os.remove(self.compiledFile)
+
+        second = TemplateProcessor(self.templateFile)
+        self.assertTrue(second.tokens is first.tokens)
+        self.assertTrue(second.getCompiled() is first.getCompiled())
+        self.assertFalse(os.path.exists(self.compiledFile))
+
+        second.set("title", "a")
+        self.assertEquals(second.__str__(), "<r>a<p>a</p></r>\n")
+
+    def testChanged(self):
+        """Test the template is parsed again when it or an included file
+        changes"""
+        first = TemplateProcessor(self.templateFile)
+
+        self.touch(self.partFile, "<q><TMPL_VAR title></q>")
+        second = TemplateProcessor(self.templateFile)
+        self.assertFalse(second.tokens is first.tokens)
+        second.set("title", "b")
+        self.assertEquals(second.__str__(), "<r>b<q>b</q></r>\n")
+
+        self.touch(self.templateFile, "<s><TMPL_VAR title></s>")
+        third = TemplateProcessor(self.templateFile)
+        third.set("title", "c")
+        self.assertEquals(third.__str__(), "<s>c</s>")
+
+    def testCopyOnWrite(self):
+        """Test the interpreter does not set values to the shared tokens"""
+        first = TemplateProcessor(self.templateFile, interpreted=True)
+        first.set("title", "a")
+        second = TemplateProcessor(self.templateFile, interpreted=True)
+        self.assertEquals(second.__str__(), "<r>None<p>None</p></r>\n")
+        self.assertEquals(first.__str__(), "<r>a<p>a</p></r>\n")
+
+    def testReadOnly(self):
+        """Test the template is used when the compiled form can not be
+        stored"""
+        # a directory can not be replaced by the compiled file
+        os.mkdir(self.compiledFile)
+        processor = TemplateProcessor(self.templateFile)
+        processor.set("title", "a")
+        self.assertEquals(processor.__str__(), "<r>a<p>a</p></r>\n")
+        self.assertEquals(sorted(os.listdir(self.tmpDir)),
+                          sorted(["Test.tmpl", "Test.tmplc", Template.INCDIR]))
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        TemplateCacheTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
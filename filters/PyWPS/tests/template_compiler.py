@@ -0,0 +1,150 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+from pywps import Templates
+from pywps.Template import TemplateProcessor, TemplateError
+
+import unittest
+import tempfile
+import shutil
+
+TEMPLATE = """<r>
+<TMPL_VAR title> <TMPL_VAR missing>
+<TMPL_IF flag>
+yes <TMPL_VAR title>
+<TMPL_ELSE>
+no
+</TMPL_IF>
+<TMPL_IF Items>
+<TMPL_LOOP Items>
+<i name="<TMPL_VAR name>"><TMPL_VAR title>
+<TMPL_IF Subs>
+<TMPL_LOOP Subs><s><TMPL_VAR name></s></TMPL_LOOP>
+</TMPL_IF>
+</i>
+</TMPL_LOOP>
+</TMPL_IF>
+</r>
+"""
+
+
+def makeContext(tokens, depth=0, flag=True):
+    """Create values for every token of the template"""
+    context = {}
+    for token in tokens:
+        if token.type == "var":
+            if not token.name in context:
+                context[token.name] = "%s-%d" % (token.name, depth)
+        elif token.type == "if":
+            if not token.name in context:
+                context[token.name] = flag
+            context.update(makeContext(token._childs, depth, flag))
+        elif token.type == "loop":
+            context[token.name] = [
+                makeContext(token._childs, depth + 1, flag),
+                makeContext(token._childs, depth + 2, not flag)]
+    return context
+
+
+class TemplateCompilerTestCase(unittest.TestCase):
+    """Test compiled templates format the same text as the interpreter"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.templateFile = os.path.join(self.tmpDir, "Test.tmpl")
+        open(self.templateFile, "w").write(TEMPLATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def _format(self, templateFile, context, interpreted):
+        template = TemplateProcessor(templateFile, compile=True,
+                                     interpreted=interpreted)
+        for key in context:
+            template.set(key, context[key])
+        return template.__str__()
+
+    def _compare(self, templateFile, context):
+        interpreted = self._format(templateFile, context, True)
+        compiled = self._format(templateFile, context, False)
+        self.assertEquals(compiled, interpreted)
+        return compiled
+
+    def testSemantics(self):
+        """Test VAR, IF, ELSE and nested LOOP statements"""
+        text = self._compare(self.templateFile, {
+            "title": "Title", "flag": False,
+            "Items": [{"name": "a", "title": True,
+                       "Subs": [{"name": 1}, {"name": None}]},
+                      {"name": "b"}]})
+        self.assertTrue("Title None" in text)
+        self.assertTrue("no" in text)
+        self.assertTrue('<i name="a">True' in text)
+        self.assertTrue("<s>1</s><s>None</s>" in text)
+        self.assertTrue('<i name="b">None' in text)
+
+        self._compare(self.templateFile, {"flag": 1, "Items": []})
+        self._compare(self.templateFile, {})
+        # loop values are not printed by VAR
+        self._compare(self.templateFile, {"title": [{"name": "x"}]})
+
+    def testLoopItems(self):
+        """Test formating loop items separately"""
+        item = {"name": "a", "title": "t", "Subs": [{"name": 1}]}
+        compiled = TemplateProcessor(self.templateFile, interpreted=False)
+        interpreted = TemplateProcessor(self.templateFile, interpreted=True)
+        text = compiled.renderLoopItem("Items", item)
+        self.assertEquals(text, interpreted.renderLoopItem("Items", item))
+
+        compiled.setRendered("Items", [text, text])
+        interpreted.setRendered("Items", [text, text])
+        self.assertEquals(compiled.__str__(), interpreted.__str__())
+        self.assertRaises(TemplateError, compiled.renderLoopItem, "Subs", {})
+
+    def testWrongType(self):
+        """Test unknown value types are refused"""
+        template = TemplateProcessor(self.templateFile)
+        self.assertRaises(TemplateError, template.set, "title", {})
+
+    def testTemplates(self):
+        """Test all 1_0_0 templates"""
+        templatesDir = os.path.join(Templates.__path__[0], "1_0_0")
+        for fileName in os.listdir(templatesDir):
+            if not fileName.endswith(".tmpl"):
+                continue
+            templateFile = os.path.join(templatesDir, fileName)
+            tokens = TemplateProcessor(templateFile, interpreted=True).tokens
+            self._compare(templateFile, makeContext(tokens))
+            self._compare(templateFile, makeContext(tokens, flag=False))
+            self._compare(templateFile, {})
+
+    def testRequests(self):
+        """Test GetCapabilities and DescribeProcess responses"""
+        os.environ["PYWPS_PROCESSES"] = os.path.join(
+            pywpsPath, "tests", "processes")
+        requests = ["service=wps&request=getcapabilities",
+                    "service=wps&request=describeprocess&version=1.0.0&identifier=all"]
+        for request in requests:
+            responses = []
+            for interpreted in (True, False):
+                TemplateProcessor.interpreted = interpreted
+                try:
+                    mypywps = pywps.Pywps(pywps.METHOD_GET)
+                    inputs = mypywps.parseRequest(request)
+                    mypywps.performRequest(inputs)
+                    responses.append(mypywps.response)
+                finally:
+                    TemplateProcessor.interpreted = False
+            self.assertEquals(responses[0], responses[1])
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        TemplateCompilerTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
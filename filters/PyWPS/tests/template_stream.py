@@ -0,0 +1,118 @@
+import os
+import sys
+
+pywpsPath = os.path.abspath(os.path.join(
+    os.path.split(os.path.abspath(__file__))[0], ".."))
+sys.path[0] = pywpsPath
+
+import pywps
+import pywps.response
+from pywps.Template import TemplateProcessor, FileValue, CHUNKSIZE
+
+import unittest
+import tempfile
+import shutil
+
+TEMPLATE = """<r>
+<TMPL_VAR title>
+<TMPL_LOOP Outputs>
+<o><TMPL_IF complexdata><TMPL_VAR complexdata></TMPL_IF></o>
+</TMPL_LOOP>
+</r>
+"""
+
+
+class TemplateStreamTestCase(unittest.TestCase):
+    """Test templates are streamed in chunks, with file values read in
+    chunks"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.templateFile = os.path.join(self.tmpDir, "Test.tmpl")
+        open(self.templateFile, "w").write(TEMPLATE)
+        self.dataFile = os.path.join(self.tmpDir, "data.xml")
+        self.data = "<d>%s</d>" % ("x" * (3 * CHUNKSIZE))
+        open(self.dataFile, "w").write(
+            '<?xml version="1.0"?>' + self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def getProcessor(self, interpreted, temporary=False):
+        processor = TemplateProcessor(self.templateFile,
+                                      interpreted=interpreted)
+        processor.set("title", "Streamed")
+        self.value = FileValue(self.dataFile, 21, temporary)
+        processor.set("Outputs", [
+            {"complexdata": self.value},
+            {"complexdata": 0}])
+        return processor
+
+    def testStream(self):
+        """Test stream chunks compose the formated template"""
+        texts = []
+        for interpreted in (True, False):
+            processor = self.getProcessor(interpreted)
+            stream = processor.stream()
+            processor.set("title", "Changed")
+            chunks = list(stream)
+            self.assertEquals("".join(chunks), "".join(stream))
+            self.assertEquals("".join(chunks), stream.__str__())
+            texts.append(stream.__str__())
+        self.assertEquals(texts[0], texts[1])
+        self.assertTrue(texts[0].find("Streamed") > -1)
+        self.assertTrue(texts[0].find("<o>%s</o>" % self.data) > -1)
+
+        # compiled stream yields more chunks of limited size
+        chunks = list(self.getProcessor(False).stream())
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks[:-1]:
+            self.assertTrue(len(chunk) >= CHUNKSIZE)
+            self.assertTrue(len(chunk) < 2 * CHUNKSIZE)
+
+    def testRemovedFile(self):
+        """Test temporary file values can be streamed after the file is
+        removed, until the stream is closed"""
+        stream = self.getProcessor(False, True).stream()
+        os.remove(self.dataFile)
+        self.assertTrue(stream.__str__().find(self.data) > -1)
+        self.assertTrue(stream.__str__().find(self.data) > -1)
+        self.assertFalse(self.value._file.closed)
+        stream.close()
+        self.assertTrue(self.value._file.closed)
+
+    def testClosedFile(self):
+        """Test the file is closed when the iteration finishes or is
+        abandoned"""
+        stream = self.getProcessor(False).stream()
+        chunks = iter(stream)
+        chunks.next()
+        self.assertFalse(self.value._file.closed)
+        stream.close()
+        self.assertTrue(self.value._file.closed)
+
+        self.assertTrue(stream.__str__().find(self.data) > -1)
+        self.assertTrue(self.value._file.closed)
+
+    def testResponse(self):
+        """Test the stream is written to the response file and can be read
+        like a file"""
+        stream = self.getProcessor(False).stream()
+        outputFile = os.path.join(self.tmpDir, "response.xml")
+        pywps.response.response(stream, open(outputFile, "w"))
+        self.assertEquals(open(outputFile).read(), stream.__str__())
+
+        read = []
+        data = stream.read(1000)
+        while data:
+            read.append(data)
+            data = stream.read(1000)
+        self.assertEquals(len(read[0]), 1000)
+        self.assertEquals("".join(read), stream.__str__())
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        TemplateStreamTestCase)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: GetCapabilities response cache
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import hashlib
+
+
+class CapabilitiesResponse:
+    """Cached GetCapabilities response
+
+    .. attribute:: etag
+
+        strong entity tag, quoted md5 of the body
+    """
+
+    key = None
+    etag = None
+    contentType = None
+    body = None
+
+    def __init__(self, key, contentType, body):
+        self.key = key
+        self.contentType = contentType
+        self.body = body
+        self.etag = '"%s"' % hashlib.md5(body).hexdigest()
+
+
+class CapabilitiesCache:
+    """GetCapabilities responses by fingerprint of their inputs
+
+    The responses depend on a state shared by every request (configuration,
+    loaded algorithms) and on inputs of the request (parameters, project,
+    published algorithms, server address). Every response is dropped when
+    the state changes, the oldest ones when the cache is full.
+
+    :param maxEntries: maximum number of cached responses
+    """
+
+    maxEntries = 32
+    state = None
+
+    def __init__(self, maxEntries=32):
+        self.maxEntries = maxEntries
+        self.state = None
+        self._responses = {}
+        self._keys = []
+
+    def getKey(self, *inputs):
+        """Fingerprint of the request inputs
+
+        :rtype: string
+        """
+        return hashlib.md5(repr(inputs)).hexdigest()
+
+    def invalidate(self, state):
+        """Drop every response if the shared state has changed
+
+        :param state: any comparable value describing the shared state
+        """
+        if state != self.state:
+            self.clear()
+            self.state = state
+
+    def get(self, key):
+        """Get the cached response
+
+        :returns: :class:`CapabilitiesResponse` or None
+        """
+        return self._responses.get(key)
+
+    def set(self, key, contentType, body):
+        """Cache a response
+
+        :returns: :class:`CapabilitiesResponse`
+        """
+        response = CapabilitiesResponse(key, contentType, body)
+        if key not in self._responses:
+            self._keys.append(key)
+        self._responses[key] = response
+        while len(self._keys) > self.maxEntries:
+            del self._responses[self._keys.pop(0)]
+        return response
+
+    def clear(self):
+        """Drop every response"""
+        self._responses.clear()
+        self._keys = []
+
+    def __len__(self):
+        return len(self._responses)
+
+
+def etag_matches(ifNoneMatch, etag):
+    """Check an If-None-Match header value against an entity tag, with the
+    weak comparison required for If-None-Match
+
+    :param ifNoneMatch: header value, may be empty
+    :param etag: quoted entity tag
+    :rtype: boolean
+    """
+    if not ifNoneMatch:
+        return False
+    for tag in ifNoneMatch.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: CRS and coordinate transform cache
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+from collections import OrderedDict
+
+
+class CrsCache:
+    """CRS and coordinate transform objects shared by the executions of the
+    process, so definitions are parsed, and user CRSs are saved, once.
+
+    Objects are stored by key, e.g. ``('crs', 'EPSG:4326')`` or
+    ``('transform', src, dst)``, and must not be modified by the callers.
+    The least recently used objects are dropped when the cache is full.
+
+    :param maxEntries: maximum number of cached objects
+    """
+
+    maxEntries = 256
+    hits = 0
+    misses = 0
+
+    def __init__(self, maxEntries=256):
+        self.maxEntries = maxEntries
+        self._objects = OrderedDict()
+
+    def get(self, key, create):
+        """Get the cached object, or the new object made by ``create``
+
+        :param key: hashable description of the object
+        :param create: function making the object
+        """
+        try:
+            value = self._objects.pop(key)
+            self.hits += 1
+        except KeyError:
+            value = create()
+            self.misses += 1
+        self._objects[key] = value
+        while len(self._objects) > self.maxEntries:
+            self._objects.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Drop every object"""
+        self._objects.clear()
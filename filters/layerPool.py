@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: Execute input layer pool
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+from collections import OrderedDict
+
+
+class LayerPool:
+    """Opened layers by datasource, provider and CRS, reused by the next
+    executions instead of opening the provider again.
+
+    A layer is used by one execution at a time: it is checked out of the
+    pool, and checked in when the execution ends. Checked in layers are
+    reset to the state they were opened with, the ones which can not be
+    reset are released. The least recently used idle layers are released,
+    when there are more than ``maxSize`` of them.
+
+    :param maxSize: maximum number of idle layers, 0 disables the pool
+    :param validate: function checking an idle layer, with its state, can
+        still be used
+    :param reset: function restoring the state of a checked in layer,
+        returns False if the layer can not be reused
+    :param release: function closing a layer dropped from the pool
+    :param capture: function returning the state of a new layer, e.g. its
+        filter, given to ``validate`` and ``reset``
+    """
+
+    maxSize = 0
+    hits = 0
+    misses = 0
+
+    def __init__(self, maxSize=0, validate=None, reset=None, release=None,
+                 capture=None):
+        self.maxSize = maxSize
+        self.validate = validate
+        self.reset = reset
+        self.release = release
+        self.capture = capture
+        self._idle = OrderedDict()
+        self._busy = []
+
+    def checkout(self, key, create):
+        """Get a layer for exclusive use by the execution
+
+        :param key: hashable description of the layer
+        :param create: function opening a new layer
+        """
+        (layer, state) = self._idle.pop(key, (None, None))
+        if layer is not None and self.validate and \
+                not self.validate(layer, state):
+            self._release(layer)
+            layer = None
+        if layer is None:
+            self.misses += 1
+            layer = create()
+            if self.capture:
+                state = self.capture(layer)
+        else:
+            self.hits += 1
+        self._busy.append((key, layer, state))
+        return layer
+
+    def checkin(self):
+        """Return the layers checked out by the execution to the pool"""
+        (busy, self._busy) = (self._busy, [])
+        for (key, layer, state) in busy:
+            reusable = self.maxSize > 0 and key not in self._idle
+            if reusable and self.reset:
+                try:
+                    reusable = self.reset(layer, state) is not False
+                except Exception:
+                    reusable = False
+            if reusable:
+                self._idle[key] = (layer, state)
+            else:
+                self._release(layer)
+        while len(self._idle) > self.maxSize:
+            self._release(self._idle.popitem(last=False)[1][0])
+
+    def layers(self):
+        """Get the idle layers, the least recently used first"""
+        return [layer for (layer, state) in self._idle.values()]
+
+    def clear(self):
+        """Release the idle layers"""
+        while self._idle:
+            self._release(self._idle.popitem(last=False)[1][0])
+
+    def _release(self, layer):
+        if self.release:
+            self.release(layer)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: zipped output packaging
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import os
+import time
+import zlib
+import zipfile
+
+# bytes read and compressed at once
+CHUNKSIZE = 64 * 1024
+
+
+class PackageZipFile(zipfile.ZipFile):
+    """Zip archive, which files are streamed in chunks with a compression
+    level, 0 stores them without compression"""
+
+    def writeFile(self, filename, arcname, level=zlib.Z_DEFAULT_COMPRESSION):
+        """Put the content of the file into the archive
+
+        :param level: zlib compression level, 0 to store the file
+        """
+        st = os.stat(filename)
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[0:6])
+        zinfo.external_attr = (st.st_mode & 0xFFFF) << 16L
+        zinfo.compress_type = zipfile.ZIP_STORED
+        cmpr = None
+        if level:
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            cmpr = zlib.compressobj(level, zlib.DEFLATED, -15)
+        zinfo.file_size = st.st_size
+        zinfo.flag_bits = 0x00
+        zinfo.header_offset = self.fp.tell()
+        self._writecheck(zinfo)
+        self._didModify = True
+
+        zinfo.CRC = crc = 0
+        zinfo.compress_size = compressSize = fileSize = 0
+        # compressed size can be larger than uncompressed size
+        zip64 = self._allowZip64 and \
+            zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        self.fp.write(zinfo.FileHeader(zip64))
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNKSIZE), ''):
+                fileSize += len(chunk)
+                crc = zlib.crc32(chunk, crc) & 0xffffffff
+                if cmpr:
+                    chunk = cmpr.compress(chunk)
+                compressSize += len(chunk)
+                self.fp.write(chunk)
+        if cmpr:
+            chunk = cmpr.flush()
+            compressSize += len(chunk)
+            self.fp.write(chunk)
+        zinfo.CRC = crc
+        zinfo.file_size = fileSize
+        zinfo.compress_size = compressSize
+        if not zip64 and max(fileSize, compressSize) > zipfile.ZIP64_LIMIT:
+            raise zipfile.LargeZipFile(
+                "Filesize would require ZIP64 extensions")
+
+        # header with the CRC and sizes
+        position = self.fp.tell()
+        self.fp.seek(zinfo.header_offset, 0)
+        self.fp.write(zinfo.FileHeader(zip64))
+        self.fp.seek(position, 0)
+        self.filelist.append(zinfo)
+        self.NameToInfo[zinfo.filename] = zinfo
+
+
+def get_sidecar_files(fileName):
+    """Get the file and its sidecar files, every file with the same base
+    name, e.g. .dbf, .prj, .cpg, .qix and .shp.xml of a shapefile"""
+    (directory, name) = os.path.split(fileName)
+    base = os.path.splitext(name)[0] + '.'
+    files = [fileName]
+    for sidecar in sorted(os.listdir(directory or os.curdir)):
+        path = os.path.join(directory, sidecar)
+        if sidecar.startswith(base) and sidecar != name and \
+                os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def package_files(fileName, zipName, level=zlib.Z_DEFAULT_COMPRESSION,
+                  exclude=[]):
+    """Zip the file and its sidecar files
+
+    :param level: zlib compression level, 0 to store the files, e.g. for
+        already compressed data
+    :param exclude: files with the same base name, which are not sidecar
+        files, e.g. the converted file
+    :returns: list of the packaged files
+    """
+    exclude = [os.path.abspath(name) for name in exclude + [zipName]]
+    files = [name for name in get_sidecar_files(fileName)
+             if os.path.abspath(name) not in exclude]
+    with PackageZipFile(zipName, 'w', allowZip64=True) as zf:
+        for name in files:
+            zf.writeFile(name, os.path.basename(name), level)
+    return files
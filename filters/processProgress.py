@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: Processing progress to WPS status bridge
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import time
+import logging
+
+
+class StatusProgress:
+    """Processing progress callbacks, which set the status of the PyWPS
+    process, so asynchronous clients see percentCompleted.
+
+    Updates are coalesced: the status is propagated when the text changes,
+    or when the percentage grows by ``step`` and ``interval`` seconds have
+    passed since the last propagated update. Error messages are collected
+    in ``msg``.
+
+    :param status: ``pywps.Process.Status`` of the process, or None
+    :param interval: minimal time between progress updates in seconds
+    :param step: minimal percentage change
+    """
+
+    status = None
+    interval = 1
+    step = 1
+
+    def __init__(self, status=None, interval=1, step=1):
+        self.msg = []
+        self.status = status
+        self.interval = interval
+        self.step = step
+        self.percentage = 0
+        self.text = ''
+        self.propagated = None
+        self.propagatedTime = 0
+
+    def error(self, msg):
+        self.msg.append(msg)
+
+    def setPercentage(self, i):
+        # 100 is reserved to the succeeded process
+        self.percentage = min(max(int(float(i)), 0), 99)
+        self.update()
+
+    def setText(self, text):
+        self.text = text
+        self.update()
+
+    def setInfo(self, msg):
+        logging.info(msg)
+
+    def setCommand(self, cmd):
+        logging.debug(cmd)
+
+    def setConsoleInfo(self, msg):
+        logging.debug(msg)
+
+    def setDebugInfo(self, msg):
+        logging.debug(msg)
+
+    def update(self):
+        """Propagate the progress to the process status, unless it was
+        propagated just now"""
+        if self.status is None:
+            return
+        if self.propagated is not None:
+            (percentage, text) = self.propagated
+            if text == self.text and (
+                    self.percentage - percentage < self.step or
+                    time.time() - self.propagatedTime < self.interval):
+                return
+        self.propagated = (self.percentage, self.text)
+        self.propagatedTime = time.time()
+        self.status.set(self.text or 'Processing', self.percentage)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: persistent WPS process class registry
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import hashlib
+from collections import OrderedDict
+
+
+class ProcessRegistry:
+    """Keep the PyWPS process classes built by a process factory across
+    requests.
+
+    A class is built once per algorithm, project catalog, WPS server
+    address and CRS list. The registry is a Processing algorithm list
+    listener: every class is dropped when Processing reloads its
+    algorithms. The least recently used classes are dropped when the
+    registry is full, classes of a project path, which is not resolved to
+    a project catalog, are not kept.
+
+    Each built class gets a new ``fingerprint`` attribute, so that PyWPS
+    can cache its description, and a ``scope`` attribute, the project and
+    WPS server address it is described for.
+
+    :param factory: function building a process class, with the
+        QGISProcessFactory signature
+    :param maxClasses: maximum number of kept classes
+    """
+
+    factory = None
+    generation = 0
+    maxClasses = 1000
+
+    def __init__(self, factory, maxClasses=1000):
+        self.factory = factory
+        self.generation = 0
+        self.maxClasses = maxClasses
+        self._classes = OrderedDict()
+        self._fingerprints = {}
+        self._built = 0
+
+    def getProcessClass(self, algName, alg=None, projectPath='', catalog=None,
+                        crss=[], wpsserver=''):
+        """Return the process class of the algorithm, build it if needed
+
+        :param algName: Processing algorithm name
+        :param alg: Processing algorithm instance, used to detect reloaded
+            algorithms
+        :param projectPath: QGIS project file path
+        :param catalog: :class:`projectCatalog.ProjectCatalog` or None
+        :param crss: list of supported bounding box CRSs
+        :param wpsserver: WPS server address
+        :returns: process class or None
+        """
+        fingerprint = None
+        if catalog:
+            fingerprint = catalog.fingerprint
+            # the project has changed, forget classes of the previous version
+            if self._fingerprints.get(projectPath, fingerprint) != \
+                    fingerprint:
+                self._forgetProject(projectPath)
+            self._fingerprints[projectPath] = fingerprint
+        kept = catalog or not projectPath
+
+        key = (algName, projectPath, fingerprint, wpsserver, tuple(crss))
+        processClass = self._classes.pop(key, None)
+        if processClass is not None and \
+                (alg is None or processClass.alg is alg):
+            self._classes[key] = processClass
+            return processClass
+
+        vectors = []
+        rasters = []
+        if catalog:
+            vectors = catalog.vectorLayers
+            rasters = catalog.rasterLayers
+        processClass = self.factory(algName, projectPath, vectors, rasters,
+                                    list(crss), wpsserver)
+        if processClass is not None:
+            self._built += 1
+            processClass.fingerprint = hashlib.md5(
+                '%r:%d' % (key, self._built)).hexdigest()
+            processClass.scope = (projectPath, wpsserver)
+            if kept:
+                self._classes[key] = processClass
+                while len(self._classes) > self.maxClasses:
+                    self._classes.popitem(last=False)
+        return processClass
+
+    def _forgetProject(self, projectPath):
+        for key in self._classes.keys():
+            if key[1] == projectPath:
+                del self._classes[key]
+
+    def algsListHasChanged(self):
+        """Processing algorithm list listener"""
+        self.clear()
+
+    def clear(self):
+        """Forget every process class"""
+        self._classes.clear()
+        self._fingerprints.clear()
+        self.generation += 1
+
+    def __len__(self):
+        return len(self._classes)
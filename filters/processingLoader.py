@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: Processing initialization and reloading
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+from qgis.core import QgsMessageLog
+
+import os
+import time
+import hashlib
+
+from pywps import config as pywpsConfig
+
+from processing.core.Processing import Processing
+from processing.core.ProcessingConfig import ProcessingConfig
+
+# Processing settings of the folders containing models, scripts and rscripts
+FOLDER_SETTINGS = (('MODELS_FOLDER', 'models'),
+                   ('SCRIPTS_FOLDER', 'scripts'),
+                   ('R_SCRIPTS_FOLDER', 'rscripts'))
+
+
+def get_processing_folder(configPath):
+    """Return the absolute [qgis] processing_folder path, relative paths
+    are resolved against the configuration file location"""
+    processingPath = pywpsConfig.getConfigValue('qgis', 'processing_folder')
+    if not os.path.exists(processingPath):
+        if configPath and os.path.exists(configPath):
+            processingPath = os.path.join(
+                os.path.dirname(configPath),
+                processingPath
+            )
+            processingPath = os.path.abspath(processingPath)
+        else:
+            configFilesLocation = pywpsConfig._getDefaultConfigFilesLocation()
+            for configFileLocation in configFilesLocation:
+                if os.path.exists(configFileLocation):
+                    processingPath = os.path.join(
+                        os.path.dirname(configFileLocation),
+                        processingPath
+                    )
+                    processingPath = os.path.abspath(
+                        processingPath)
+    return processingPath
+
+
+class ProcessingLoader:
+    """Initialize Processing once and reload its algorithms only when the
+    applied settings or the models, scripts and rscripts folders change.
+
+    .. attribute:: fingerprint
+
+        fingerprint of the settings and folders of the last reload
+
+    .. attribute:: reloadCount
+
+        number of algorithm list reloads
+
+    .. attribute:: lastReloadDuration
+
+        duration in seconds of the last reload
+
+    .. attribute:: totalReloadDuration
+
+        cumulated duration in seconds of every reload
+    """
+
+    initialized = False
+    fingerprint = None
+    reloadCount = 0
+    lastReloadDuration = 0.0
+    totalReloadDuration = 0.0
+
+    def load(self, configPath=None):
+        """Apply the PyWPS configuration to Processing, reload the
+        algorithms if needed
+
+        :param configPath: PyWPS configuration file path
+        :returns: True if the algorithms have been reloaded
+        """
+        if not self.initialized:
+            Processing.initialize()
+            self.initialized = True
+
+        settings = self.getSettings(configPath)
+        fingerprint = self.getFingerprint(settings)
+        if fingerprint == self.fingerprint:
+            return False
+
+        start = time.time()
+        for name in sorted(settings.keys()):
+            ProcessingConfig.setSettingValue(name, settings[name])
+        # Reload algorithms
+        Processing.updateAlgsList()
+        self.fingerprint = fingerprint
+
+        self.reloadCount += 1
+        self.lastReloadDuration = time.time() - start
+        self.totalReloadDuration += self.lastReloadDuration
+        QgsMessageLog.logMessage(
+            "Processing algorithms reloaded (%d) in %.3fs" %
+            (self.reloadCount, self.lastReloadDuration))
+        return True
+
+    def getSettings(self, configPath=None):
+        """Get the Processing settings defined by the PyWPS configuration
+
+        :returns: dictionary of setting values by setting name
+        """
+        settings = {}
+        config = pywpsConfig.config
+        # load QGIS Processing config
+        if config.has_section('qgis_processing'):
+            for opt in config.options('qgis_processing'):
+                settings[opt.upper()] = pywpsConfig.getConfigValue(
+                    'qgis_processing', opt)
+        # modify processes path
+        if config.has_section('qgis') and config.has_option('qgis', 'processing_folder'):
+            processingPath = get_processing_folder(configPath)
+            QgsMessageLog.logMessage(
+                "processing_folder: " + processingPath)
+            if os.path.exists(processingPath) and os.path.isdir(processingPath):
+                for (name, folder) in FOLDER_SETTINGS:
+                    settings[name] = os.path.join(processingPath, folder)
+        return settings
+
+    def getFingerprint(self, settings):
+        """Fingerprint of the settings and of the models, scripts and
+        rscripts folders content
+
+        :param settings: dictionary of setting values by setting name
+        :rtype: string
+        """
+        fingerprint = hashlib.md5()
+        for name in sorted(settings.keys()):
+            fingerprint.update('%s=%r\n' % (name, settings[name]))
+
+        for (name, folder) in FOLDER_SETTINGS:
+            path = settings.get(name)
+            if not path:
+                try:
+                    path = ProcessingConfig.getSetting(name)
+                except Exception:
+                    path = None
+            if not path or not os.path.isdir(path):
+                continue
+            for (dirPath, dirNames, fileNames) in os.walk(path):
+                dirNames.sort()
+                for fileName in sorted(fileNames):
+                    filePath = os.path.join(dirPath, fileName)
+                    try:
+                        st = os.stat(filePath)
+                    except OSError:
+                        continue
+                    fingerprint.update('%r:%r:%d\n' %
+                                       (filePath, st.st_mtime, st.st_size))
+        return fingerprint.hexdigest()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: QGIS project layer catalog cache
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import os
+import hashlib
+from xml.dom import minidom
+
+# parsed catalogs by absolute project path
+_catalogs = {}
+
+
+class ProjectCatalog:
+    """Raster and vector layers and CRSs published by a QGIS project
+
+    The layer dicts are the ones used by QGISProcessFactory: 'type',
+    'name', 'datasource', 'provider', 'crs', 'proj4' and 'geometry' for
+    vector layers. Relative datasources are already resolved against the
+    project folder.
+    """
+
+    path = None
+    mtime = None
+    size = None
+    fingerprint = None
+    rasterLayers = None
+    vectorLayers = None
+    crsList = None
+
+    def __init__(self, path, mtime, size):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.fingerprint = hashlib.md5(
+            '%r:%r:%d' % (path, mtime, size)).hexdigest()
+        self.rasterLayers = []
+        self.vectorLayers = []
+        self.crsList = []
+        self._parse()
+
+    def isUpToDate(self, mtime, size):
+        """Check, if the catalog has been built from this project file
+        state"""
+        return self.mtime == mtime and self.size == size
+
+    def _parse(self):
+        """Read layers and CRSs from the project file"""
+        projectFolder = os.path.dirname(self.path)
+        p_dom = minidom.parse(self.path)
+        for ml in p_dom.getElementsByTagName('maplayer'):
+            l = {'type': ml.attributes["type"].value,
+                 'name': ml.getElementsByTagName('layername')[0].childNodes[0].data,
+                 'datasource': ml.getElementsByTagName('datasource')[0].childNodes[0].data,
+                 'provider': ml.getElementsByTagName('provider')[0].childNodes[0].data,
+                 'crs': ml.getElementsByTagName('srs')[0].getElementsByTagName('authid')[0].childNodes[0].data,
+                 'proj4': ml.getElementsByTagName('srs')[0].getElementsByTagName('proj4')[0].childNodes[0].data
+                 }
+            # Update relative path
+            if l['provider'] in ['ogr', 'gdal'] and str(l['datasource']).startswith('.'):
+                l['datasource'] = os.path.abspath(
+                    os.path.join(projectFolder, l['datasource']))
+                if not os.path.exists(l['datasource']):
+                    continue
+            elif l['provider'] in ['gdal'] and str(l['datasource']).startswith('NETCDF:'):
+                theURIParts = l['datasource'].split(":")
+                src = theURIParts[1]
+                src = src.replace('"', '')
+                if src.startswith('.'):
+                    src = os.path.abspath(
+                        os.path.join(projectFolder, src))
+                theURIParts[1] = '"' + src + '"'
+                l['datasource'] = ':'.join(theURIParts)
+
+            if l['type'] == "raster":
+                self.rasterLayers.append(l)
+            elif l['type'] == "vector":
+                l['geometry'] = ml.attributes["geometry"].value
+                self.vectorLayers.append(l)
+
+        defaultCrs = ''
+        for mapcanvas in p_dom.getElementsByTagName('mapcanvas'):
+            for destinationsrs in mapcanvas.getElementsByTagName('destinationsrs'):
+                for authid in destinationsrs.getElementsByTagName('authid'):
+                    defaultCrs = authid.childNodes[0].data
+                    self.crsList.append(defaultCrs)
+        for wmsCrsList in p_dom.getElementsByTagName('WMSCrsList'):
+            for wmsCrs in wmsCrsList.getElementsByTagName('value'):
+                wmsCrsValue = wmsCrs.childNodes[0].data
+                if wmsCrsValue and wmsCrsValue != defaultCrs:
+                    self.crsList.append(wmsCrsValue)
+        p_dom.unlink()
+
+
+def get_project_catalog(projectPath):
+    """Return the ProjectCatalog of the project file, parse it only if the
+    file has changed since the last call
+
+    :param projectPath: QGIS project file path
+    :returns: ProjectCatalog or None, if the project file does not exist
+    """
+    if not projectPath or not os.path.exists(projectPath):
+        return None
+
+    path = os.path.abspath(projectPath)
+    st = os.stat(path)
+    catalog = _catalogs.get(path)
+    if catalog and catalog.isUpToDate(st.st_mtime, st.st_size):
+        return catalog
+
+    catalog = ProjectCatalog(path, st.st_mtime, st.st_size)
+    _catalogs[path] = catalog
+    return catalog
+
+
+def clear_project_catalogs():
+    """Forget every parsed project catalog"""
+    _catalogs.clear()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: Execute result cache
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import os
+import glob
+import time
+import shutil
+import hashlib
+import tempfile
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+# file describing the outputs of a cached result
+OUTPUTS_FILE = 'outputs.json'
+
+
+def file_signature(path, content=False):
+    """Return the signature of a file: the sha1 of its content, or the
+    modification times and sizes of the file and its sidecar files with the
+    same base name (.dbf, .prj, ...), None if it is not a file"""
+    if not os.path.isfile(path):
+        return None
+    if content:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), ''):
+                sha.update(chunk)
+        return sha.hexdigest()
+    signature = []
+    for name in sorted(glob.glob(os.path.splitext(path)[0] + '.*')):
+        stat = os.stat(name)
+        signature.append((os.path.basename(name), stat.st_mtime,
+                          stat.st_size))
+    return signature
+
+
+def _matches(name, names):
+    """Check the algorithm, or its provider, is in the names"""
+    return name in names or name.split(':')[0] in names
+
+
+class ResultCache:
+    """Outputs of executed algorithms by fingerprint of the algorithm,
+    its inputs and the requested outputs.
+
+    Each result is a directory in ``path`` with the output files and a
+    description of the outputs. Results older than ``ttl`` seconds are
+    dropped, then the least recently used ones, until the cache is smaller
+    than ``maxSize`` bytes.
+
+    :param path: cache directory, None disables the cache
+    :param ttl: result lifetime in seconds, 0 for no limit
+    :param maxSize: maximum size in bytes, 0 for no limit
+    :param allow: cached algorithms or providers, empty for every one
+    :param deny: algorithms or providers never cached, e.g. the non
+        deterministic ones
+    """
+
+    path = None
+    ttl = 0
+    maxSize = 0
+    hits = 0
+    misses = 0
+
+    def __init__(self, path=None, ttl=0, maxSize=0, allow=[], deny=[]):
+        self.configure(path, ttl, maxSize, allow, deny)
+
+    def configure(self, path=None, ttl=0, maxSize=0, allow=[], deny=[]):
+        self.path = path
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.allow = allow
+        self.deny = deny
+
+    def isCacheable(self, algName):
+        """Check the results of the algorithm can be cached"""
+        if not self.path or _matches(algName, self.deny):
+            return False
+        return not self.allow or _matches(algName, self.allow)
+
+    def getKey(self, algName, inputs, outputs, version=None):
+        """Return the fingerprint of the algorithm, the canonical input
+        values and the requested outputs
+
+        :param inputs: list of (identifier, value) tuples, the values have
+            to be made of strings, numbers, lists and tuples
+        :param outputs: list of (identifier, format) tuples
+        :param version: fingerprint of the algorithm code, e.g. of the
+            models and scripts folders
+        """
+        return hashlib.sha1(json.dumps(
+            [algName, version, sorted(inputs), sorted(outputs)])).hexdigest()
+
+    def get(self, key):
+        """Return the cached outputs, dictionary of identifiers and
+        descriptions, files are given by their path in the cache, None if
+        the result is not cached or has expired"""
+        entry = os.path.join(self.path, key)
+        try:
+            with open(os.path.join(entry, OUTPUTS_FILE)) as f:
+                outputs = json.load(f)
+            if self.ttl and time.time() - os.path.getmtime(entry) > self.ttl:
+                self.misses += 1
+                return None
+            # mark as recently used
+            os.utime(os.path.join(entry, OUTPUTS_FILE), None)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+
+        for output in outputs.values():
+            if 'file' in output:
+                output['file'] = os.path.join(entry, output['file'])
+        self.hits += 1
+        return outputs
+
+    def put(self, key, outputs):
+        """Store the outputs, dictionary of identifiers and descriptions,
+        the files given by ``file`` are copied to the cache"""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        entry = tempfile.mkdtemp(prefix='.' + key, dir=self.path)
+        try:
+            stored = {}
+            for (identifier, output) in outputs.items():
+                output = dict(output)
+                if 'file' in output:
+                    name = '%s-%s' % (identifier,
+                                      os.path.basename(output['file']))
+                    shutil.copyfile(output['file'], os.path.join(entry, name))
+                    output['file'] = name
+                stored[identifier] = output
+            with open(os.path.join(entry, OUTPUTS_FILE), 'w') as f:
+                json.dump(stored, f)
+            os.rename(entry, os.path.join(self.path, key))
+        except OSError:
+            # stored by another process meanwhile
+            shutil.rmtree(entry, True)
+        except:
+            shutil.rmtree(entry, True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Drop the expired results, then the least recently used ones
+        above the maximum size"""
+        if not os.path.isdir(self.path):
+            return
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            outputsFile = os.path.join(entry, OUTPUTS_FILE)
+            if name.startswith('.') or not os.path.isfile(outputsFile):
+                continue
+            if self.ttl and now - os.path.getmtime(entry) > self.ttl:
+                shutil.rmtree(entry, True)
+                continue
+            size = sum([os.path.getsize(os.path.join(entry, f))
+                        for f in os.listdir(entry)])
+            entries.append((os.path.getmtime(outputsFile), size, entry))
+
+        if not self.maxSize:
+            return
+        entries.sort()
+        total = sum([size for (used, size, entry) in entries])
+        while entries and total > self.maxSize:
+            (used, size, entry) = entries.pop(0)
+            shutil.rmtree(entry, True)
+            total -= size
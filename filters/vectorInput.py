@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: vector ComplexData input ingestion
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import os
+import zipfile
+
+VSIZIP = '/vsizip/'
+
+# extensions of the formats, OGR needs them to open GML files
+EXTENSIONS = {'gml': '.gml', 'geojson': '.geojson'}
+
+# vector files looked for in zipped inputs
+ZIPPED_EXTENSIONS = ('.shp', '.tab', '.mif', '.gml', '.geojson', '.json',
+                     '.kml', '.gpkg')
+
+
+def sniff_vector_format(fileName):
+    """Detect the format of the uploaded file from its first bytes
+
+    :returns: 'zip', 'geojson' or 'gml'
+    """
+    with open(fileName, 'rb') as f:
+        head = f.read(512)
+    if head.startswith('PK\x03\x04'):
+        return 'zip'
+    head = head.lstrip('\xef\xbb\xbf \t\r\n')
+    if head[:1] in ('{', '['):
+        return 'geojson'
+    return 'gml'
+
+
+def get_zipped_datasource(fileName):
+    """Get the OGR datasource of the vector file in the zip archive, e.g.
+    the shapefile, None if there is not any"""
+    try:
+        with zipfile.ZipFile(fileName) as zf:
+            names = zf.namelist()
+    except zipfile.BadZipfile:
+        return None
+    for ext in ZIPPED_EXTENSIONS:
+        for name in sorted(names):
+            if name.lower().endswith(ext) and \
+                    not os.path.basename(name).startswith('.'):
+                return VSIZIP + os.path.join(fileName, name)
+    return None
+
+
+def ingest_vector_file(fileName):
+    """Get the OGR datasource of the uploaded vector file, without copying
+    its content: zipped files are read in place, the others get the
+    extension of their format by a hard link, or by renaming the file if
+    the link is not possible"""
+    fmt = sniff_vector_format(fileName)
+    if fmt == 'zip':
+        datasource = get_zipped_datasource(fileName)
+        if datasource:
+            return datasource
+        fmt = 'gml'
+    path = fileName + EXTENSIONS[fmt]
+    if not os.path.exists(path):
+        try:
+            os.link(fileName, path)
+        except OSError:
+            os.rename(fileName, path)
+    return path
+
+
+def get_source_file(source):
+    """Get the file of the OGR datasource, the archive of zipped files"""
+    path = source.split('|')[0]
+    if not path.startswith(VSIZIP):
+        return path
+    path = path[len(VSIZIP):]
+    while path and path != os.sep and not os.path.isfile(path):
+        path = os.path.dirname(path)
+    return path
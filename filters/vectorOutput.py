@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    QGIS Server Plugin Filters: vector ComplexData output formats
+    ---------------------
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+import os
+import re
+
+# extensions of the vector output formats, the formats which can be written
+# by the algorithms without creation options
+VECTOR_OUTPUT_EXTENSIONS = {
+    'application/json': 'geojson',
+    'application/x-zipped-shp': 'shp',
+    'application/x-zipped-tab': 'tab'
+}
+
+
+def get_direct_output_file(identifier, mimeType, extensions):
+    """Get the output file in the requested format for the algorithm, None
+    to let Processing choose the file if the format has to be converted
+
+    :param extensions: output extensions supported by the provider
+    """
+    ext = VECTOR_OUTPUT_EXTENSIONS.get(mimeType)
+    if ext not in [e.lower() for e in extensions]:
+        return None
+    return os.path.join(os.getcwd(), '%s.%s' % (
+        re.sub(r'[^\w]', '_', identifier), ext))
+
+
+def is_written_output(outputName, ext, reprojected, authid):
+    """Check the algorithm has written the output in the requested format,
+    so it is not converted
+
+    :param ext: extension of the requested format
+    :param reprojected: the output is converted to other CRS
+    :param authid: authority identifier of the output CRS
+    """
+    suffix = os.path.basename(outputName).rsplit('.', 1)[1:]
+    return not reprojected and bool(authid) and \
+        [s.lower() for s in suffix] == [ext]
+
+
+def get_vector_output_file(outputName, ext, written):
+    """Get the file of the output in the requested format, next to the
+    algorithm output. The converted file does not overwrite the algorithm
+    output, it gets the _wps suffix.
+
+    :param written: the algorithm has written the requested format
+    """
+    (directory, name) = os.path.split(os.path.abspath(outputName))
+    # base name up to the first dot, like QFileInfo.baseName
+    baseName = name.split('.', 1)[0]
+    outputFile = os.path.join(directory, baseName + '.' + ext)
+    if not written and outputFile == os.path.abspath(outputName):
+        outputFile = os.path.join(directory, baseName + '_wps.' + ext)
+    return outputFile
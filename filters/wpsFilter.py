@@ -27,15 +27,37 @@ import sys
 import re
 import logging
 import traceback
+import json
+import time
 
 sys.path.append(os.path.join(os.path.dirname(
     os.path.realpath(__file__)), 'PyWPS'))
 import pywps
 from pywps import config as pywpsConfig
 from pywps.Exceptions import *
-from xml.dom import minidom
+from pywps.Wps import ProcessClassProvider
+from pywps.Wps.Execute import Pool as executePool
+from pywps.Wps.Execute import Scheduler as executeScheduler
+from pywps.Wps.Execute import Status as executeStatus
+from pywps.Wps.Execute import Jobs as executeJobs
+from pywps.Wps.Execute import Retention as executeRetention
+from pywps.Wps.Execute import Publish as executePublish
+from pywps.Template import TemplateStream, CHUNKSIZE
 from xml.sax.saxutils import escape
 
+from projectCatalog import get_project_catalog
+from processRegistry import ProcessRegistry
+from processingLoader import ProcessingLoader
+from processProgress import StatusProgress
+from resultCache import ResultCache, file_signature
+from layerPool import LayerPool
+from crsCache import CrsCache
+from vectorInput import ingest_vector_file, get_source_file
+from vectorOutput import VECTOR_OUTPUT_EXTENSIONS, get_direct_output_file, \
+    is_written_output, get_vector_output_file
+from outputPackage import package_files, get_sidecar_files
+from capabilitiesCache import CapabilitiesCache, etag_matches
+
 from processing.core.Processing import Processing
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.parameters import *
@@ -106,13 +128,224 @@ def get_wps_server_address(serverInterface, params):
     return wpsaddress
 
 
-class QGISProgress(SilentProgress):
+def configure_result_cache():
+    """Apply the [qgis] result_cache settings to the Execute result cache,
+    the cache is disabled unless result_cache is true"""
+    def option(name, default):
+        if pywpsConfig.config.has_option('qgis', name):
+            return pywpsConfig.getConfigValue('qgis', name) or default
+        return default
+
+    def names(value):
+        return [name.strip() for name in str(value).split(',') if name.strip()]
+
+    path = None
+    if option('result_cache', False):
+        path = option('result_cache_path', '') or os.path.join(
+            pywpsConfig.getConfigValue('server', 'tempPath'), 'pywps-results')
+    resultCache.configure(path,
+                          float(option('result_cache_ttl', 0)),
+                          pywpsConfig.getSize(option('result_cache_size', 0)),
+                          names(option('result_cache_algs', '')),
+                          names(option('result_cache_deny', '')))
+
+
+def configure_layer_pool():
+    """Apply the [qgis] layer_pool_size setting to the input layer pool"""
+    size = 0
+    if pywpsConfig.config.has_option('qgis', 'layer_pool_size'):
+        size = int(pywpsConfig.getConfigValue('qgis', 'layer_pool_size') or 0)
+    layerPool.maxSize = size
+
+
+def is_registered_layer(layer):
+    """Check the layer is still in the map layer registry"""
+    try:
+        return layer.id() in QgsMapLayerRegistry.instance().mapLayers()
+    except RuntimeError:
+        # deleted with the registry content
+        return False
+
+
+def capture_pooled_layer(layer):
+    """Get the state of a new pooled layer: its filter from the
+    datasource, e.g. OGR subset or PostGIS sql, and the signature of its
+    file"""
+    subsetString = None
+    if isinstance(layer, QgsVectorLayer):
+        subsetString = layer.subsetString()
+    return (subsetString, file_signature(get_source_file(layer.source())))
+
+
+def validate_pooled_layer(layer, state):
+    """Check the idle layer is still registered and its file has not been
+    replaced"""
+    return is_registered_layer(layer) and \
+        file_signature(get_source_file(layer.source())) == state[1]
+
+
+def reset_pooled_layer(layer, state):
+    """Restore the filter of a checked in layer and drop its selection, the
+    edited layers are not reused"""
+    if not is_registered_layer(layer) or not layer.isValid():
+        return False
+    if isinstance(layer, QgsVectorLayer):
+        if layer.isEditable():
+            return False
+        if layer.subsetString() != state[0]:
+            layer.setSubsetString(state[0])
+        layer.removeSelection()
+    return True
+
+
+def release_pooled_layer(layer):
+    """Remove a layer dropped from the pool from the registry"""
+    if is_registered_layer(layer):
+        QgsMapLayerRegistry.instance().removeMapLayer(layer.id())
+
+
+def get_crs(definition):
+    """Get the shared CRS of the definition, e.g. EPSG:4326 or
+    proj4:+proj=longlat"""
+    def create():
+        if definition.lower().startswith('proj4:'):
+            crs = QgsCoordinateReferenceSystem()
+            crs.createFromProj4(definition[len('proj4:'):])
+            return crs
+        return QgsCoordinateReferenceSystem(definition)
+    return crsCache.get(('crs', definition), create)
+
+
+def get_crs_key(crs):
+    """Get the definition of the CRS, user CRS identifiers depend on the
+    user CRS database"""
+    authid = crs.authid()
+    if authid and not authid.startswith('USER:'):
+        return authid
+    return 'proj4:' + crs.toProj4()
+
+
+def get_transform(srcCrs, destCrs):
+    """Get the shared coordinate transform between the CRSs"""
+    return crsCache.get(
+        ('transform', get_crs_key(srcCrs), get_crs_key(destCrs)),
+        lambda: QgsCoordinateTransform(srcCrs, destCrs))
+
+
+def get_user_crs(crs):
+    """Get the CRS without authority identifier as a user CRS, saved in the
+    user CRS database unless it is already there"""
+    proj4 = crs.toProj4()
+
+    def create():
+        userCrs = QgsCoordinateReferenceSystem()
+        userCrs.createFromProj4(proj4)
+        if not userCrs.authid():
+            crs.saveAsUserCRS('')
+            userCrs = QgsCoordinateReferenceSystem()
+            userCrs.createFromProj4(proj4)
+        return userCrs
+    return crsCache.get(('user', proj4), create)
+
+
+def open_project_layer(l, layerClass):
+    """Check out the layer of a project datasource from the layer pool
+
+    :param l: project layer description
+    :param layerClass: QgsVectorLayer or QgsRasterLayer
+    """
+    crs = str(l['crs'])
+    proj4 = None
+    if crs.startswith('USER:'):
+        proj4 = str(l['proj4'])
+    key = (layerClass.__name__, l['datasource'], l['provider'], crs, proj4)
+
+    def create():
+        layer = layerClass(l['datasource'], l['name'], l['provider'])
+        QgsMapLayerRegistry.instance().addMapLayer(layer, False)
+        return layer
+
+    layer = layerPool.checkout(key, create)
+    # the CRS and name of the previous execution are overwritten
+    if proj4:
+        layer.setCrs(get_crs('proj4:' + proj4))
+    else:
+        layer.setCrs(get_crs(crs))
+    layer.setLayerName(l['name'])
+    return layer
+
+
+def release_layers():
+    """Check in the pooled layers and remove the other layers of the
+    execution from the registry"""
+    layerPool.checkin()
+    mlr = QgsMapLayerRegistry.instance()
+    pooled = [layer.id() for layer in layerPool.layers()]
+    mlr.removeMapLayers(
+        [layerId for layerId in mlr.mapLayers().keys() if layerId not in pooled])
+
+
+def get_result_inputs(args, crss):
+    """Return the canonical values of the algorithm arguments for the
+    result cache key: layers by their datasource and file signature,
+    uploaded files by their content. None if an argument can not be
+    fingerprinted, e.g. a database layer."""
+    workingDir = os.getcwd()
+    inputs = [('crss', list(crss))]
+    for (identifier, value) in args.items():
+        values = value
+        if not isinstance(value, list):
+            values = [value]
+        canonical = []
+        for v in values:
+            if isinstance(v, QgsMapLayer):
+                source = v.source()
+                sourceFile = get_source_file(source)
+                path = os.path.abspath(sourceFile)
+                # uploaded files have new names in each request
+                if path.startswith(workingDir + os.sep):
+                    signature = file_signature(path, True)
+                    source = source.replace(sourceFile, '', 1)
+                else:
+                    signature = file_signature(path)
+                if signature is None:
+                    return None
+                canonical.append([v.providerType(), source, signature])
+            elif v is None or isinstance(v, (basestring, int, long, float)):
+                canonical.append(v)
+            else:
+                return None
+        inputs.append((identifier, canonical))
+    return inputs
+
+
+def package_zipped_output(fileName, exclude=[]):
+    """Zip the vector output file with its sidecar files, compressed with
+    the [qgis] zip_compression_level
+
+    :param exclude: files, which are not sidecar files of the output
+    :returns: zip file name
+    """
+    level = -1
+    if pywpsConfig.config.has_option('qgis', 'zip_compression_level'):
+        level = int(pywpsConfig.getConfigValue(
+            'qgis', 'zip_compression_level') or -1)
+    zipName = os.path.splitext(fileName)[0] + '.zip'
+    start = time.time()
+    files = package_files(fileName, zipName, min(max(level, -1), 9), exclude)
+    QgsMessageLog.logMessage(
+        "Packaged %s: %d files, %d bytes in %.3f s" %
+        (os.path.basename(zipName), len(files), os.path.getsize(zipName),
+         time.time() - start))
+    return zipName
+
 
-    def __init__(self, algname=None):
-        self.msg = []
+class QGISProgress(StatusProgress, SilentProgress):
+    """Processing progress reported to the WPS process status, updates
+    are coalesced by the [server] statusinterval"""
 
-    def error(self, msg):
-        self.msg.append(msg)
+    def __init__(self, algname=None, status=None):
+        StatusProgress.__init__(self, status, executeStatus.getInterval())
 
 
 def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wpsserver=''):
@@ -134,6 +367,8 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
         algDesc = algDesc.replace('<p></p>', '')
         algDesc = '<![CDATA[' + algDesc + ']]>'
 
+    algTitle = escape(alg.name).replace('\\', '')
+
     # layer inputs
     rasterLayers = rasters
     vectorLayers = vectors
@@ -142,13 +377,17 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
         # Automatically init the process attributes
         WPSProcess.__init__(self,
                             identifier=alg_name,  # must be same, as filename
-                            title=escape(alg.name).replace('\\', ''),
+                            title=algTitle,
                             version="0.1",
                             storeSupported="true",
                             statusSupported="true",
                             abstract=algDesc,
                             grassLocation=False)
         self.alg = alg
+        # the class is reused by the requests, the inputs and outputs are
+        # of this instance
+        self._inputs = {}
+        self._outputs = {}
 
         # Test parameters
         if not len(self.alg.parameters):
@@ -230,6 +469,9 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                     },{
                         'mimeType':'application/gml+xml; version=3.1.1',
                         'encoding': 'utf-8'
+                    },{
+                        'mimeType':'application/x-zipped-shp',
+                        'encoding': 'base64'
                     }])
 
             elif parm.__class__.__name__ == 'ParameterRaster':
@@ -293,6 +535,9 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                         },{
                             'mimeType':'application/gml+xml; version=3.1.1',
                             'encoding': 'utf-8'
+                        },{
+                            'mimeType':'application/x-zipped-shp',
+                            'encoding': 'base64'
                         }])
 
                 elif parm.datatype == ParameterMultipleInput.TYPE_RASTER :
@@ -520,33 +765,15 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                     layerName = v.getValue()
                     values = [l for l in values if l['name'] == layerName]
                     l = values[0]
-                    layer = QgsVectorLayer(
-                        l['datasource'], l['name'], l['provider'])
-                    crs = l['crs']
-                    qgsCrs = None
-                    if str(crs).startswith('USER:'):
-                        qgsCrs = QgsCoordinateReferenceSystem()
-                        qgsCrs.createFromProj4(str(l['proj4']))
-                    else:
-                        qgsCrs = QgsCoordinateReferenceSystem(str(crs))
-                    if qgsCrs:
-                        layer.setCrs(qgsCrs)
-                    mlr.addMapLayer(layer, False)
+                    layer = open_project_layer(l, QgsVectorLayer)
                     args[v.identifier] = layer
                     inputCrs = layer.crs()
                 else:
                     fileName = v.getValue()
                     fileInfo = QFileInfo(fileName)
-                    # move fileName to fileName.gml for ogr
-                    with open(fileName, 'r') as f:
-                        o = open(fileName + '.gml', 'w')
-                        o.write(f.read())
-                        o.close()
-                    #import shutil
-                    #shutil.copy2(fileName+'.gml', '/tmp/test.gml' )
-                    # get layer
+                    # get layer, the file is opened in place
                     layer = QgsVectorLayer(
-                        fileName + '.gml', fileInfo.baseName(), 'ogr')
+                        ingest_vector_file(fileName), fileInfo.baseName(), 'ogr')
                     pr = layer.dataProvider()
                     e = layer.extent()
                     mlr.addMapLayer(layer, False)
@@ -559,18 +786,7 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                     values = [l for l in rasterLayers if l[
                         'name'] == layerName]
                     l = values[0]
-                    layer = QgsRasterLayer(
-                        l['datasource'], l['name'], l['provider'])
-                    crs = l['crs']
-                    qgsCrs = None
-                    if str(crs).startswith('USER:'):
-                        qgsCrs = QgsCoordinateReferenceSystem()
-                        qgsCrs.createFromProj4(str(l['proj4']))
-                    else:
-                        qgsCrs = QgsCoordinateReferenceSystem(str(crs))
-                    if qgsCrs:
-                        layer.setCrs(qgsCrs)
-                    mlr.addMapLayer(layer, False)
+                    layer = open_project_layer(l, QgsRasterLayer)
                     args[v.identifier] = layer
                     inputCrs = layer.crs()
                 else:
@@ -603,30 +819,13 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                         elif parm.datatype == ParameterMultipleInput.TYPE_VECTOR_POLYGON:
                             values = [l for l in values if l['geometry'] == 'Polygon']
                         for l in values:
-                            layer = QgsVectorLayer( l['datasource'], l['name'], l['provider'] )
-                            crs = l['crs']
-                            qgsCrs = None
-                            if str(crs).startswith('USER:') :
-                                qgsCrs = QgsCoordinateReferenceSystem()
-                                qgsCrs.createFromProj4( str(l['proj4']) )
-                            else :
-                                qgsCrs = QgsCoordinateReferenceSystem( str(crs) )
-                            if qgsCrs :
-                                layer.setCrs( qgsCrs )
-                            mlr.addMapLayer( layer, False )
+                            layer = open_project_layer( l, QgsVectorLayer )
                             args[v.identifier].append(layer)
                     else :
                         for fileName in fileNames:
                             fileInfo = QFileInfo( fileName )
-                            # move fileName to fileName.gml for ogr
-                            with open( fileName, 'r' ) as f :
-                                o = open( fileName+'.gml', 'w' )
-                                o.write( f.read() )
-                                o.close()
-                            #import shutil
-                            #shutil.copy2(fileName+'.gml', '/tmp/test.gml' )
-                            # get layer
-                            layer = QgsVectorLayer( fileName+'.gml', fileInfo.baseName(), 'ogr' )
+                            # get layer, the file is opened in place
+                            layer = QgsVectorLayer( ingest_vector_file( fileName ), fileInfo.baseName(), 'ogr' )
                             pr = layer.dataProvider()
                             e = layer.extent()
                             mlr.addMapLayer( layer, False )
@@ -636,17 +835,7 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                     if rasterLayers :
                         values = [l for l in rasterLayers if l['name'] in fileNames]
                         for l in values:
-                            layer = QgsRasterLayer( l['datasource'], l['name'], l['provider'] )
-                            crs = l['crs']
-                            qgsCrs = None
-                            if str(crs).startswith('USER:') :
-                                qgsCrs = QgsCoordinateReferenceSystem()
-                                qgsCrs.createFromProj4( str(l['proj4']) )
-                            else :
-                                qgsCrs = QgsCoordinateReferenceSystem( str(crs) )
-                            if qgsCrs :
-                                layer.setCrs( qgsCrs )
-                            mlr.addMapLayer( layer, False )
+                            layer = open_project_layer( l, QgsRasterLayer )
                             args[v.identifier].append(layer)
                     else :
                         for fileName in fileNames:
@@ -682,18 +871,15 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                         coords = extent.coords
                         coordCrs = extent.crs
                         if coordCrs:
-                            coordCrs = QgsCoordinateReferenceSystem(
-                                str(coordCrs))
+                            coordCrs = get_crs(str(coordCrs))
                         elif crss:
-                            coordCrs = QgsCoordinateReferenceSystem(
-                                str(crss[0]))
+                            coordCrs = get_crs(str(crss[0]))
                         else:
-                            coordCrs = QgsCoordinateReferenceSystem(
-                                'EPSG:4326')
+                            coordCrs = get_crs('EPSG:4326')
                         if coordCrs:
                             coordExtent = QgsRectangle(coords[0][0], coords[0][
                                                        1], coords[1][0], coords[1][1])
-                            xform = QgsCoordinateTransform(coordCrs, inputCrs)
+                            xform = get_transform(coordCrs, inputCrs)
                             coordExtent = xform.transformBoundingBox(
                                 coordExtent)
                             args[v.identifier] = str(coordExtent.xMinimum()) + ',' + str(coordExtent.xMaximum(
@@ -707,7 +893,37 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
         if not len(self.alg.parameters):
             self.alg.defineCharacteristics()
 
-        progress = QGISProgress()
+        # the same execution, e.g. from a dashboard, reuses the stored
+        # outputs
+        cacheKey = None
+        configure_result_cache()
+        if resultCache.isCacheable(self.identifier):
+            cacheKey = self.getResultKey(args)
+        if cacheKey:
+            try:
+                outputs = resultCache.get(cacheKey)
+            except Exception, e:
+                QgsMessageLog.logMessage("Result cache: " + str(e))
+                outputs = None
+            if outputs is not None:
+                release_layers()
+                self.setCachedOutputs(outputs)
+                QgsMessageLog.logMessage(
+                    "Result cache hit %s (%d hits, %d misses)" %
+                    (self.identifier, resultCache.hits, resultCache.misses))
+                return
+
+        # vector outputs in formats the algorithm can write are not
+        # converted afterwards
+        for k in self._outputs:
+            v = getattr(self, k)
+            parm = self.alg.getOutputFromName(v.identifier)
+            if parm.__class__.__name__ == 'OutputVector':
+                args[v.identifier] = get_direct_output_file(
+                    v.identifier, v.format['mimetype'],
+                    self.alg.provider.getSupportedOutputVectorLayerExtensions())
+
+        progress = QGISProgress(self.alg.name, self.status)
         tAlg = Processing.runAlgorithm(self.alg, None, args, progress=progress)
         # if runalg failed return exception message
         if not tAlg:
@@ -715,7 +931,7 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
         if len(progress.msg):
             return ', '.join(progress.msg)
         # clear map layer registry
-        mlr.removeAllMapLayers()
+        release_layers()
         # get result
         result = tAlg.getOutputValuesAsDictionary()
         for k in self._outputs:
@@ -734,10 +950,7 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                     outputName, outputInfo.baseName(), 'ogr')
                 # Update input CRS
                 if inputCrs and not inputCrs.authid():
-                    inputCrs.saveAsUserCRS('')
-                    crs = QgsCoordinateReferenceSystem()
-                    crs.createFromProj4(inputCrs.toProj4())
-                    inputCrs = crs
+                    inputCrs = get_user_crs(inputCrs)
                 # Update CRS
                 if inputCrs and not outputLayer.dataProvider().crs().authid():
                     outputLayer.setCrs(inputCrs)
@@ -745,22 +958,21 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                 destCrs = None
                 if outputLayer.crs().authid().startswith('USER:'):
                     if crss:
-                        destCrs = QgsCoordinateReferenceSystem(str(crss[0]))
+                        destCrs = get_crs(str(crss[0]))
                         v.projection = str(crss[0])
                     else:
-                        destCrs = QgsCoordinateReferenceSystem('EPSG:4326')
+                        destCrs = get_crs('EPSG:4326')
                         v.projection = 'EPSG:4326'
                 # define the file extension
-                outputExt = 'gml'
-                if v.format['mimetype'] == 'application/json':
-                    outputExt = 'geojson'
-                elif v.format['mimetype'] == 'application/x-zipped-shp':
-                    outputExt = 'shp'
-                elif v.format['mimetype'] == 'application/x-zipped-tab':
-                    outputExt = 'tab'
+                outputExt = VECTOR_OUTPUT_EXTENSIONS.get(
+                    v.format['mimetype'], 'gml')
+                # the algorithm has written the requested format
+                written = is_written_output(
+                    outputName, outputExt, destCrs is not None,
+                    outputLayer.dataProvider().crs().authid())
                 # define the output file path
-                outputFile = os.path.join(outputInfo.absolutePath(
-                ), outputInfo.baseName() + '.' + outputExt)
+                outputFile = get_vector_output_file(
+                    outputName, outputExt, written)
                 # write the output GML file
                 if v.format['mimetype'] == 'application/x-zipped-shp':
                     if destCrs:
@@ -769,54 +981,24 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                         outputInfo = QFileInfo(outputFile)
                         error = QgsVectorFileWriter.writeAsVectorFormat(
                             outputLayer, outputFile, 'utf-8', destCrs, 'ESRI Shapefile', False, None)
+                    else:
+                        # the shapefile of the algorithm
+                        outputFile = outputName
                     # compress files
-                    import zipfile
-                    try:
-                        import zlib
-                        compression = zipfile.ZIP_DEFLATED
-                    except:
-                        compression = zipfile.ZIP_STORED
-                    zFile = os.path.join(
-                        outputInfo.absolutePath(), outputInfo.baseName() + '.zip')
-                    with zipfile.ZipFile(zFile, 'w') as zf:
-                        zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                        ) + '.shp'), compress_type=compression, arcname=outputInfo.baseName() + '.shp')
-                        zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                        ) + '.shx'), compress_type=compression, arcname=outputInfo.baseName() + '.shx')
-                        zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                        ) + '.dbf'), compress_type=compression, arcname=outputInfo.baseName() + '.dbf')
-                        if os.path.exists(os.path.join(outputInfo.absolutePath(), outputInfo.baseName() + '.prj')):
-                            zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                            ) + '.prj'), compress_type=compression, arcname=outputInfo.baseName() + '.prj')
-                        zf.close()
-                    outputFile = zFile
+                    outputFile = package_zipped_output(outputFile)
                 elif v.format['mimetype'] == 'application/x-zipped-tab':
-                    error = QgsVectorFileWriter.writeAsVectorFormat(
-                        outputLayer, outputFile, 'utf-8', destCrs, 'Mapinfo File', False, None)
+                    # files of the algorithm output, e.g. a shapefile
+                    algFiles = []
+                    if not written:
+                        algFiles = get_sidecar_files(outputName)
+                        error = QgsVectorFileWriter.writeAsVectorFormat(
+                            outputLayer, outputFile, 'utf-8', destCrs, 'Mapinfo File', False, None)
                     # compress files
-                    import zipfile
-                    try:
-                        import zlib
-                        compression = zipfile.ZIP_DEFLATED
-                    except:
-                        compression = zipfile.ZIP_STORED
-                    zFile = os.path.join(
-                        outputInfo.absolutePath(), outputInfo.baseName() + '.zip')
-                    with zipfile.ZipFile(zFile, 'w') as zf:
-                        zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                        ) + '.tab'), compress_type=compression, arcname=outputInfo.baseName() + '.tab')
-                        zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                        ) + '.dat'), compress_type=compression, arcname=outputInfo.baseName() + '.dat')
-                        zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                        ) + '.map'), compress_type=compression, arcname=outputInfo.baseName() + '.map')
-                        if os.path.exists(os.path.join(outputInfo.absolutePath(), outputInfo.baseName() + '.id')):
-                            zf.write(os.path.join(outputInfo.absolutePath(), outputInfo.baseName(
-                            ) + '.id'), compress_type=compression, arcname=outputInfo.baseName() + '.id')
-                        zf.close()
-                    outputFile = zFile
+                    outputFile = package_zipped_output(outputFile, algFiles)
                 elif v.format['mimetype'] == 'application/json':
-                    error = QgsVectorFileWriter.writeAsVectorFormat(
-                        outputLayer, outputFile, 'utf-8', destCrs, 'GeoJSON', False, None)
+                    if not written:
+                        error = QgsVectorFileWriter.writeAsVectorFormat(
+                            outputLayer, outputFile, 'utf-8', destCrs, 'GeoJSON', False, None)
                 elif v.format['mimetype'] in ('text/xml; subtype=gml/3.1.1', 'application/gml+xml; version=3.1.1'):
                     error = QgsVectorFileWriter.writeAsVectorFormat(outputLayer, outputFile, 'utf-8', destCrs, 'GML', False, None, [
                                                                     'XSISCHEMAURI=http://schemas.opengis.net/gml/3.1.1/base/feature.xsd', 'FORMAT=GML3'])
@@ -845,10 +1027,7 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
                     outputName, outputInfo.baseName(), 'gdal')
                 # Update input CRS
                 if inputCrs and not inputCrs.authid():
-                    inputCrs.saveAsUserCRS('')
-                    crs = QgsCoordinateReferenceSystem()
-                    crs.createFromProj4(inputCrs.toProj4())
-                    inputCrs = crs
+                    inputCrs = get_user_crs(inputCrs)
                 # Update CRS
                 if inputCrs and not outputLayer.dataProvider().crs().authid():
                     outputLayer.setCrs(inputCrs)
@@ -867,16 +1046,88 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
         for k in self._outputs:
             v = getattr(self, k)
             v.setValue(args[v.identifier])
+        if cacheKey:
+            self.putCachedOutputs(cacheKey)
         return
 
+    def execute_pooled(self):
+        """Execute the algorithm, the input layers are returned to the
+        layer pool even if it fails"""
+        configure_layer_pool()
+        try:
+            return execute(self)
+        finally:
+            release_layers()
+
+    def getResultKey(self, args):
+        """Return the result cache key of the execution, None if it can not
+        be cached"""
+        outputs = []
+        for k in self._outputs:
+            v = getattr(self, k)
+            mimeType = None
+            if v.type == 'ComplexValue':
+                mimeType = v.format['mimetype']
+                # the OWS references are built for this request
+                if not v.asReference and mimeType.startswith('application/x-ogc-'):
+                    return None
+            outputs.append((v.identifier, [mimeType, bool(v.asReference)]))
+        inputs = get_result_inputs(args, crss)
+        if inputs is None:
+            return None
+        # the models and scripts of the algorithm may have been edited
+        return resultCache.getKey(self.identifier, inputs, outputs,
+                                  processingLoader.fingerprint)
+
+    def putCachedOutputs(self, cacheKey):
+        """Store the output values and files in the result cache"""
+        outputs = {}
+        for k in self._outputs:
+            v = getattr(self, k)
+            value = v.getValue()
+            if v.type == 'ComplexValue' and isinstance(value, basestring) \
+                    and os.path.isfile(value):
+                outputs[v.identifier] = {
+                    'file': value, 'projection': getattr(v, 'projection', None)}
+            elif value is None or isinstance(value, (basestring, int, long, float)):
+                outputs[v.identifier] = {'value': value}
+            else:
+                return
+        try:
+            resultCache.put(cacheKey, outputs)
+        except Exception, e:
+            QgsMessageLog.logMessage("Result cache: " + str(e))
+
+    def setCachedOutputs(self, outputs):
+        """Set the outputs from the result cache, the files are linked to
+        the working directory, or copied"""
+        for k in self._outputs:
+            v = getattr(self, k)
+            output = outputs[v.identifier]
+            if 'file' in output:
+                outputFile = os.path.join(
+                    os.getcwd(), os.path.basename(output['file']))
+                executePublish.publishFile(output['file'], outputFile, False)
+                if output.get('projection'):
+                    v.projection = output['projection']
+                v.setValue(outputFile)
+            else:
+                v.setValue(output['value'])
+
     try:
+        # class level description, used before instantiation
         new_class = classobj(str('%sProcess' % class_name), (WPSProcess, ), {
+            'identifier': alg_name,
+            'title': algTitle,
+            'abstract': algDesc,
+            'version': "0.1",
             '__init__':  process_init,
-            'execute': execute,
+            'execute': execute_pooled,
+            'getResultKey': getResultKey,
+            'putCachedOutputs': putCachedOutputs,
+            'setCachedOutputs': setCachedOutputs,
             'params': [],
-            'alg': alg,
-            '_inputs': {},
-            '_outputs': {}
+            'alg': alg
         })
         return new_class
     except TypeError, e:
@@ -884,10 +1135,80 @@ def QGISProcessFactory(alg_name, project='', vectors=[], rasters=[], crss=[], wp
         return None
 
 
+# process classes built by QGISProcessFactory, kept across requests
+processRegistry = ProcessRegistry(QGISProcessFactory)
+
+# Processing initialization state, kept across requests
+processingLoader = ProcessingLoader()
+
+# GetCapabilities responses, kept until one of their inputs changes
+capabilitiesCache = CapabilitiesCache()
+
+# Execute results, configured by [qgis] result_cache options
+resultCache = ResultCache()
+
+# CRS and coordinate transforms of the executions
+crsCache = CrsCache()
+
+# opened project layers, configured by [qgis] layer_pool_size option
+layerPool = LayerPool(validate=validate_pooled_layer,
+                      reset=reset_pooled_layer,
+                      release=release_pooled_layer,
+                      capture=capture_pooled_layer)
+
+
+class QGISProcessProvider(ProcessClassProvider):
+    """Provider of the published process classes, which can be pickled
+    for the Execute worker pool. The worker, forked from the server, builds
+    the executed class again with its own Processing algorithms."""
+
+    projectPath = ''
+    crsList = []
+    wpsaddress = ''
+
+    def __init__(self, processes, projectPath='', crsList=[], wpsaddress=''):
+        ProcessClassProvider.__init__(self, processes)
+        self.projectPath = projectPath
+        self.crsList = crsList
+        self.wpsaddress = wpsaddress
+
+    def __getstate__(self):
+        return {'identifiers': self._identifiers,
+                'projectPath': self.projectPath,
+                'crsList': self.crsList,
+                'wpsaddress': self.wpsaddress}
+
+    def __setstate__(self, state):
+        self._identifiers = state['identifiers']
+        self._classes = {}
+        self.projectPath = state['projectPath']
+        self.crsList = state['crsList']
+        self.wpsaddress = state['wpsaddress']
+
+    def getSummary(self, identifier):
+        if identifier not in self._classes:
+            for algs in get_processing_algs().values():
+                if identifier in algs:
+                    self._classes[identifier] = processRegistry.getProcessClass(
+                        identifier, algs[identifier], self.projectPath,
+                        get_project_catalog(self.projectPath), self.crsList,
+                        self.wpsaddress)
+                    break
+        return self._classes[identifier]
+
+    def getProcess(self, identifier):
+        return self.getSummary(identifier)()
+
+
 class wpsFilter(QgsServerFilter):
 
     def __init__(self, serverIface):
         super(wpsFilter, self).__init__(serverIface)
+        # forget the process classes when Processing reloads algorithms
+        try:
+            Processing.addAlgListListener(processRegistry)
+        except AttributeError:
+            pass
 
     def requestReady(self):
         """request ready"""
@@ -909,6 +1230,14 @@ class wpsFilter(QgsServerFilter):
         if service and service.upper() == 'WPS':
             if params.get('REQUEST', '').upper() == 'GETSCHEMA':
                 self.processGetSchema(request, params)
+            elif params.get('REQUEST', '').upper() == 'GETQUEUESTATUS':
+                self.processGetQueueStatus(request, params)
+            elif params.get('REQUEST', '').upper() == 'GETSTATUS':
+                self.processGetStatus(request, params)
+            elif params.get('REQUEST', '').upper() == 'LISTJOBS':
+                self.processListJobs(request, params)
+            elif params.get('REQUEST', '').upper() == 'GETRETENTIONSTATUS':
+                self.processGetRetentionStatus(request, params)
             else:
                 self.processWpsRequest(request, params)
 
@@ -957,6 +1286,112 @@ class wpsFilter(QgsServerFilter):
         request.setInfoFormat(infoformat)
         request.appendBody(read_data)
 
+    def loadConfiguration(self, params):
+        """Load the PyWPS configuration for the vendor requests"""
+        configPath = os.getenv("PYWPS_CFG")
+        if not configPath:
+            configPath = params.get('CONFIG', params.get('config'))
+        if configPath:
+            os.environ["PYWPS_CFG"] = configPath
+        pywpsConfig.loadConfiguration()
+
+    def sendJson(self, request, value, status=None):
+        """Send the value as JSON"""
+        request.clearHeaders()
+        request.clearBody()
+        if status:
+            request.setHeader('Status', status)
+        request.setInfoFormat('application/json')
+        request.appendBody(json.dumps(value))
+
+    def processGetQueueStatus(self, request, params):
+        """Send queue depth, running processes and waiting times of the
+        Execute scheduler as JSON"""
+        self.loadConfiguration(params)
+
+        stats = {}
+        scheduler = executeScheduler.getScheduler()
+        if scheduler:
+            stats = scheduler.getStats()
+        self.sendJson(request, stats)
+
+    def processGetRetentionStatus(self, request, params):
+        """Send the files and bytes reclaimed by the retention sweeps and
+        the size of the outputs as JSON"""
+        self.loadConfiguration(params)
+
+        metrics = executeRetention.getRetention().getMetrics()
+        metrics['sweeper'] = executeRetention.startSweeper()
+        self.sendJson(request, metrics)
+
+    def processGetStatus(self, request, params):
+        """Send the Execute job of the JOBID parameter, pywps-<uuid>, from
+        the job store as JSON"""
+        self.loadConfiguration(params)
+
+        jobStore = executeJobs.getJobStore()
+        jobId = params.get('JOBID', '')
+        if jobId and not jobId.startswith('pywps-'):
+            jobId = 'pywps-' + jobId
+        job = None
+        if jobStore and jobId:
+            job = jobStore.get(jobId)
+        if job is None:
+            self.sendJson(request, {'error': 'Job %s not found' % jobId},
+                          '404 Not Found')
+            return
+        self.sendJson(request, job)
+
+    def processListJobs(self, request, params):
+        """Send the Execute jobs from the job store as JSON, filtered by
+        STATUS and IDENTIFIER parameters, paged by LIMIT, at most 1000, and
+        OFFSET"""
+        self.loadConfiguration(params)
+
+        jobStore = executeJobs.getJobStore()
+        if jobStore is None:
+            self.sendJson(request, [])
+            return
+
+        status = params.get('STATUS', '').lower()
+        if status and not status.startswith('process'):
+            status = 'process' + status
+        try:
+            limit = int(params.get('LIMIT', 100))
+            offset = int(params.get('OFFSET', 0))
+        except ValueError:
+            self.sendJson(request, {'error': 'Invalid LIMIT or OFFSET'},
+                          '400 Bad Request')
+            return
+        self.sendJson(request, jobStore.list(
+            status, params.get('IDENTIFIER'), limit, offset))
+
+    def sendCapabilities(self, request, cached):
+        """Send a cached GetCapabilities response with its ETag, answer
+        304 Not Modified if the client already has it"""
+        request.clearHeaders()
+        request.clearBody()
+        request.setHeader('ETag', cached.etag)
+        ifNoneMatch = self.serverInterface().getEnv('HTTP_IF_NONE_MATCH')
+        if etag_matches(ifNoneMatch, cached.etag):
+            request.setHeader('Status', '304 Not Modified')
+            return
+        request.setInfoFormat(cached.contentType)
+        request.appendBody(cached.body)
+
+    def appendChunks(self, request, resp):
+        """Append a streamed response or a file to the body chunk by chunk,
+        without formating or reading it to one string"""
+        if isinstance(resp, file):
+            # the raw output file is sent as it is
+            request.setHeader('Content-Length',
+                              str(os.fstat(resp.fileno()).st_size - resp.tell()))
+            chunks = iter(lambda: resp.read(CHUNKSIZE), '')
+        else:
+            chunks = resp
+        for chunk in chunks:
+            request.appendBody(chunk)
+
     def processWpsRequest(self, request, params):
         # prepare query
         inputQuery = '&'.join(["%s=%s" % (k, params[k]) for k in params if k.lower(
@@ -975,6 +1410,9 @@ class wpsFilter(QgsServerFilter):
             os.environ["PYWPS_CFG"] = configPath
         pywpsConfig.loadConfiguration()
 
+        # old outputs and temporary files are removed in the background
+        executeRetention.startSweeper()
+
         try:
             providerList = ''
             algList = ''
@@ -996,48 +1434,11 @@ class wpsFilter(QgsServerFilter):
                     algsFilter = pywpsConfig.getConfigValue(
                         'qgis', 'algs_filter')
 
-            # init Processing
-            Processing.initialize()
-            # load QGIS Processing config
-            if pywpsConfig.config.has_section('qgis_processing'):
-                for opt in pywpsConfig.config.options('qgis_processing'):
-                    opt_val = pywpsConfig.getConfigValue(
-                        'qgis_processing', opt)
-                    ProcessingConfig.setSettingValue(opt.upper(), opt_val)
-                # Reload algorithms
-                Processing.updateAlgsList()
-            # modify processes path and reload algorithms
-            if pywpsConfig.config.has_section('qgis') and pywpsConfig.config.has_option('qgis', 'processing_folder'):
-                processingPath = pywpsConfig.getConfigValue(
-                    'qgis', 'processing_folder')
-                if not os.path.exists(processingPath):
-                    if configPath and os.path.exists(configPath):
-                        processingPath = os.path.join(
-                            os.path.dirname(configPath),
-                            processingPath
-                        )
-                        processingPath = os.path.abspath(processingPath)
-                    else:
-                        configFilesLocation = pywpsConfig._getDefaultConfigFilesLocation()
-                        for configFileLocation in configFilesLocation:
-                            if os.path.exists(configFileLocation):
-                                processingPath = os.path.join(
-                                    os.path.dirname(configFileLocation),
-                                    processingPath
-                                )
-                                processingPath = os.path.abspath(
-                                    processingPath)
-                QgsMessageLog.logMessage(
-                    "processing_folder: " + processingPath)
-                if os.path.exists(processingPath) and os.path.isdir(processingPath):
-                    ProcessingConfig.setSettingValue(
-                        'MODELS_FOLDER', os.path.join(processingPath, 'models'))
-                    ProcessingConfig.setSettingValue(
-                        'SCRIPTS_FOLDER', os.path.join(processingPath, 'scripts'))
-                    ProcessingConfig.setSettingValue(
-                        'R_SCRIPTS_FOLDER', os.path.join(processingPath, 'rscripts'))
-                    # Reload algorithms
-                    Processing.updateAlgsList()
+            # init Processing, reload algorithms only if the settings or
+            # the models, scripts and rscripts folders have changed. The
+            # Execute workers are forked again with the new algorithms.
+            if processingLoader.load(configPath):
+                executePool.recycle()
 
             crsList = []
             if pywpsConfig.config.has_section('qgis') and pywpsConfig.config.has_option('qgis', 'input_bbox_crss'):
@@ -1052,86 +1453,60 @@ class wpsFilter(QgsServerFilter):
                 projectPath = params['map']
             elif not projectPath and 'MAP' in params:
                 projectPath = params['MAP']
-            # projectFolder
-            projectFolder = ''
-            if projectPath and os.path.exists(projectPath):
-                projectFolder = os.path.dirname(projectPath)
             QgsMessageLog.logMessage("projectPath " + str(projectPath))
 
-            rasterLayers = []
-            vectorLayers = []
-
-            if projectPath and os.path.exists(projectPath):
-                p_dom = minidom.parse(projectPath)
-                for ml in p_dom.getElementsByTagName('maplayer'):
-                    l = {'type': ml.attributes["type"].value,
-                         'name': ml.getElementsByTagName('layername')[0].childNodes[0].data,
-                         'datasource': ml.getElementsByTagName('datasource')[0].childNodes[0].data,
-                         'provider': ml.getElementsByTagName('provider')[0].childNodes[0].data,
-                         'crs': ml.getElementsByTagName('srs')[0].getElementsByTagName('authid')[0].childNodes[0].data,
-                         'proj4': ml.getElementsByTagName('srs')[0].getElementsByTagName('proj4')[0].childNodes[0].data
-                         }
-                    # Update relative path
-                    if l['provider'] in ['ogr', 'gdal'] and str(l['datasource']).startswith('.'):
-                        l['datasource'] = os.path.abspath(
-                            os.path.join(projectFolder, l['datasource']))
-                        if not os.path.exists(l['datasource']):
-                            continue
-                    elif l['provider'] in ['gdal'] and str(l['datasource']).startswith('NETCDF:'):
-                        theURIParts = l['datasource'].split(":")
-                        src = theURIParts[1]
-                        src = src.replace('"', '')
-                        if src.startswith('.'):
-                            src = os.path.abspath(
-                                os.path.join(projectFolder, src))
-                        theURIParts[1] = '"' + src + '"'
-                        l['datasource'] = ':'.join(theURIParts)
-
-                    if l['type'] == "raster":
-                        rasterLayers.append(l)
-                    elif l['type'] == "vector":
-                        l['geometry'] = ml.attributes["geometry"].value
-                        vectorLayers.append(l)
-
-                defaultCrs = ''
-                for mapcanvas in p_dom.getElementsByTagName('mapcanvas'):
-                    for destinationsrs in mapcanvas.getElementsByTagName('destinationsrs'):
-                        for authid in destinationsrs.getElementsByTagName('authid'):
-                            defaultCrs = authid.childNodes[0].data
-                            crsList.append(defaultCrs)
-                for wmsCrsList in p_dom.getElementsByTagName('WMSCrsList'):
-                    for wmsCrs in wmsCrsList.getElementsByTagName('value'):
-                        wmsCrsValue = wmsCrs.childNodes[0].data
-                        if wmsCrsValue and wmsCrsValue != defaultCrs:
-                            crsList.append(wmsCrsValue)
-
-            # if no processes found no processes return (deactivate default
-            # pywps process)
-            processes = [None]
-            identifier = params.get('IDENTIFIER', '').lower()
+            # the project layers are parsed once and kept until the
+            # project file changes
+            catalog = get_project_catalog(projectPath)
+            if catalog:
+                crsList = crsList + catalog.crsList
+
+            wpsaddress = get_wps_server_address(self.serverInterface(), params)
+            QgsMessageLog.logMessage("wpsaddress " + wpsaddress)
+
+            # the processes are only instantiated by PyWPS when the request
+            # needs them
+            processes = []
+            published = []
             for i in get_processing_algs():
                 if providerList and i not in providerList:
                     continue
                 QgsMessageLog.logMessage(
                     "provider " + i + " " + str(len(get_processing_algs()[i])))
                 for m in get_processing_algs()[i]:
-                    if identifier and identifier != m:
-                        continue
                     if algList and m not in algList:
                         continue
+                    alg = get_processing_algs()[i][m]
                     if algsFilter:
-                        alg = Processing.getAlgorithm(m)
                         if algsFilter.lower() not in alg.name.lower() and algsFilter.lower() not in m.lower():
                             continue
                     QgsMessageLog.logMessage("provider " + i + " " + m)
-                    processes.append(QGISProcessFactory(
-                        m, projectPath, vectorLayers, rasterLayers, crsList,
-                        get_wps_server_address(self.serverInterface(), params)))
+                    processClass = processRegistry.getProcessClass(
+                        m, alg, projectPath, catalog, crsList, wpsaddress)
+                    if processClass:
+                        processes.append(processClass)
+                        published.append(m)
+
+            # serve GetCapabilities from the cache if its inputs are unchanged
+            cacheKey = None
+            if not request_body and params.get('REQUEST', '').upper() == 'GETCAPABILITIES':
+                capabilitiesCache.invalidate((
+                    pywpsConfig.getSnapshot().fingerprint,
+                    processingLoader.fingerprint,
+                    processRegistry.generation))
+                cacheKey = capabilitiesCache.getKey(
+                    sorted([(k, params[k]) for k in params]),
+                    catalog and catalog.fingerprint,
+                    published,
+                    wpsaddress)
+                cached = capabilitiesCache.get(cacheKey)
+                if cached:
+                    QgsMessageLog.logMessage("GetCapabilities from cache")
+                    self.sendCapabilities(request, cached)
+                    return
 
             #pywpsConfig.setConfigValue("server","outputPath", '/tmp/wpsoutputs')
             #pywpsConfig.setConfigValue("server","logFile", '/tmp/pywps.log')
-            wpsaddress = get_wps_server_address(self.serverInterface(), params)
-            QgsMessageLog.logMessage("wpsaddress " + get_wps_server_address(self.serverInterface(), params))
 
             # init wps
             method = 'GET'
@@ -1158,7 +1533,12 @@ class wpsFilter(QgsServerFilter):
 
             if wps.parseRequest(inputQuery):
                 try:
-                    response = wps.performRequest(processes=processes)
+                    # if no processes found no processes return (the empty
+                    # provider deactivates default pywps process)
+                    response = wps.performRequest(
+                        processes=QGISProcessProvider(
+                            processes, projectPath, crsList, wpsaddress),
+                        stream=True)
                     if response:
                         request.clearHeaders()
                         request.clearBody()
@@ -1167,7 +1547,17 @@ class wpsFilter(QgsServerFilter):
                             "contentType " + wps.request.contentType)
                         request.setInfoFormat(wps.request.contentType)
                         resp = wps.response
-                        if not pywpsConfig.getConfigValue("wps", "serveraddress") and wps.request.contentType == 'application/xml':
+                        # Execute responses and raw outputs are streamed
+                        streamed = isinstance(resp, TemplateStream) or \
+                            isinstance(resp, file)
+                        if streamed:
+                            # the files of the stream are closed even if
+                            # sending fails
+                            try:
+                                self.appendChunks(request, resp)
+                            finally:
+                                resp.close()
+                        elif not pywpsConfig.getConfigValue("wps", "serveraddress") and wps.request.contentType == 'application/xml':
                             import re
                             import xml.sax.saxutils as saxutils
                             resp = re.sub(
@@ -1181,10 +1571,11 @@ class wpsFilter(QgsServerFilter):
                                 import xml.sax.saxutils as saxutils
                                 resp = re.sub(r'Get xlink:href=".*"', 'Get xlink:href="' + m.group(1)[
                                               :-1] + saxutils.escape('&') + '"', resp)
-                        # test response type
-                        if isinstance(resp, file):
-                            resp = resp.read()
-                        request.appendBody(resp)
+                        if cacheKey:
+                            self.sendCapabilities(request, capabilitiesCache.set(
+                                cacheKey, wps.request.contentType, resp))
+                        elif not streamed:
+                            request.appendBody(resp)
                         # Debug output useful for development
                         # QgsMessageLog.logMessage(
                         #    "WPS Response:\n%s" % resp)
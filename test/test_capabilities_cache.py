@@ -0,0 +1,62 @@
+# coding=utf-8
+"""Tests for the GetCapabilities response cache."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.capabilitiesCache import CapabilitiesCache, etag_matches
+
+
+class CapabilitiesCacheTest(unittest.TestCase):
+    """Test responses are kept until their inputs change."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.cache = CapabilitiesCache(maxEntries=2)
+        self.cache.invalidate(('config', 'algs', 0))
+
+    def test_cache(self):
+        """Test responses are found by their inputs fingerprint."""
+        key = self.cache.getKey([('SERVICE', 'WPS')], 'project', ['a'], 'h?')
+        self.assertEqual(self.cache.get(key), None)
+        cached = self.cache.set(key, 'application/xml', '<Capabilities/>')
+        self.assertTrue(self.cache.get(key) is cached)
+        self.assertTrue(cached.etag.startswith('"'))
+        self.assertNotEqual(
+            key,
+            self.cache.getKey([('SERVICE', 'WPS')], 'project', ['a', 'b'],
+                              'h?'))
+
+        self.cache.invalidate(('config', 'algs', 0))
+        self.assertTrue(self.cache.get(key) is cached)
+        self.cache.invalidate(('config', 'algs', 1))
+        self.assertEqual(self.cache.get(key), None)
+
+    def test_max_entries(self):
+        """Test the oldest responses are dropped."""
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, 'application/xml', key)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('a'), None)
+
+    def test_etag_matches(self):
+        """Test If-None-Match header values."""
+        etag = '"abc"'
+        self.assertFalse(etag_matches('', etag))
+        self.assertFalse(etag_matches(None, etag))
+        self.assertFalse(etag_matches('"abd"', etag))
+        self.assertTrue(etag_matches('"abc"', etag))
+        self.assertTrue(etag_matches('"x", W/"abc"', etag))
+        self.assertTrue(etag_matches('*', etag))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CapabilitiesCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
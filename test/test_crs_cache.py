@@ -0,0 +1,56 @@
+# coding=utf-8
+"""Tests for the CRS and coordinate transform cache."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.crsCache import CrsCache
+
+
+class CrsCacheTest(unittest.TestCase):
+    """Test objects are made once per key."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.cache = CrsCache(2)
+        self.created = []
+
+    def get(self, *key):
+        def create():
+            self.created.append(key)
+            return object()
+        return self.cache.get(key, create)
+
+    def test_get(self):
+        """Test the cached object is shared."""
+        crs = self.get('crs', 'EPSG:4326')
+        self.assertTrue(self.get('crs', 'EPSG:4326') is crs)
+        self.assertFalse(self.get('crs', 'EPSG:3857') is crs)
+        self.get('transform', 'EPSG:4326', 'EPSG:3857')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+    def test_size(self):
+        """Test the least recently used objects are dropped."""
+        self.get('crs', 'a')
+        self.get('crs', 'b')
+        self.get('crs', 'a')
+        self.get('crs', 'c')
+        self.get('crs', 'a')
+        self.get('crs', 'b')
+        self.assertEqual(self.created, [('crs', 'a'), ('crs', 'b'),
+                                        ('crs', 'c'), ('crs', 'b')])
+        self.cache.clear()
+        self.get('crs', 'a')
+        self.assertEqual(len(self.created), 5)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CrsCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
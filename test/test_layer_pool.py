@@ -0,0 +1,106 @@
+# coding=utf-8
+"""Tests for the Execute input layer pool."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.layerPool import LayerPool
+
+
+class FakeLayer:
+    """Map layer stub."""
+
+    def __init__(self, source):
+        self.source = source
+        self.subset = 'project'
+        self.version = 1
+        self.valid = True
+        self.edited = False
+        self.released = False
+
+
+def reset(layer, state):
+    """Restore the filter of the layer."""
+    layer.subset = state[0]
+    return not layer.edited
+
+
+class LayerPoolTest(unittest.TestCase):
+    """Test layers are reused, reset and released."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.pool = LayerPool(
+            2, validate=lambda layer, state: layer.valid and
+            layer.version == state[1],
+            reset=reset,
+            release=lambda layer: setattr(layer, 'released', True),
+            capture=lambda layer: (layer.subset, layer.version))
+
+    def checkout(self, source):
+        return self.pool.checkout(source, lambda: FakeLayer(source))
+
+    def test_reuse(self):
+        """Test checked in layers are reused, but not during the
+        execution."""
+        a = self.checkout('a')
+        self.assertFalse(self.checkout('a') is a)
+        self.pool.checkin()
+        self.assertEqual(len(self.pool.layers()), 1)
+        self.assertTrue(self.checkout('a') is a)
+        self.assertEqual((self.pool.hits, self.pool.misses), (1, 2))
+
+    def test_reset(self):
+        """Test invalid and edited layers are not reused."""
+        a = self.checkout('a')
+        b = self.checkout('b')
+        b.edited = True
+        self.pool.checkin()
+        self.assertTrue(b.released)
+        a.valid = False
+        self.assertFalse(self.checkout('a') is a)
+        self.assertTrue(a.released)
+
+    def test_state(self):
+        """Test the filter is restored and changed files are reopened."""
+        a = self.checkout('a')
+        a.subset = 'execution'
+        self.pool.checkin()
+        self.assertEqual(a.subset, 'project')
+        self.assertTrue(self.checkout('a') is a)
+        self.pool.checkin()
+        a.version = 2
+        self.assertFalse(self.checkout('a') is a)
+        self.assertTrue(a.released)
+
+    def test_size(self):
+        """Test the least recently used layers are released."""
+        layers = [self.checkout(source) for source in 'abc']
+        self.pool.checkin()
+        self.assertEqual([l.released for l in layers], [True, False, False])
+        self.checkout('b')
+        self.pool.checkin()
+        self.assertEqual([l.source for l in self.pool.layers()], ['c', 'b'])
+        self.pool.clear()
+        self.assertEqual(self.pool.layers(), [])
+        self.assertTrue(layers[2].released)
+
+    def test_disabled(self):
+        """Test the layers are released without pool size."""
+        self.pool.maxSize = 0
+        a = self.checkout('a')
+        self.pool.checkin()
+        self.assertTrue(a.released)
+        self.assertEqual(self.pool.layers(), [])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(LayerPoolTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,76 @@
+# coding=utf-8
+"""Tests for the zipped output packaging."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.outputPackage import package_files, get_sidecar_files
+
+
+class OutputPackageTest(unittest.TestCase):
+    """Test outputs are zipped with their sidecar files."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpDir = tempfile.mkdtemp()
+        for name in ('roads.shp', 'roads.shx', 'roads.dbf', 'roads.cpg',
+                     'roads.qix', 'roads.shp.xml', 'roads_4326.shp',
+                     'roads.tab'):
+            with open(os.path.join(self.tmpDir, name), 'w') as f:
+                f.write(name * 1000)
+        self.fileName = os.path.join(self.tmpDir, 'roads.shp')
+        self.zipName = os.path.join(self.tmpDir, 'roads.zip')
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpDir)
+
+    def test_sidecars(self):
+        """Test every file with the same base name is packaged."""
+        self.assertEqual(
+            [os.path.basename(name)
+             for name in get_sidecar_files(self.fileName)],
+            ['roads.shp', 'roads.cpg', 'roads.dbf', 'roads.qix',
+             'roads.shp.xml', 'roads.shx', 'roads.tab'])
+        package_files(self.fileName, self.zipName,
+                      exclude=[os.path.join(self.tmpDir, 'roads.tab')])
+        with zipfile.ZipFile(self.zipName) as zf:
+            self.assertEqual(zf.testzip(), None)
+            self.assertEqual(sorted(zf.namelist()),
+                             ['roads.cpg', 'roads.dbf', 'roads.qix',
+                              'roads.shp', 'roads.shp.xml', 'roads.shx'])
+            self.assertEqual(zf.read('roads.cpg'), 'roads.cpg' * 1000)
+        # the archive is not packaged again
+        package_files(self.fileName, self.zipName)
+        with zipfile.ZipFile(self.zipName) as zf:
+            self.assertFalse('roads.zip' in zf.namelist())
+
+    def test_level(self):
+        """Test the files are stored or compressed by level."""
+        package_files(self.fileName, self.zipName, 0)
+        with zipfile.ZipFile(self.zipName) as zf:
+            self.assertEqual(set([i.compress_type for i in zf.infolist()]),
+                             set([zipfile.ZIP_STORED]))
+            self.assertEqual(zf.testzip(), None)
+        stored = os.path.getsize(self.zipName)
+        package_files(self.fileName, self.zipName, 9)
+        with zipfile.ZipFile(self.zipName) as zf:
+            self.assertEqual(set([i.compress_type for i in zf.infolist()]),
+                             set([zipfile.ZIP_DEFLATED]))
+            self.assertEqual(zf.read('roads.shp'), 'roads.shp' * 1000)
+        self.assertTrue(os.path.getsize(self.zipName) < stored)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(OutputPackageTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
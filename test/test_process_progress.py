@@ -0,0 +1,66 @@
+# coding=utf-8
+"""Tests for the Processing progress to WPS status bridge."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.processProgress import StatusProgress
+
+
+class FakeStatus:
+    """PyWPS process status stub."""
+
+    def __init__(self):
+        self.updates = []
+
+    def set(self, msg="", percentDone=0, propagate=True):
+        self.updates.append((msg, percentDone))
+
+
+class StatusProgressTest(unittest.TestCase):
+    """Test progress callbacks reach the process status coalesced."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.status = FakeStatus()
+
+    def test_percentage(self):
+        """Test small and fast percentage changes are coalesced."""
+        progress = StatusProgress(self.status, interval=0, step=5)
+        for i in range(0, 21):
+            progress.setPercentage(i + 0.5)
+        self.assertEqual([p for (m, p) in self.status.updates],
+                         [0, 5, 10, 15, 20])
+        progress.setPercentage(100)
+        self.assertEqual(self.status.updates[-1], ('Processing', 99))
+
+    def test_interval(self):
+        """Test updates are propagated once per interval, unless the text
+        changes."""
+        progress = StatusProgress(self.status, interval=60)
+        progress.setPercentage(10)
+        progress.setPercentage(50)
+        progress.setText('Computing')
+        progress.setInfo('info')
+        progress.setPercentage(60)
+        self.assertEqual(self.status.updates,
+                         [('Processing', 10), ('Computing', 50)])
+
+    def test_errors(self):
+        """Test errors are collected without a status."""
+        progress = StatusProgress()
+        progress.setPercentage(10)
+        progress.error('failed')
+        self.assertEqual(progress.msg, ['failed'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(StatusProgressTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
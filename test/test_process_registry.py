@@ -0,0 +1,110 @@
+# coding=utf-8
+"""Tests for the persistent WPS process class registry."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.processRegistry import ProcessRegistry
+
+
+class FakeCatalog:
+    """Project catalog stub."""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.vectorLayers = []
+        self.rasterLayers = []
+
+
+class ProcessRegistryTest(unittest.TestCase):
+    """Test process classes are built once and invalidated."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.built = []
+        self.alg = object()
+        self.registry = ProcessRegistry(self.factory)
+
+    def factory(self, alg_name, project='', vectors=[], rasters=[], crss=[],
+                wpsserver=''):
+        """Process factory stub."""
+        class Process:
+            alg = self.alg
+        self.built.append(alg_name)
+        return Process
+
+    def test_reuse(self):
+        """Test the same class is returned for the same key."""
+        catalog = FakeCatalog('a')
+        first = self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', catalog, ['EPSG:4326'], 'h?')
+        second = self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', catalog, ['EPSG:4326'], 'h?')
+        self.assertTrue(first is second)
+        self.assertEqual(self.built, ['qgis:buffer'])
+        self.assertTrue(first.fingerprint)
+        self.assertEqual(first.scope, ('/p.qgs', 'h?'))
+
+        self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', catalog, ['EPSG:4326'], 'o?')
+        self.assertEqual(len(self.built), 2)
+
+    def test_project_change(self):
+        """Test classes of a previous project version are dropped."""
+        self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', FakeCatalog('a'))
+        self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', FakeCatalog('b'))
+        self.assertEqual(len(self.built), 2)
+        self.assertEqual(len(self.registry), 1)
+
+    def test_limit(self):
+        """Test the registry keeps the least recently used classes."""
+        self.registry = ProcessRegistry(self.factory, 2)
+        catalog = FakeCatalog('a')
+        first = self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', catalog, [], 'h1?')
+        for wpsserver in ('h2?', 'h3?', 'h4?'):
+            self.registry.getProcessClass(
+                'qgis:buffer', self.alg, '/p.qgs', catalog, [], wpsserver)
+            self.registry.getProcessClass(
+                'qgis:buffer', self.alg, '/p.qgs', catalog, [], 'h1?')
+        self.assertEqual(len(self.registry), 2)
+        self.assertEqual(len(self.built), 4)
+        self.assertTrue(first is self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', catalog, [], 'h1?'))
+
+        # unresolved project paths are not kept
+        for projectPath in ('/a.qgs', '/b.qgs', '/c.qgs'):
+            self.registry.getProcessClass(
+                'qgis:buffer', self.alg, projectPath, None, [], 'h1?')
+        self.assertEqual(len(self.built), 7)
+        self.assertEqual(len(self.registry), 2)
+        self.assertTrue(first is self.registry.getProcessClass(
+            'qgis:buffer', self.alg, '/p.qgs', catalog, [], 'h1?'))
+
+    def test_reload(self):
+        """Test classes are rebuilt when algorithms are reloaded."""
+        first = self.registry.getProcessClass('qgis:buffer', self.alg)
+        self.registry.algsListHasChanged()
+        self.assertEqual(len(self.registry), 0)
+        second = self.registry.getProcessClass('qgis:buffer', self.alg)
+        self.assertEqual(len(self.built), 2)
+        self.assertNotEqual(first.fingerprint, second.fingerprint)
+
+        # a new algorithm instance also means a reload
+        self.alg = object()
+        self.registry.getProcessClass('qgis:buffer', self.alg)
+        self.assertEqual(len(self.built), 3)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ProcessRegistryTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
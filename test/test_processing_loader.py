@@ -0,0 +1,64 @@
+# coding=utf-8
+"""Tests for the Processing initialization and reloading."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir, 'filters', 'PyWPS')))
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.processingLoader import ProcessingLoader
+
+
+class ProcessingLoaderTest(unittest.TestCase):
+    """Test the fingerprint follows the settings and folders content."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpDir = tempfile.mkdtemp()
+        for folder in ('models', 'scripts', 'rscripts'):
+            os.mkdir(os.path.join(self.tmpDir, folder))
+        self.settings = {
+            'MODELS_FOLDER': os.path.join(self.tmpDir, 'models'),
+            'SCRIPTS_FOLDER': os.path.join(self.tmpDir, 'scripts'),
+            'R_SCRIPTS_FOLDER': os.path.join(self.tmpDir, 'rscripts')
+        }
+        self.loader = ProcessingLoader()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpDir)
+
+    def test_fingerprint(self):
+        """Test the fingerprint changes with settings and scripts."""
+        fingerprint = self.loader.getFingerprint(self.settings)
+        self.assertEqual(self.loader.getFingerprint(dict(self.settings)),
+                         fingerprint)
+
+        settings = dict(self.settings)
+        settings['ACTIVATE_GRASS7'] = True
+        self.assertNotEqual(self.loader.getFingerprint(settings), fingerprint)
+
+        scriptPath = os.path.join(self.tmpDir, 'scripts', 'buffer.py')
+        with open(scriptPath, 'w') as f:
+            f.write('##Vector=group\n')
+        newFingerprint = self.loader.getFingerprint(self.settings)
+        self.assertNotEqual(newFingerprint, fingerprint)
+
+        st = os.stat(scriptPath)
+        os.utime(scriptPath, (st.st_atime, st.st_mtime + 10))
+        self.assertNotEqual(self.loader.getFingerprint(self.settings),
+                            newFingerprint)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ProcessingLoaderTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
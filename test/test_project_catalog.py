@@ -0,0 +1,110 @@
+# coding=utf-8
+"""Tests for the QGIS project layer catalog cache."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters import projectCatalog
+
+PROJECT = """<!DOCTYPE qgis PUBLIC 'http://mrcc.com/qgis.dtd' 'SYSTEM'>
+<qgis projectname="" version="2.14.0">
+  <mapcanvas>
+    <destinationsrs>
+      <spatialrefsys>
+        <authid>EPSG:2154</authid>
+      </spatialrefsys>
+    </destinationsrs>
+  </mapcanvas>
+  <projectlayers>
+    <maplayer type="raster">
+      <layername>dem</layername>
+      <datasource>./tenbytenraster.asc</datasource>
+      <provider>gdal</provider>
+      <srs><spatialrefsys><authid>EPSG:4326</authid><proj4>+proj=longlat +datum=WGS84 +no_defs</proj4></spatialrefsys></srs>
+    </maplayer>
+    <maplayer type="raster">
+      <layername>missing</layername>
+      <datasource>./missing.tif</datasource>
+      <provider>gdal</provider>
+      <srs><spatialrefsys><authid>EPSG:4326</authid><proj4>+proj=longlat +datum=WGS84 +no_defs</proj4></spatialrefsys></srs>
+    </maplayer>
+    <maplayer type="vector" geometry="Polygon">
+      <layername>lakes</layername>
+      <datasource>dbname='gis' table="lakes" (geom) sql=</datasource>
+      <provider>postgres</provider>
+      <srs><spatialrefsys><authid>EPSG:2154</authid><proj4>+proj=lcc +units=m +no_defs</proj4></spatialrefsys></srs>
+    </maplayer>
+  </projectlayers>
+  <properties>
+    <WMSCrsList type="QStringList">
+      <value>EPSG:2154</value>
+      <value>EPSG:3857</value>
+    </WMSCrsList>
+  </properties>
+</qgis>
+"""
+
+
+class ProjectCatalogTest(unittest.TestCase):
+    """Test the project catalog is parsed once and refreshed on change."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpDir = tempfile.mkdtemp()
+        self.projectPath = os.path.join(self.tmpDir, 'project.qgs')
+        with open(self.projectPath, 'w') as f:
+            f.write(PROJECT)
+        open(os.path.join(self.tmpDir, 'tenbytenraster.asc'), 'w').close()
+        projectCatalog.clear_project_catalogs()
+
+    def tearDown(self):
+        """Runs after each test."""
+        projectCatalog.clear_project_catalogs()
+        shutil.rmtree(self.tmpDir)
+
+    def test_layers(self):
+        """Test layers and CRSs are read from the project."""
+        catalog = projectCatalog.get_project_catalog(self.projectPath)
+        self.assertEqual([l['name'] for l in catalog.rasterLayers], ['dem'])
+        self.assertEqual(catalog.rasterLayers[0]['datasource'],
+                         os.path.join(self.tmpDir, 'tenbytenraster.asc'))
+        self.assertEqual([l['name'] for l in catalog.vectorLayers], ['lakes'])
+        self.assertEqual(catalog.vectorLayers[0]['geometry'], 'Polygon')
+        self.assertEqual(catalog.crsList, ['EPSG:2154', 'EPSG:3857'])
+
+    def test_cache(self):
+        """Test the catalog is only rebuilt when the project changes."""
+        catalog = projectCatalog.get_project_catalog(self.projectPath)
+        self.assertTrue(
+            projectCatalog.get_project_catalog(self.projectPath) is catalog)
+
+        with open(self.projectPath, 'w') as f:
+            f.write(PROJECT.replace('<layername>lakes', '<layername>rivers'))
+        st = os.stat(self.projectPath)
+        os.utime(self.projectPath, (st.st_atime, st.st_mtime + 10))
+
+        newCatalog = projectCatalog.get_project_catalog(self.projectPath)
+        self.assertFalse(newCatalog is catalog)
+        self.assertNotEqual(newCatalog.fingerprint, catalog.fingerprint)
+        self.assertEqual([l['name'] for l in newCatalog.vectorLayers],
+                         ['rivers'])
+
+    def test_no_project(self):
+        """Test no catalog is returned without project."""
+        self.assertEqual(projectCatalog.get_project_catalog(None), None)
+        self.assertEqual(projectCatalog.get_project_catalog(
+            os.path.join(self.tmpDir, 'none.qgs')), None)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ProjectCatalogTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,109 @@
+# coding=utf-8
+"""Tests for the Execute result cache."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.resultCache import ResultCache, file_signature, OUTPUTS_FILE
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Test results are stored, reused and evicted."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpDir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.tmpDir, 'results'))
+        self.output = os.path.join(self.tmpDir, 'output.gml')
+        with open(self.output, 'w') as f:
+            f.write('<gml/>' * 100)
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpDir)
+
+    def test_key(self):
+        """Test the key does not depend on the order of the inputs."""
+        key = self.cache.getKey('qgis:buffer', [('A', 1), ('B', 'x')],
+                                [('OUTPUT', ['text/xml', True])])
+        self.assertEqual(key, self.cache.getKey(
+            'qgis:buffer', [('B', 'x'), ('A', 1)],
+            [('OUTPUT', ['text/xml', True])]))
+        self.assertNotEqual(key, self.cache.getKey(
+            'qgis:buffer', [('A', 2), ('B', 'x')],
+            [('OUTPUT', ['text/xml', True])]))
+        self.assertNotEqual(key, self.cache.getKey(
+            'qgis:buffer', [('A', 1), ('B', 'x')],
+            [('OUTPUT', ['application/json', True])]))
+        # edited models and scripts
+        self.assertNotEqual(key, self.cache.getKey(
+            'qgis:buffer', [('A', 1), ('B', 'x')],
+            [('OUTPUT', ['text/xml', True])], 'changed'))
+
+    def test_put_get(self):
+        """Test the files and values of the outputs are restored."""
+        self.assertEqual(self.cache.get('key'), None)
+        self.cache.put('key', {'OUTPUT': {'file': self.output,
+                                          'projection': 'EPSG:4326'},
+                               'COUNT': {'value': 3}})
+        outputs = self.cache.get('key')
+        self.assertEqual(outputs['COUNT'], {'value': 3})
+        self.assertEqual(outputs['OUTPUT']['projection'], 'EPSG:4326')
+        self.assertEqual(open(outputs['OUTPUT']['file']).read(),
+                         open(self.output).read())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_evict(self):
+        """Test expired and least recently used results are dropped."""
+        for key in ('a', 'b', 'c'):
+            self.cache.put(key, {'OUTPUT': {'file': self.output}})
+            os.utime(os.path.join(self.cache.path, key, OUTPUTS_FILE),
+                     (time.time() - 10, time.time() - 10))
+        # mark as recently used
+        self.assertNotEqual(self.cache.get('a'), None)
+        # room for two results
+        self.cache.maxSize = 1500
+        self.cache.put('d', {'OUTPUT': {'file': self.output}})
+        self.assertEqual(sorted(os.listdir(self.cache.path)), ['a', 'd'])
+
+        self.cache.ttl = 60
+        entry = os.path.join(self.cache.path, 'a')
+        os.utime(entry, (time.time() - 120, time.time() - 120))
+        self.assertEqual(self.cache.get('a'), None)
+        self.cache.evict()
+        self.assertEqual(os.listdir(self.cache.path), ['d'])
+
+    def test_cacheable(self):
+        """Test the allowed and denied algorithms and providers."""
+        self.assertFalse(ResultCache().isCacheable('qgis:buffer'))
+        self.cache.configure(self.cache.path, deny=['qgis:randompoints'])
+        self.assertTrue(self.cache.isCacheable('qgis:buffer'))
+        self.assertFalse(self.cache.isCacheable('qgis:randompoints'))
+        self.cache.configure(self.cache.path, allow=['grass7'])
+        self.assertFalse(self.cache.isCacheable('qgis:buffer'))
+        self.assertTrue(self.cache.isCacheable('grass7:r.slope'))
+
+    def test_file_signature(self):
+        """Test files are signed by content or by modification time."""
+        content = file_signature(self.output, True)
+        signature = file_signature(self.output)
+        with open(os.path.join(self.tmpDir, 'output.xsd'), 'w') as f:
+            f.write('<xsd/>')
+        self.assertEqual(file_signature(self.output, True), content)
+        self.assertNotEqual(file_signature(self.output), signature)
+        self.assertEqual(file_signature(self.tmpDir), None)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ResultCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Tests for the vector ComplexData input ingestion."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.vectorInput import sniff_vector_format, ingest_vector_file, \
+    get_source_file
+
+
+class VectorInputTest(unittest.TestCase):
+    """Test uploaded vector files are opened without copies."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpDir)
+
+    def upload(self, data, name='pywpsInput1'):
+        fileName = os.path.join(self.tmpDir, name)
+        with open(fileName, 'wb') as f:
+            f.write(data)
+        return fileName
+
+    def test_sniff(self):
+        """Test the format is detected from the content."""
+        self.assertEqual(sniff_vector_format(self.upload(
+            '<?xml version="1.0"?><wfs:FeatureCollection/>')), 'gml')
+        self.assertEqual(sniff_vector_format(self.upload(
+            '\xef\xbb\xbf\n {"type": "FeatureCollection"}')), 'geojson')
+
+    def test_link(self):
+        """Test the file gets the extension of its format by a link."""
+        fileName = self.upload('{"type": "FeatureCollection"}')
+        datasource = ingest_vector_file(fileName)
+        self.assertEqual(datasource, fileName + '.geojson')
+        self.assertEqual(os.stat(datasource).st_ino, os.stat(fileName).st_ino)
+        self.assertEqual(ingest_vector_file(fileName), datasource)
+        self.assertEqual(get_source_file(datasource + '|layerid=0'),
+                         datasource)
+
+    def test_zip(self):
+        """Test the zipped shapefile is opened in the archive."""
+        fileName = os.path.join(self.tmpDir, 'pywpsInput2')
+        with zipfile.ZipFile(fileName, 'w') as zf:
+            for ext in ('.dbf', '.shp', '.shx'):
+                zf.writestr('data/roads' + ext, '')
+        datasource = ingest_vector_file(fileName)
+        self.assertEqual(datasource,
+                         '/vsizip/' + fileName + '/data/roads.shp')
+        self.assertEqual(get_source_file(datasource), fileName)
+        self.assertEqual(os.listdir(self.tmpDir), ['pywpsInput2'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(VectorInputTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
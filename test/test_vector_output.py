@@ -0,0 +1,79 @@
+# coding=utf-8
+"""Tests for the vector ComplexData output formats."""
+
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.pardir)))
+
+from filters.vectorOutput import get_direct_output_file, is_written_output, \
+    get_vector_output_file
+
+
+class VectorOutputTest(unittest.TestCase):
+    """Test algorithms write the requested formats without conversion."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpDir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpDir)
+
+    def tearDown(self):
+        """Runs after each test."""
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpDir)
+
+    def test_direct_output(self):
+        """Test the output file is given in the requested format, if the
+        provider supports it."""
+        self.assertEqual(
+            get_direct_output_file('OUTPUT', 'application/json',
+                                   ['shp', 'GeoJSON']),
+            os.path.join(os.getcwd(), 'OUTPUT.geojson'))
+        self.assertEqual(
+            get_direct_output_file('out-layer', 'application/x-zipped-shp',
+                                   ['shp']),
+            os.path.join(os.getcwd(), 'out_layer.shp'))
+        self.assertEqual(get_direct_output_file(
+            'OUTPUT', 'application/x-zipped-tab', ['shp']), None)
+        self.assertEqual(get_direct_output_file(
+            'OUTPUT', 'text/xml; subtype=gml/3.1.1', ['gml']), None)
+
+    def test_written(self):
+        """Test outputs in the requested format and CRS are not
+        converted."""
+        self.assertTrue(is_written_output('/a/OUTPUT.GeoJSON', 'geojson',
+                                          False, 'EPSG:4326'))
+        self.assertFalse(is_written_output('/a/OUTPUT.geojson', 'geojson',
+                                           True, 'EPSG:4326'))
+        self.assertFalse(is_written_output('/a/OUTPUT.geojson', 'geojson',
+                                           False, ''))
+        self.assertFalse(is_written_output('/a/OUTPUT.shp', 'geojson',
+                                           False, 'EPSG:4326'))
+        self.assertFalse(is_written_output('/a/OUTPUT', 'geojson',
+                                           False, 'EPSG:4326'))
+
+    def test_output_file(self):
+        """Test converted outputs do not overwrite the algorithm output."""
+        self.assertEqual(get_vector_output_file('/a/OUTPUT.shp', 'gml', False),
+                         '/a/OUTPUT.gml')
+        self.assertEqual(get_vector_output_file('/a/OUTPUT.shp', 'shp', True),
+                         '/a/OUTPUT.shp')
+        self.assertEqual(get_vector_output_file('/a/OUTPUT.shp', 'shp', False),
+                         '/a/OUTPUT_wps.shp')
+        self.assertEqual(
+            get_vector_output_file('/a/OUTPUT.x.shp', 'shp', False),
+            '/a/OUTPUT.shp')
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(VectorOutputTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)